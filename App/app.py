@@ -6,7 +6,7 @@ from datetime import datetime
 
 # Import configuration and database
 from config.settings import Config
-from config.database import init_db, close_db, get_db_connection
+from config.database import init_db, close_db, get_db_connection, DatabaseManager
 
 # Import models for initialization
 from models.user import User
@@ -34,10 +34,67 @@ def create_app():
     app.config.from_object(Config)
     app.config['SESSION_FILE_DIR'] = session_dir
     app.config['UPLOAD_FOLDER'] = upload_dir
+    app.config['FRAME_STORE_DIR'] = os.path.join(upload_dir, 'frames')
+    app.config['JOB_DIR'] = os.path.join(upload_dir, 'jobs')
+    app.config['RESULT_STORE_DIR'] = os.path.join(upload_dir, 'results')
+    app.config['PARSED_CACHE_DIR'] = os.path.join(upload_dir, 'parsed')
+    app.config['BLOB_STORE_DIR'] = os.path.join(upload_dir, 'blobs')
+    app.config['CACHE_SPILL_DIR'] = os.path.join(upload_dir, 'cache')
+    
+    # Uploaded DataFrames live on disk; the session only keeps their ids
+    from services.dataframe_store import DataFrameStore
+    DataFrameStore.configure(app.config['FRAME_STORE_DIR'])
+    DataFrameStore.cleanup()
+    
+    # Files are parsed once per content; re-reading the same bytes loads the cached sheets
+    from services.parsed_file_cache import ParsedFileCache
+    ParsedFileCache.configure(app.config['PARSED_CACHE_DIR'], app.config['PARSED_CACHE_MAX_MB'] * 1024 ** 2)
+    ParsedFileCache.cleanup()
+    
+    # Validation results are paged out of the frame store instead of sent whole
+    from services.validation_results import ValidationResultStore
+    ValidationResultStore.configure(app.config['RESULT_STORE_DIR'])
+    ValidationResultStore.cleanup()
+    
+    # Long validations run in worker processes; their state is kept next to the uploads.
+    # Each job worker shards large files over its own pool, sized to its share of the CPUs
+    from services.job_queue import JobQueue
+    from services.parallel_validator import ParallelValidator
+    job_parallel_workers = ParallelValidator.cpu_share(app.config['PARALLEL_VALIDATION_WORKERS'],
+                                                       app.config['VALIDATION_WORKERS'])
+    JobQueue.configure(app.config['JOB_DIR'], app.config['VALIDATION_WORKERS'],
+                       initializer=ParallelValidator.configure, initargs=(job_parallel_workers,))
+    JobQueue.cleanup()
+    
+    # Large session payloads (validation results, temporary data) live in compressed blobs
+    from services.blob_store import BlobStore
+    BlobStore.configure(app.config['BLOB_STORE_DIR'], app.config['PERMANENT_SESSION_LIFETIME'])
+    BlobStore.cleanup()
+    
+    # Repeated validations of the same file and rules are answered from memory (or disk spill)
+    from services.cache_manager import CacheManager
+    CacheManager.configure(app.config['CACHE_MAX_MB'] * 1024 ** 2, app.config['CACHE_TTL_SECONDS'],
+                           app.config['CACHE_SPILL_DIR'], app.config['CACHE_SPILL_MAX_MB'] * 1024 ** 2)
+    
+    # Large validations are split by rows across a pool of worker processes
+    ParallelValidator.configure(app.config['PARALLEL_VALIDATION_WORKERS'])
+    
+    # SFTP sessions are reused across requests instead of reconnecting per operation
+    from services.sftp_pool import SFTPConnectionPool
+    SFTPConnectionPool.configure(app.config['SFTP_POOL_MAX_PER_HOST'], app.config['SFTP_POOL_IDLE_TIMEOUT'])
+    
+    # Create the database once at startup; requests only draw pooled connections
+    try:
+        DatabaseManager.bootstrap(app.config['DB_POOL_SIZE'], app.config['DB_POOL_TIMEOUT'])
+    except Exception as e:
+        logging.error(f"Database bootstrap failed, the pool will be opened on first use: {e}")
     
     # Initialize extensions with proper configuration
     from flask_cors import CORS
-    from flask_session import Session
+    from services.session_manager import WriteOnChangeSessionInterface
+    
+    # Server-side sessions, written only when a request changes them
+    WriteOnChangeSessionInterface.init_app(app)
     
     CORS(app, origins=[
         "http://localhost:3000",
@@ -193,11 +250,8 @@ def create_app():
     # Health check endpoint for monitoring
     @app.route('/health', methods=['GET'])
     def health_check():
-        return jsonify({
-            'status': 'healthy',
-            'timestamp': datetime.now().isoformat(),
-            'version': '2.0.0'
-        })
+        from utils.health_check import HealthCheck
+        return jsonify(HealthCheck.report())
     
     return app
 
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Date(...) checks and Transform-Date(...) conversion of a date column.
+
+Compares, on the same column:
+
+    per-cell   datetime.strptime per cell (is_valid_date_format) and
+               DataTransformer.transform_date per cell
+    distinct   strptime once per distinct value, as ValidationEngine did
+               before DateParser (validation only)
+    vectorized DateParser: pd.to_datetime(format=..., errors='coerce') over
+               the distinct values, mapped back onto the rows
+
+The column mixes valid dates drawn from --distinct days with a share of
+malformed values; all paths must agree on every row.
+
+Usage (from the App directory):
+    python benchmarks/bench_dates.py --rows 1000000
+    python benchmarks/bench_dates.py --rows 1000000 --distinct 150000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.data_transformer import DataTransformer  # noqa: E402
+from services.date_parser import DateParser  # noqa: E402
+from utils.constants import DATE_FORMAT_MAPPING  # noqa: E402
+
+
+def build_column(rows: int, distinct: int, invalid_share: float, seed: int = 17) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    # Days 1-28 of every month of 1700-2199: up to 168,000 distinct dates
+    picks = rng.choice(28 * 12 * 500, min(distinct, 28 * 12 * 500), replace=False)
+    dates = np.array([f"{pick % 28 + 1:02d}-{pick // 28 % 12 + 1:02d}-{1700 + pick // 336}" for pick in picks],
+                     dtype=object)
+    values = dates[rng.integers(0, len(dates), rows)]
+    bad = rng.random(rows) < invalid_share
+    values[bad] = np.array(['31-02-2024', '2024-01-05', 'n/a', '13-13-13'], dtype=object)[rng.integers(0, 4, bad.sum())]
+    values[rng.random(rows) < 0.01] = None
+    return pd.Series(values, dtype=object)
+
+
+def per_cell_valid(text: pd.Series, accepted_formats) -> np.ndarray:
+    valid = []
+    for value in text:
+        ok = False
+        for date_format in accepted_formats:
+            try:
+                datetime.strptime(value, date_format)
+                ok = True
+                break
+            except ValueError:
+                pass
+        valid.append(ok)
+    return np.array(valid, dtype=bool)
+
+
+def distinct_valid(text: pd.Series, accepted_formats) -> np.ndarray:
+    verdicts = {value: DateParser.is_date(value, accepted_formats) for value in text.unique()}
+    return text.map(verdicts).to_numpy(dtype=bool)
+
+
+def timed(label: str, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<24}{time.perf_counter() - start:>9.3f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--distinct', type=int, default=3650, help='distinct valid dates in the column')
+    parser.add_argument('--invalid-share', type=float, default=0.02)
+    parser.add_argument('--skip-legacy', action='store_true', help='skip the per-cell paths')
+    args = parser.parse_args()
+
+    # transform_date warns once per malformed value
+    logging.disable(logging.WARNING)
+    series = build_column(args.rows, args.distinct, args.invalid_share)
+    text = series.astype(str).str.strip()
+    accepted_formats = [DATE_FORMAT_MAPPING['DD-MM-YYYY']]
+    print(f"{args.rows} cells, {args.distinct} distinct dates, {args.invalid_share:.0%} malformed")
+
+    valid = timed('validate vectorized', DateParser.valid_mask, text, accepted_formats)
+    expected = timed('validate distinct', distinct_valid, text, accepted_formats)
+    if not args.skip_legacy:
+        expected = timed('validate per-cell', per_cell_valid, text, accepted_formats)
+    if not np.array_equal(valid, expected):
+        print("PARITY FAILURE: date verdicts differ")
+        sys.exit(1)
+
+    transformed, invalid = timed('transform vectorized', DataTransformer.transform_date_column,
+                                 series, 'DD-MM-YYYY', 'YYYY-MM-DD')
+    if not args.skip_legacy:
+        expected_values = timed('transform per-cell', lambda: [
+            DataTransformer.transform_date(value, 'DD-MM-YYYY', 'YYYY-MM-DD') for value in series
+        ])
+        pd.testing.assert_series_equal(transformed, pd.Series(expected_values, dtype=object))
+    print(f"Parity: OK ({int((~valid).sum())} invalid cells, {int(invalid.sum())} left untransformed)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time and peak memory of writing a corrected .xlsx file.
+
+Builds a synthetic frame of mixed text, numeric and missing cells (a few of
+them with control characters) and writes it in a child process per writer:
+
+    to_excel  df.to_excel, as save_corrected_file did for every size
+    cells     in-memory openpyxl Workbook, ws.cell() per value and a
+              per-character comprehension per string (the previous
+              create_excel_with_formatting)
+    stream    FileHandler.create_excel_with_formatting, write-only mode with
+              per-column illegal-character cleanup
+
+Each child reports its write time and peak RSS above the RSS it had once the
+frame was built.
+
+Usage (from the App directory):
+    python benchmarks/bench_excel_writer.py --rows 300000 --columns 40
+    python benchmarks/bench_excel_writer.py --rows 50000 --modes stream cells
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+MODES = ('to_excel', 'cells', 'stream')
+
+
+def build_frame(rows: int, columns: int, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    words = np.array(['alpha', 'Beta Ltd', 'gamma-7', 'delta\x07x', 'epsilon', ''], dtype=object)
+    data = {}
+    for i in range(columns):
+        kind = i % 4
+        if kind == 0:
+            values = rng.integers(0, 10 ** 6, rows).astype(object)
+        elif kind == 1:
+            values = np.round(rng.normal(100, 30, rows), 2).astype(object)
+        else:
+            values = rng.choice(words, rows)
+        values[rng.random(rows) < 0.02] = None
+        data[f'Column {i}'] = values
+    return pd.DataFrame(data)
+
+
+def legacy_cells(df: pd.DataFrame, path: str):
+    """create_excel_with_formatting before the streaming writer"""
+    from openpyxl import Workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Sheet1'
+    for col_idx, header in enumerate(df.columns, 1):
+        ws.cell(row=1, column=col_idx, value=str(header))
+    for row_idx, row in enumerate(df.itertuples(index=False), 2):
+        for col_idx, value in enumerate(row, 1):
+            if isinstance(value, str):
+                value = ''.join(char for char in value if ord(char) >= 32 or char in ['\t', '\n', '\r'])
+            ws.cell(row=row_idx, column=col_idx, value=value)
+    wb.save(path)
+
+
+def run_child(mode: str, rows: int, columns: int, path: str):
+    from services.file_handler import FileHandler
+    df = build_frame(rows, columns)
+    if mode == 'to_excel':
+        # to_excel rejects the control characters, so it gets a pre-cleaned frame
+        df = df.replace('delta\x07x', 'deltax')
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == 'to_excel':
+        df.to_excel(path, index=False, sheet_name='Sheet1')
+    elif mode == 'cells':
+        legacy_cells(df, path)
+    else:
+        FileHandler.create_excel_with_formatting(df, path)
+    elapsed = time.perf_counter() - start
+    peak_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024
+    print(f"{elapsed:.3f} {peak_mb:.0f} {os.path.getsize(path) / 1024 ** 2:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--columns', type=int, default=40)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(args.child, args.rows, args.columns, args.path)
+
+    print(f"{args.rows} rows x {args.columns} columns")
+    print(f"{'mode':<10}{'time':>10}{'peak RSS':>14}{'file':>10}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for mode in args.modes:
+            path = os.path.join(tmpdir, f'{mode}.xlsx')
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', mode, '--rows', str(args.rows),
+                 '--columns', str(args.columns), '--path', path],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            elapsed, peak_mb, size_mb = output[-3:]
+            print(f"{mode:<10}{float(elapsed):>9.1f}s{float(peak_mb):>11.0f} MB{float(size_mb):>7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: scaling of ParallelValidator with the number of worker processes.
+
+Validates the same set of built-in rules over frames of increasing size with
+1, 2, 4, ... workers and prints one scaling curve per frame size: wall time,
+speedup over the in-process run and the worker count plan_workers would pick.
+Every parallel result is checked against the in-process one.
+
+The pool is started (and its workers import pandas) before timing, as in a
+long-running web process. Speedups are bounded by the CPUs of the host.
+
+Usage (from the App directory):
+    python benchmarks/bench_parallel_validation.py --rows 250000 1000000 4000000
+    python benchmarks/bench_parallel_validation.py --rows 2000000 --workers 1 2 4 8 16
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.parallel_validator import ParallelValidator  # noqa: E402
+
+RULES = [
+    ('Id', 'Int'), ('Id', 'Required'), ('Amount', 'Float'), ('Name', 'Text'),
+    ('Email', 'Email'), ('Code', 'Alphanumeric'), ('Active', 'Boolean'), ('Date', 'Date(DD-MM-YYYY)'),
+]
+
+
+def build_frame(rows: int, seed: int = 23) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    def with_noise(values, noise):
+        values = np.asarray(values, dtype=object)
+        mask = rng.random(rows) < 0.01
+        values[mask] = rng.choice(noise, mask.sum())
+        values[rng.random(rows) < 0.005] = None
+        return values
+
+    return pd.DataFrame({
+        'Id': with_noise(np.arange(rows).astype(str), ['x1', '1.5']),
+        'Amount': with_noise(np.round(rng.normal(500, 150, rows), 2).astype(str), ['12,5', 'n/a']),
+        'Name': with_noise(np.char.add('Customer ', rng.integers(0, 10 ** 6, rows).astype(str)), ['R2D2']),
+        'Email': with_noise(np.char.add(rng.integers(0, 10 ** 6, rows).astype(str), '@example.com'), ['no-at']),
+        'Code': with_noise(np.char.add('C', rng.integers(0, 10 ** 5, rows).astype(str)), ['C-1']),
+        'Active': with_noise(rng.choice(['true', 'false', '0', '1'], rows), ['yes']),
+        'Date': with_noise([f"{d:02d}-{m:02d}-{y}" for d, m, y in zip(
+            rng.integers(1, 29, rows), rng.integers(1, 13, rows), rng.integers(1990, 2030, rows))], ['31-02-2020']),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[250000, 1000000, 4000000])
+    parser.add_argument('--workers', type=int, nargs='+',
+                        help='worker counts to time (default: powers of two up to the CPU count)')
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    counts = args.workers or [2 ** i for i in range(int(np.log2(cpus)) + 1)]
+    ParallelValidator.configure(max(counts))
+    specs = [(column, rule, ['%d-%m-%Y'], 'DD-MM-YYYY') for column, rule in RULES]
+    # Start the pool and import pandas in its workers before anything is timed
+    warm = build_frame(ParallelValidator.MIN_SHARD_ROWS * max(counts))
+    ParallelValidator.check_rules(warm, specs, workers=max(counts))
+
+    print(f"{cpus} CPUs, {len(specs)} rules")
+    for rows in args.rows:
+        df = build_frame(rows)
+        planned = ParallelValidator.plan_workers(rows, len(specs))
+        print(f"\n{rows} rows (plan_workers picks {planned})")
+        print(f"{'workers':>8}{'time':>10}{'speedup':>10}")
+        baseline, expected = None, None
+        for workers in counts:
+            start = time.perf_counter()
+            result = ParallelValidator.check_rules(df, specs, workers=workers)
+            elapsed = time.perf_counter() - start
+            if expected is None:
+                baseline, expected = elapsed, result
+            elif result != expected:
+                print(f"PARITY FAILURE with {workers} workers")
+                sys.exit(1)
+            print(f"{workers:>8}{elapsed:>9.2f}s{baseline / elapsed:>9.2f}x")
+    ParallelValidator.shutdown()
+    print("\nParity: OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak RSS of streaming validation on a large synthetic CSV.
+
+Generates a delimited file of the requested size, then validates it in a
+child process with StreamingValidator (and, with --compare-full, with a full
+in-memory read plus ValidationEngine) and reports wall time and peak RSS of
+each child.
+
+Usage (from the App directory):
+    python benchmarks/bench_streaming_validation.py --size-gb 2
+    python benchmarks/bench_streaming_validation.py --size-gb 0.2 --compare-full
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+RULES = [
+    {'column_name': 'Id', 'rule_name': 'Int', 'source_format': None},
+    {'column_name': 'Name', 'rule_name': 'Text', 'source_format': None},
+    {'column_name': 'Email', 'rule_name': 'Email', 'source_format': None},
+    {'column_name': 'Amount', 'rule_name': 'Float', 'source_format': None},
+    {'column_name': 'Active', 'rule_name': 'Boolean', 'source_format': None},
+    {'column_name': 'Joined', 'rule_name': 'Date(DD-MM-YYYY)', 'source_format': 'DD-MM-YYYY'},
+]
+
+
+def generate_file(path: str, size_bytes: int, block_rows: int = 200000, seed: int = 11):
+    """Append blocks of synthetic rows until the file reaches the target size"""
+    rng = np.random.default_rng(seed)
+    names = np.array(['John Smith', 'Ann Lee', 'Bob (Jr)', 'Zoe Kim', 'R2D2'])
+    emails = np.array(['a.b@example.com', 'x+y@mail.org', 'j@corp.io', 'broken-at'])
+    flags = np.array(['true', 'false', '0', '1', 'maybe'])
+    # Roughly 1% of the cells in each column fail their rule
+    name_p, email_p, flag_p = [0.2475] * 4 + [0.01], [0.33] * 3 + [0.01], [0.2475] * 4 + [0.01]
+    next_id = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('Id,Name,Email,Amount,Active,Joined\n')
+        while f.tell() < size_bytes:
+            ids = np.arange(next_id, next_id + block_rows).astype(str).astype(object)
+            ids[rng.random(block_rows) < 0.01] = 'x1'
+            amounts = np.round(rng.normal(100, 50, block_rows), 2).astype(str).astype(object)
+            dates = [f"{d:02d}-{m:02d}-{y}" for d, m, y in zip(rng.integers(1, 29, block_rows),
+                                                            rng.integers(1, 13, block_rows),
+                                                            rng.integers(1990, 2030, block_rows))]
+            columns = [ids, rng.choice(names, block_rows, p=name_p), rng.choice(emails, block_rows, p=email_p),
+                       amounts, rng.choice(flags, block_rows, p=flag_p), dates]
+            f.write('\n'.join(map(','.join, zip(*columns))))
+            f.write('\n')
+            next_id += block_rows
+
+
+def run_stream(path: str, chunk_size: int):
+    from services.streaming_validator import StreamingValidator
+    out_dir = os.path.dirname(path)
+    result = StreamingValidator.validate_file(
+        path, RULES, os.path.join(out_dir, 'errors.csv'),
+        output_path=os.path.join(out_dir, 'corrected.csv'), chunk_size=chunk_size
+    )
+    print(f"rows={result['total_rows']} errors={sum(result['error_counts'].values())}")
+
+
+def run_full(path: str):
+    from services.file_handler import FileHandler
+    from services.validation_engine import ValidationEngine
+    with FileHandler.read_file(path) as sheets:
+        df = sheets['Sheet1']
+    headers = df.iloc[0].tolist()
+    df.columns = headers
+    df = df.iloc[1:].reset_index(drop=True)
+    errors = 0
+    for rule in RULES:
+        count, _ = ValidationEngine.check_column(df[rule['column_name']], rule['rule_name'], ['%d-%m-%Y'],
+                                                 True, rule['source_format'])
+        errors += count
+    print(f"rows={len(df)} errors={errors}")
+
+
+def measure(mode: str, path: str, chunk_size: int):
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', mode, '--path', path, '--chunk-size', str(chunk_size)],
+        check=True, capture_output=True, text=True
+    ).stdout.strip()
+    elapsed = time.perf_counter() - start
+    # ru_maxrss of children is the maximum over all waited children, so modes run largest-last
+    peak_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"{mode:<8}{elapsed:>10.1f}s{peak_mb:>12.0f} MB   {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-gb', type=float, default=1.0)
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--compare-full', action='store_true', help='also validate with a full in-memory read')
+    parser.add_argument('--child', choices=['stream', 'full'], help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == 'stream':
+        return run_stream(args.path, args.chunk_size)
+    if args.child == 'full':
+        return run_full(args.path)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'synthetic.csv')
+        start = time.perf_counter()
+        generate_file(path, int(args.size_gb * 1024 ** 3))
+        print(f"Generated {os.path.getsize(path) / 1024 ** 2:.0f} MB in {time.perf_counter() - start:.1f}s")
+        print(f"{'mode':<8}{'time':>11}{'peak RSS':>15}")
+        measure('stream', path, args.chunk_size)
+        if args.compare_full:
+            measure('full', path, args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
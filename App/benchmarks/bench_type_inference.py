@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: regex/to_datetime fallthrough type detection vs. TypeInference.
+
+Builds a wide frame of string cells (as read from an uploaded file), runs
+default rule assignment's type detection over every column with both
+implementations and reports their time and how many columns agree. Pass
+--sample-size 0 to disable sampling.
+
+Usage (from the App directory):
+    python benchmarks/bench_type_inference.py --columns 200 --rows 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.type_inference import TypeInference  # noqa: E402
+
+
+def legacy_detect_column_type(series):
+    """Detection as implemented in DataValidator.detect_column_type before TypeInference"""
+    non_null = series.dropna().astype(str)
+    if non_null.empty:
+        return "Text"
+    if non_null.str.match(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$").all():
+        return "Email"
+    try:
+        pd.to_datetime(non_null, format="%d-%m-%Y")
+        return "Date"
+    except Exception:
+        try:
+            pd.to_datetime(non_null, format="%Y-%m-%d")
+            return "Date"
+        except Exception:
+            pass
+    if non_null.str.lower().isin(['true', 'false', '0', '1']).all():
+        return "Boolean"
+    if non_null.str.match(r"^-?\d+$").all():
+        return "Int"
+    if non_null.str.match(r"^-?\d+(\.\d+)?$").all():
+        return "Float"
+    if non_null.str.match(r"^[a-zA-Z0-9]+$").all():
+        return "Alphanumeric"
+    return "Text"
+
+
+def build_frame(columns: int, rows: int, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    day, month, year = rng.integers(1, 29, rows), rng.integers(1, 13, rows), rng.integers(1990, 2030, rows)
+    generators = [
+        lambda: rng.integers(0, 10 ** 7, rows).astype(str),
+        lambda: np.round(rng.normal(100, 50, rows), 2).astype(str),
+        lambda: np.char.add(np.char.add(rng.choice(['ann', 'bob', 'zoe'], rows), '@'),
+                            rng.choice(['mail.org', 'corp.io'], rows)),
+        lambda: np.array([f"{d:02d}-{m:02d}-{y}" for d, m, y in zip(day, month, year)]),
+        lambda: rng.choice(['true', 'false', '0', '1'], rows),
+        lambda: rng.choice(['AB12', 'X9', 'Q77Z', 'K0'], rows),
+        lambda: rng.choice(['Main St 1', 'Elm (rear)', 'N/A'], rows),
+    ]
+    data = {}
+    for i in range(columns):
+        values = generators[i % len(generators)]().astype(object)
+        # A few free-text cells in every fourth column
+        if i % 4 == 3:
+            values[rng.random(rows) < 0.001] = 'see notes'
+        data[f'col_{i}'] = values
+    return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--columns', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--sample-size', type=int, default=TypeInference.DEFAULT_SAMPLE_SIZE)
+    args = parser.parse_args()
+
+    df = build_frame(args.columns, args.rows)
+    headers = list(df.columns)
+    print(f"{args.columns} columns x {args.rows} rows, sample size {args.sample_size or 'off'}")
+
+    start = time.perf_counter()
+    legacy = {col: legacy_detect_column_type(df[col]) for col in headers}
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    profiles = TypeInference.profile_columns(df, headers, sample_size=args.sample_size or None)
+    new_time = time.perf_counter() - start
+
+    agree = sum(legacy[col] == profiles[col]['type'] for col in headers)
+    print(f"legacy         {legacy_time:8.3f}s")
+    print(f"TypeInference  {new_time:8.3f}s   speedup {legacy_time / new_time:.1f}x")
+    print(f"types agree on {agree}/{len(headers)} columns")
+
+
+if __name__ == '__main__':
+    main()
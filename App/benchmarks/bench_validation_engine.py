@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-cell column validation loop vs. the vectorized ValidationEngine.
+
+Checks that both produce identical (row, value, rule_failed, reason) tuples for
+every built-in rule and reports the speedup.
+
+Usage (from the App directory):
+    python benchmarks/bench_validation_engine.py --rows 500000
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.validation_engine import ValidationEngine  # noqa: E402
+
+
+def legacy_check_column(series, metadata_type, accepted_formats, check_null_cells=True, source_format=None):
+    """Per-cell loop as implemented in DataValidator.check_special_characters_in_column before the engine"""
+    special_char_count, error_cell_locations = 0, []
+    for i, cell_value in enumerate(series, start=1):
+        rule_failed = metadata_type
+        if check_null_cells and pd.isna(cell_value):
+            special_char_count += 1
+            error_cell_locations.append((i, "NULL", rule_failed, "Value is null"))
+            continue
+        cell_value = str(cell_value).strip() if pd.notna(cell_value) else ""
+        if not cell_value and metadata_type == "Required":
+            special_char_count += 1
+            error_cell_locations.append((i, "EMPTY", rule_failed, "Value is empty"))
+            continue
+        reason = None
+        if metadata_type.startswith("Date("):
+            if not cell_value:
+                error_cell_locations.append((i, "EMPTY", rule_failed, "Value is empty"))
+                special_char_count += 1
+                continue
+            valid = False
+            for date_format in accepted_formats:
+                try:
+                    datetime.strptime(cell_value, date_format)
+                    valid = True
+                    break
+                except ValueError:
+                    pass
+            if not valid:
+                reason = f"Invalid date format (expected {source_format})"
+        elif metadata_type == "Alphanumeric":
+            if not cell_value:
+                reason = "Value is empty or contains only whitespace"
+            elif not re.match(r'^[a-zA-Z0-9]+$', cell_value):
+                reason = "Contains non-alphanumeric characters"
+        elif metadata_type == "Int":
+            if not cell_value.replace('-', '', 1).isdigit():
+                reason = "Must be an integer"
+        elif metadata_type == "Float":
+            try:
+                float(cell_value)
+            except ValueError:
+                reason = "Must be a number (integer or decimal)"
+        elif metadata_type == "Text":
+            if any(c not in ['"', '(', ')'] and not c.isalpha() and c != ' ' for c in cell_value):
+                reason = "Contains invalid characters"
+        elif metadata_type == "Email":
+            if not re.match(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$', cell_value):
+                reason = "Invalid email format"
+        elif metadata_type == "Boolean":
+            if not re.match(r'^(true|false|0|1)$', cell_value, re.IGNORECASE):
+                reason = "Must be a boolean (true/false or 0/1)"
+        if reason:
+            special_char_count += 1
+            error_cell_locations.append((i, cell_value, rule_failed, reason))
+    return special_char_count, error_cell_locations
+
+
+def build_frame(rows: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    def with_noise(values, noise):
+        values = np.asarray(values, dtype=object)
+        mask = rng.random(rows) < 0.02
+        values[mask] = rng.choice(noise, mask.sum())
+        values[rng.random(rows) < 0.01] = None
+        return values
+
+    return pd.DataFrame({
+        'Required': with_noise(rng.choice(['a', 'b', 'c'], rows), ['', '  ']),
+        'Int': with_noise(rng.integers(-10**6, 10**6, rows).astype(str), ['1.5', 'x', '--1', '']),
+        'Float': with_noise(np.round(rng.normal(0, 1000, rows), 3).astype(str), ['1,5', 'abc', '1e', 'inf']),
+        'Text': with_noise(rng.choice(['John Smith', 'Ann (Jr)', '"Quoted"', 'Zoë'], rows), ['R2D2', 'a-b', 'x_y']),
+        'Email': with_noise(rng.choice(['a.b@example.com', 'x+y@mail.org'], rows), ['no-at-sign', 'a@b', '@x.com']),
+        'Boolean': with_noise(rng.choice(['true', 'FALSE', '0', '1'], rows), ['yes', 'n', '2']),
+        'Alphanumeric': with_noise(rng.choice(['AB12', 'xyz', '007'], rows), ['a b', 'a-1', '']),
+        'Date(DD-MM-YYYY)': with_noise(
+            [f"{d:02d}-{m:02d}-{y}" for d, m, y in zip(rng.integers(1, 29, rows), rng.integers(1, 13, rows),
+                                                      rng.integers(1990, 2030, rows))],
+            ['31-02-2020', '2020-01-01', 'soon']
+        ),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    df = build_frame(args.rows)
+    formats = ['%d-%m-%Y']
+    print(f"{'rule':<20}{'errors':>10}{'loop (s)':>12}{'engine (s)':>12}{'speedup':>10}")
+    total_loop = total_engine = 0.0
+    for rule in df.columns:
+        start = time.perf_counter()
+        expected = legacy_check_column(df[rule], rule, formats, True, 'DD-MM-YYYY')
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = ValidationEngine.check_column(df[rule], rule, formats, True, 'DD-MM-YYYY')
+        engine_time = time.perf_counter() - start
+
+        if actual != expected:
+            print(f"PARITY FAILURE for rule {rule}")
+            sys.exit(1)
+        total_loop += loop_time
+        total_engine += engine_time
+        print(f"{rule:<20}{actual[0]:>10}{loop_time:>12.3f}{engine_time:>12.3f}{loop_time / engine_time:>9.1f}x")
+    print(f"{'total':<20}{'':>10}{total_loop:>12.3f}{total_engine:>12.3f}{total_loop / total_engine:>9.1f}x")
+    print("Parity: OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,6 @@
 import os
+import time
+import threading
 import mysql.connector
 import mysql.connector.pooling
 from mysql.connector import errorcode
@@ -22,8 +24,48 @@ class DatabaseConfig:
         }
 
 class DatabaseManager:
+    """Process-wide connection pool with a bounded wait when every connection is in use"""
+
+    DEFAULT_POOL_SIZE = 10
+    DEFAULT_POOL_TIMEOUT = 10.0
+
     _connection_pool = None
-    
+    _pool_size = DEFAULT_POOL_SIZE
+    _pool_timeout = DEFAULT_POOL_TIMEOUT
+    _slots = threading.BoundedSemaphore(DEFAULT_POOL_SIZE)
+    _stats_lock = threading.Lock()
+    _stats = {}
+
+    @classmethod
+    def configure(cls, pool_size: int = DEFAULT_POOL_SIZE, pool_timeout: float = DEFAULT_POOL_TIMEOUT):
+        """Set pool size and the longest a request waits for a free connection"""
+        if pool_size > mysql.connector.pooling.CNX_POOL_MAXSIZE:
+            logging.warning(f"Pool size {pool_size} exceeds the connector limit, "
+                            f"using {mysql.connector.pooling.CNX_POOL_MAXSIZE}")
+            pool_size = mysql.connector.pooling.CNX_POOL_MAXSIZE
+        cls._pool_size = max(1, int(pool_size))
+        cls._pool_timeout = float(pool_timeout)
+        cls._slots = threading.BoundedSemaphore(cls._pool_size)
+        cls.reset_stats()
+
+    @classmethod
+    def bootstrap(cls, pool_size: int = DEFAULT_POOL_SIZE, pool_timeout: float = DEFAULT_POOL_TIMEOUT):
+        """Create the database if it does not exist and open the pool; run once at startup"""
+        cls.configure(pool_size, pool_timeout)
+        config = DatabaseConfig.get_connection_config()
+        db_name = config.pop('database')
+        try:
+            conn = mysql.connector.connect(**config)
+            cursor = conn.cursor()
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{db_name}`")
+            cursor.close()
+            conn.close()
+        except mysql.connector.Error as err:
+            logging.error(f"Database bootstrap failed: {err}")
+            raise
+        config['database'] = db_name
+        cls.initialize_pool(config, cls._pool_size)
+
     @classmethod
     def initialize_pool(cls, config: dict, pool_size: int = 10):
         """Initialize connection pool for better performance"""
@@ -38,34 +80,88 @@ class DatabaseManager:
         except Exception as e:
             logging.error(f"Failed to initialize connection pool: {e}")
             raise
-    
+
     @classmethod
     def get_connection(cls):
-        """Get connection from pool"""
+        """Get connection from pool, waiting up to the pool timeout for a free one"""
         if cls._connection_pool is None:
-            cls.initialize_pool(DatabaseConfig.get_connection_config())
-        
-        return cls._connection_pool.get_connection()
+            cls.initialize_pool(DatabaseConfig.get_connection_config(), cls._pool_size)
+
+        waited = 0.0
+        if not cls._slots.acquire(blocking=False):
+            start = time.perf_counter()
+            acquired = cls._slots.acquire(timeout=cls._pool_timeout)
+            waited = time.perf_counter() - start
+            with cls._stats_lock:
+                cls._stats['waits'] += 1
+                cls._stats['wait_time_total'] += waited
+                cls._stats['wait_time_max'] = max(cls._stats['wait_time_max'], waited)
+                if not acquired:
+                    cls._stats['timeouts'] += 1
+            if not acquired:
+                logging.error(f"No database connection available after {waited:.1f}s")
+                raise mysql.connector.errors.PoolError(
+                    f"Connection pool exhausted: no connection freed within {cls._pool_timeout}s"
+                )
+
+        try:
+            conn = cls._connection_pool.get_connection()
+        except Exception:
+            cls._slots.release()
+            raise
+        with cls._stats_lock:
+            cls._stats['acquired'] += 1
+            cls._stats['in_use'] += 1
+            cls._stats['peak_in_use'] = max(cls._stats['peak_in_use'], cls._stats['in_use'])
+        return conn
+
+    @classmethod
+    def release_connection(cls, conn):
+        """Return a connection obtained from get_connection to the pool"""
+        try:
+            conn.close()
+        finally:
+            with cls._stats_lock:
+                cls._stats['in_use'] -= 1
+            cls._slots.release()
+
+    @classmethod
+    def pool_stats(cls) -> dict:
+        with cls._stats_lock:
+            stats = dict(cls._stats)
+        waits = stats['waits']
+        stats.update({
+            'pool_size': cls._pool_size,
+            'pool_timeout': cls._pool_timeout,
+            'initialized': cls._connection_pool is not None,
+            'available': cls._pool_size - stats['in_use'],
+            'wait_time_total': round(stats['wait_time_total'], 4),
+            'wait_time_max': round(stats['wait_time_max'], 4),
+            'wait_time_avg': round(stats['wait_time_total'] / waits, 4) if waits else 0.0
+        })
+        return stats
+
+    @classmethod
+    def reset_stats(cls):
+        with cls._stats_lock:
+            cls._stats = {
+                'in_use': 0,
+                'peak_in_use': 0,
+                'acquired': 0,
+                'waits': 0,
+                'timeouts': 0,
+                'wait_time_total': 0.0,
+                'wait_time_max': 0.0
+            }
+
+DatabaseManager.reset_stats()
 
 def get_db_connection():
-    """Get database connection from pool or create new connection"""
+    """Get the request's database connection, drawn from the pool on first use"""
     if 'db' not in g:
         try:
-            # First try to create database if it doesn't exist
-            config = DatabaseConfig.get_connection_config()
-            db_name = config.pop('database')
-            
-            # Connect without database to create it if needed
-            conn = mysql.connector.connect(**config)
-            cursor = conn.cursor()
-            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name}")
-            cursor.close()
-            conn.close()
-            
-            # Now connect with database
-            config['database'] = db_name
-            g.db = DatabaseManager.get_connection() if DatabaseManager._connection_pool else mysql.connector.connect(**config)
-            logging.info("Database connection established successfully")
+            g.db = DatabaseManager.get_connection()
+            logging.debug("Database connection acquired from pool")
         except mysql.connector.Error as err:
             if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
                 logging.error("Database connection failed: Access denied")
@@ -81,7 +177,7 @@ def close_db(error):
     db = g.pop('db', None)
     if db is not None:
         try:
-            db.close()
+            DatabaseManager.release_connection(db)
         except Exception as e:
             logging.error(f"Error closing database connection: {e}")
 
@@ -205,6 +301,19 @@ def init_db():
                 # Column might already exist, continue
                 pass
         
+        # Covering indexes for the per-user dashboard aggregates
+        add_index_queries = [
+            "CREATE INDEX idx_history_user_date ON validation_history (user_id, corrected_at, error_count)",
+            "CREATE INDEX idx_templates_user_status ON excel_templates (user_id, status)"
+        ]
+        
+        for query in add_index_queries:
+            try:
+                cursor.execute(query)
+            except mysql.connector.Error:
+                # Index already exists, continue
+                pass
+        
         conn.commit()
         cursor.close()
         logging.info("Database tables initialized successfully")
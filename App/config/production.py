@@ -18,6 +18,8 @@ class ProductionConfig:
         'pool_size': 20,
         'pool_reset_session': True
     }
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', DB_CONFIG['pool_size']))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
     
     # Performance settings
     MAX_CONTENT_LENGTH = 200 * 1024 * 1024  # 200MB
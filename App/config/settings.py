@@ -12,11 +12,36 @@ class Config:
     SESSION_COOKIE_SAMESITE = 'Lax'
     SESSION_COOKIE_SECURE = True
     PERMANENT_SESSION_LIFETIME = 86400  # 24 hours
+    # Sessions are saved when modified, not on every request; unchanged sessions
+    # are still renewed once half their lifetime has passed
+    SESSION_REFRESH_EACH_REQUEST = False
     
     # File upload settings
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB
     UPLOAD_EXTENSIONS = ['.xlsx', '.xls', '.csv', '.txt']
     
+    # Database connection pool
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+    
+    # Worker processes for background validation jobs
+    VALIDATION_WORKERS = int(os.getenv('VALIDATION_WORKERS', 2))
+    
+    # Worker processes sharing one large validation by row shards (0: one per CPU)
+    PARALLEL_VALIDATION_WORKERS = int(os.getenv('PARALLEL_VALIDATION_WORKERS', 0))
+    
+    # Pooled SFTP sessions per (host, port, user) and how long an idle one stays open
+    SFTP_POOL_MAX_PER_HOST = int(os.getenv('SFTP_POOL_MAX_PER_HOST', 4))
+    SFTP_POOL_IDLE_TIMEOUT = float(os.getenv('SFTP_POOL_IDLE_TIMEOUT', 300))
+    
+    # Disk space for parsed copies of uploaded files, least recently used dropped first
+    PARSED_CACHE_MAX_MB = int(os.getenv('PARSED_CACHE_MAX_MB', 1024))
+    
+    # In-process cache of frames and validation results, and the disk space it may spill to (0: none)
+    CACHE_MAX_MB = int(os.getenv('CACHE_MAX_MB', 256))
+    CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', 3600))
+    CACHE_SPILL_MAX_MB = int(os.getenv('CACHE_SPILL_MAX_MB', 0))
+    
     # CORS settings
     CORS_ORIGINS = ["http://localhost:3000", "http://localhost:8080", "*"]
     
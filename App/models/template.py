@@ -2,6 +2,8 @@ import json
 import logging
 from typing import List, Dict, Optional, Tuple
 from config.database import get_db_connection
+from services.rule_registry import RuleRegistry
+from utils.constants import CORRECTION_INSERT_BATCH_ROWS
 
 class Template:
     @staticmethod
@@ -197,6 +199,8 @@ class Template:
             success = cursor.rowcount > 0
             conn.commit()
             cursor.close()
+            # Template-specific rules are removed by ON DELETE CASCADE
+            RuleRegistry.invalidate()
             return success
         except Exception as e:
             logging.error(f"Error deleting template: {str(e)}")
@@ -207,28 +211,102 @@ class Template:
         """Update selected columns for a template"""
         try:
             conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Reset all columns to not selected
+            Template.mark_selected_columns(conn, template_id, selected_headers)
+            conn.commit()
+        except Exception as e:
+            logging.error(f"Error updating selected columns: {str(e)}")
+            raise
+
+    @staticmethod
+    def mark_selected_columns(conn, template_id: int, selected_headers: List[str]):
+        """Select exactly the given headers of a template in one statement (caller commits)"""
+        cursor = conn.cursor()
+        if selected_headers:
+            placeholders = ', '.join(['%s'] * len(selected_headers))
+            cursor.execute(f"""
+                UPDATE template_columns
+                SET is_selected = column_name IN ({placeholders})
+                WHERE template_id = %s
+            """, (*selected_headers, template_id))
+        else:
             cursor.execute("""
                 UPDATE template_columns
                 SET is_selected = FALSE
                 WHERE template_id = %s
             """, (template_id,))
-            
-            # Set selected columns
-            for header in selected_headers:
-                cursor.execute("""
-                    UPDATE template_columns
-                    SET is_selected = TRUE
-                    WHERE template_id = %s AND column_name = %s
-                """, (template_id, header))
-            
-            conn.commit()
+        cursor.close()
+
+    @staticmethod
+    def save_column_rules(conn, template_id: int, validations: Dict[str, List[str]],
+                          replace: bool = False, selected_only: bool = False,
+                          builtin_only: bool = False, active_only: bool = False) -> int:
+        """Write {column_name: [rule_name, ...]} to column_validation_rules (caller commits).
+
+        Column ids and rule ids are each resolved with one query and all rows are
+        written with one executemany, whatever the number of columns and rules.
+        replace deletes the template's existing rules first; selected_only limits
+        both the delete and the assignment to selected columns. Returns the number
+        of rules inserted.
+        """
+        cursor = conn.cursor()
+        column_filter = " AND is_selected = TRUE" if selected_only else ""
+        if replace:
+            cursor.execute(f"""
+                DELETE FROM column_validation_rules
+                WHERE column_id IN (
+                    SELECT column_id FROM template_columns WHERE template_id = %s{column_filter}
+                )
+            """, (template_id,))
+            logging.debug(f"Deleted {cursor.rowcount} existing validation rules for template {template_id}")
+
+        headers = [header for header, rule_names in validations.items() if rule_names]
+        rule_names = list(dict.fromkeys(name for header in headers for name in validations[header]))
+        if not rule_names:
             cursor.close()
-        except Exception as e:
-            logging.error(f"Error updating selected columns: {str(e)}")
-            raise
+            return 0
+
+        placeholders = ', '.join(['%s'] * len(headers))
+        cursor.execute(f"""
+            SELECT column_name, column_id FROM template_columns
+            WHERE template_id = %s AND column_name IN ({placeholders}){column_filter}
+        """, (template_id, *headers))
+        column_map = dict(cursor.fetchall())
+
+        rule_filter = ""
+        if builtin_only:
+            rule_filter += " AND is_custom = FALSE"
+        if active_only:
+            rule_filter += " AND is_active = TRUE"
+        placeholders = ', '.join(['%s'] * len(rule_names))
+        cursor.execute(f"""
+            SELECT rule_name, rule_type_id FROM validation_rule_types
+            WHERE rule_name IN ({placeholders}){rule_filter}
+        """, tuple(rule_names))
+        rule_map = dict(cursor.fetchall())
+
+        validation_data = []
+        for header in headers:
+            column_id = column_map.get(header)
+            if not column_id:
+                logging.warning(f"Column '{header}' not found in template_columns")
+                continue
+            for rule_name in validations[header]:
+                rule_type_id = rule_map.get(rule_name)
+                if rule_type_id:
+                    validation_data.append((column_id, rule_type_id, '{}'))
+                else:
+                    logging.warning(f"No rule_type_id found for validation {rule_name}")
+
+        inserted = 0
+        if validation_data:
+            cursor.executemany("""
+                INSERT IGNORE INTO column_validation_rules (column_id, rule_type_id, rule_config)
+                VALUES (%s, %s, %s)
+            """, validation_data)
+            inserted = cursor.rowcount
+        cursor.close()
+        logging.debug(f"Saved {inserted} validation rules for template {template_id}")
+        return inserted
 
     @staticmethod
     def get_template_columns(template_id: int) -> List[Dict]:
@@ -272,6 +350,68 @@ class Template:
             logging.error(f"Error checking template rules: {str(e)}")
             return False
 
+    @staticmethod
+    def get_validation_rules(cursor, template_id: int) -> List[Dict]:
+        """Validation rules of a template's selected columns (date transforms are not validations)"""
+        cursor.execute("""
+            SELECT tc.column_name, vrt.rule_name, vrt.source_format
+            FROM template_columns tc
+            JOIN column_validation_rules cvr ON tc.column_id = cvr.column_id
+            JOIN validation_rule_types vrt ON cvr.rule_type_id = vrt.rule_type_id
+            WHERE tc.template_id = %s AND tc.is_selected = TRUE AND vrt.rule_name NOT LIKE 'Transform-Date(%'
+        """, (template_id,))
+        return cursor.fetchall()
+
+    @staticmethod
+    def get_validation_rules_by_template(cursor, template_ids: List[int]) -> Dict[int, List[Dict]]:
+        """get_validation_rules for several templates (e.g. the sheets of a workbook) in one query"""
+        if not template_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(template_ids))
+        cursor.execute(f"""
+            SELECT tc.template_id, tc.column_name, vrt.rule_name, vrt.source_format
+            FROM template_columns tc
+            JOIN column_validation_rules cvr ON tc.column_id = cvr.column_id
+            JOIN validation_rule_types vrt ON cvr.rule_type_id = vrt.rule_type_id
+            WHERE tc.template_id IN ({placeholders}) AND tc.is_selected = TRUE
+              AND vrt.rule_name NOT LIKE 'Transform-Date(%'
+        """, tuple(template_ids))
+        rules = {template_id: [] for template_id in template_ids}
+        for row in cursor.fetchall():
+            rules[row.pop('template_id')].append(row)
+        return rules
+
+    @staticmethod
+    def find_matching_template(cursor, filename: str, user_id: int, headers: List[str],
+                               sheet_name: str) -> Optional[int]:
+        """Id of the user's active template with this file name, headers and sheet, if any"""
+        return Template.find_sheet_templates(cursor, filename, user_id, {sheet_name: headers}).get(sheet_name)
+
+    @staticmethod
+    def find_sheet_templates(cursor, filename: str, user_id: int,
+                             sheet_headers: Dict[str, List[str]]) -> Dict[str, int]:
+        """Template ids of the sheets of a workbook, keyed by sheet name.
+
+        Each sheet of a file has its own template (and so its own rules); a sheet
+        matches the newest active template with the same file name, sheet name and
+        headers. Sheets without a matching template are left out.
+        """
+        cursor.execute("""
+            SELECT template_id, headers, sheet_name
+            FROM excel_templates
+            WHERE template_name = %s AND user_id = %s AND status = 'ACTIVE'
+            ORDER BY created_at DESC
+        """, (filename, user_id))
+        matches = {}
+        for template in cursor.fetchall():
+            sheet_name = template['sheet_name']
+            if sheet_name in matches or sheet_name not in sheet_headers:
+                continue
+            stored_headers = json.loads(template['headers']) if template['headers'] else []
+            if stored_headers == sheet_headers[sheet_name]:
+                matches[sheet_name] = template['template_id']
+        return matches
+
 class ValidationHistory:
     @staticmethod
     def create_history_entry(template_id: int, template_name: str, error_count: int,
@@ -301,11 +441,7 @@ class ValidationHistory:
             conn = get_db_connection()
             cursor = conn.cursor()
             
-            cursor.executemany("""
-                INSERT INTO validation_corrections 
-                (history_id, row_index, column_name, original_value, corrected_value, rule_failed)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, corrections)
+            ValidationHistory.insert_corrections(cursor, corrections)
             
             conn.commit()
             cursor.close()
@@ -313,6 +449,17 @@ class ValidationHistory:
             logging.error(f"Error saving corrections: {str(e)}")
             raise
 
+    @staticmethod
+    def insert_corrections(cursor, corrections: List[Tuple], batch_rows: int = CORRECTION_INSERT_BATCH_ROWS):
+        """Insert (history_id, row_index, column_name, original_value, corrected_value, rule_failed)
+        records in multi-row batches on the caller's cursor, inside its transaction"""
+        for start in range(0, len(corrections), batch_rows):
+            cursor.executemany("""
+                INSERT INTO validation_corrections 
+                (history_id, row_index, column_name, original_value, corrected_value, rule_failed)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, corrections[start:start + batch_rows])
+
     @staticmethod
     def get_user_history(user_id: int) -> List[Dict]:
         """Get validation history for user"""
@@ -1,12 +1,24 @@
 import json
+import hashlib
 import logging
 import re
 import pandas as pd
-import numexpr
-import operator
+import numpy as np
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Set, Tuple, Any
 from config.database import get_db_connection
+from services.file_handler import FileHandler
+from services.validation_engine import ValidationEngine
+from services.parallel_validator import ParallelValidator
+from services.date_parser import DateParser
+from services.formula_evaluator import FormulaEvaluator
+from services.parsed_file_cache import ParsedFileCache
+from services.rule_registry import RuleRegistry
+from services.type_inference import TypeInference
+from services.validation_index import ValidationIndex
+from services.validation_results import ValidationResultStore
+from utils.constants import DATE_FORMAT_MAPPING, DEFAULT_DATE_FORMATS
 
 class ValidationRule:
     @staticmethod
@@ -34,6 +46,7 @@ class ValidationRule:
             
             conn.commit()
             cursor.close()
+            RuleRegistry.invalidate()
             logging.info("Default validation rules ensured successfully")
         except Exception as e:
             logging.error(f"Failed to ensure default validation rules: {str(e)}")
@@ -55,6 +68,7 @@ class ValidationRule:
             rule_type_id = cursor.lastrowid
             conn.commit()
             cursor.close()
+            RuleRegistry.invalidate()
             return rule_type_id
         except Exception as e:
             logging.error(f"Failed to create custom rule: {str(e)}")
@@ -86,49 +100,15 @@ class DataValidator:
     @staticmethod
     def detect_column_type(series: pd.Series) -> str:
         """Auto-detect column data type from original app.py"""
-        non_null = series.dropna().astype(str)
-        if non_null.empty:
-            return "Text"
-        
-        # Email detection
-        if non_null.str.match(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$").all():
-            return "Email"
-        
-        # Date detection
-        try:
-            pd.to_datetime(non_null, format="%d-%m-%Y")
-            return "Date"
-        except Exception:
-            try:
-                pd.to_datetime(non_null, format="%Y-%m-%d")
-                return "Date"
-            except Exception:
-                pass
-        
-        # Boolean detection
-        if non_null.str.lower().isin(['true', 'false', '0', '1']).all():
-            return "Boolean"
-        
-        # Integer detection
-        if non_null.str.match(r"^-?\d+$").all():
-            return "Int"
-        
-        # Float detection
-        if non_null.str.match(r"^-?\d+(\.\d+)?$").all():
-            return "Float"
-        
-        # Alphanumeric detection
-        if non_null.str.match(r"^[a-zA-Z0-9]+$").all():
-            return "Alphanumeric"
-        
-        return "Text"
+        return TypeInference.detect(series)
 
     @staticmethod
     def assign_default_rules_to_columns(df: pd.DataFrame, headers: List[str]) -> Dict[str, List[str]]:
         """Assign default validation rules based on data type"""
+        profiles = TypeInference.profile_columns(df, headers)
         assignments = {}
         for col in headers:
-            col_type = DataValidator.detect_column_type(df[col])
+            col_type = profiles[col]['type']
             rules = ["Required"]
             
             if col_type != "Text" or not any(
@@ -157,16 +137,7 @@ class DataValidator:
     @staticmethod
     def is_valid_date_format(date_string: str, accepted_date_formats: List[str]) -> bool:
         """Validate date format"""
-        if not isinstance(date_string, str):
-            return False
-        
-        for date_format in accepted_date_formats:
-            try:
-                datetime.strptime(date_string, date_format)
-                return True
-            except ValueError:
-                pass
-        return False
+        return DateParser.is_date(date_string, accepted_date_formats)
 
     @staticmethod
     def check_special_characters_in_column(df: pd.DataFrame, col_name: str, metadata_type: str, 
@@ -176,24 +147,9 @@ class DataValidator:
             logging.debug(f"Validating column: {col_name}, type: {metadata_type}, check_null_cells: {check_null_cells}")
             special_char_count, error_cell_locations = 0, []
             
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT parameters, is_custom, source_format, data_type
-                FROM validation_rule_types
-                WHERE rule_name = %s
-            """, (metadata_type,))
-            rule_data = cursor.fetchone()
-            cursor.close()
+            rule_data = RuleRegistry.get(metadata_type)
             
-            accepted_formats = accepted_date_formats
-            if metadata_type.startswith("Date(") and rule_data and rule_data['source_format']:
-                format_map = {
-                    'MM-DD-YYYY': '%m-%d-%Y', 'DD-MM-YYYY': '%d-%m-%Y', 'MM/DD/YYYY': '%m/%d/%Y', 'DD/MM/YYYY': '%d/%m/%Y',
-                    'MM-YYYY': '%m-%Y', 'MM-YY': '%m-%y', 'MM/YYYY': '%m/%Y', 'MM/YY': '%m/%y'
-                }
-                accepted_formats = [format_map.get(rule_data['source_format'], '%d-%m-%Y')]
-                logging.debug(f"Using specific date format for {col_name}: {rule_data['source_format']} ({accepted_formats[0]})")
+            accepted_formats, source_format = DataValidator._engine_arguments(metadata_type, accepted_date_formats)
             
             # Handle custom rules
             if rule_data and rule_data['is_custom'] and not metadata_type.startswith('Date('):
@@ -240,233 +196,208 @@ class DataValidator:
                         error_reason = f"Failed custom rule {metadata_type}"
                         error_cell_locations.append((i, cell_value, rule_failed, error_reason))
             else:
-                # Handle standard validation rules
-                for i, cell_value in enumerate(df[col_name], start=1):
-                    error_reason = None
-                    rule_failed = metadata_type
-                    
-                    if check_null_cells and pd.isna(cell_value):
-                        special_char_count += 1
-                        error_reason = "Value is null"
-                        error_cell_locations.append((i, "NULL", rule_failed, error_reason))
-                        continue
-                    
-                    cell_value = str(cell_value).strip() if pd.notna(cell_value) else ""
-                    
-                    if not cell_value and metadata_type == "Required":
-                        special_char_count += 1
-                        error_reason = "Value is empty"
-                        error_cell_locations.append((i, "EMPTY", rule_failed, error_reason))
-                        continue
-                    
-                    # Date validation
-                    if metadata_type.startswith("Date("):
-                        if not cell_value:
-                            special_char_count += 1
-                            error_reason = "Value is empty"
-                            error_cell_locations.append((i, "EMPTY", rule_failed, error_reason))
-                        elif not DataValidator.is_valid_date_format(cell_value, accepted_formats):
-                            special_char_count += 1
-                            error_reason = f"Invalid date format (expected {rule_data['source_format']})"
-                            error_cell_locations.append((i, cell_value, rule_failed, error_reason))
-                            logging.debug(f"Date validation failed for {col_name} at row {i}: {cell_value}, expected {rule_data['source_format']}")
-                    
-                    # Alphanumeric validation
-                    elif metadata_type == "Alphanumeric":
-                        if not cell_value:
-                            special_char_count += 1
-                            error_reason = "Value is empty or contains only whitespace"
-                            error_cell_locations.append((i, cell_value, rule_failed, error_reason))
-                        elif not re.match(r'^[a-zA-Z0-9]+$', cell_value):
-                            special_char_count += 1
-                            error_reason = "Contains non-alphanumeric characters"
-                            error_cell_locations.append((i, cell_value, rule_failed, error_reason))
-                    
-                    # Integer validation
-                    elif metadata_type == "Int":
-                        if not cell_value.replace('-', '', 1).isdigit():
-                            special_char_count += 1
-                            error_reason = "Must be an integer"
-                            error_cell_locations.append((i, cell_value, rule_failed, error_reason))
-                    
-                    # Float validation
-                    elif metadata_type == "Float":
-                        try:
-                            float(cell_value)
-                        except ValueError:
-                            special_char_count += 1
-                            error_reason = "Must be a number (integer or decimal)"
-                            error_cell_locations.append((i, cell_value, rule_failed, error_reason))
-                    
-                    # Text validation
-                    elif metadata_type == "Text":
-                        has_special = DataValidator.has_special_characters_except_quotes_and_parenthesis(cell_value)
-                        if has_special:
-                            special_char_count += 1
-                            error_reason = "Contains invalid characters"
-                            error_cell_locations.append((i, cell_value, rule_failed, error_reason))
-                    
-                    # Email validation
-                    elif metadata_type == "Email":
-                        if not re.match(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$', cell_value):
-                            special_char_count += 1
-                            error_reason = "Invalid email format"
-                            error_cell_locations.append((i, cell_value, rule_failed, error_reason))
-                    
-                    # Boolean validation
-                    elif metadata_type == "Boolean":
-                        if not re.match(r'^(true|false|0|1)$', cell_value, re.IGNORECASE):
-                            special_char_count += 1
-                            error_reason = "Must be a boolean (true/false or 0/1)"
-                            error_cell_locations.append((i, cell_value, rule_failed, error_reason))
+                # Handle standard validation rules as whole-column masks
+                special_char_count, error_cell_locations = ValidationEngine.check_column(
+                    df[col_name], metadata_type, accepted_formats, check_null_cells, source_format
+                )
             
             return special_char_count, error_cell_locations
         except Exception as e:
             logging.error(f"Error validating column {col_name}: {str(e)}")
             raise
 
+    # Rows validated between two progress reports
+    VALIDATION_CHUNK_ROWS = 50000
+
     @staticmethod
-    def evaluate_column_rule(df: pd.DataFrame, column_name: str, formula: str, 
-                           headers: List[str], data_type: str) -> Tuple[bool, List[Tuple[int, str, str, str]]]:
-        """Evaluate custom column formulas from original app.py"""
-        try:
-            error_locations = []
-            column_name = column_name.strip().lower()
-            headers_lower = [h.strip().lower() for h in headers]
+    def validate_rules(df: pd.DataFrame, rules: List[Dict], progress=None,
+                       chunk_rows: int = VALIDATION_CHUNK_ROWS) -> Dict[str, List[Dict]]:
+        """Run the template rules over df and return the error locations grouped by column.
 
-            if column_name not in df.columns.str.lower():
-                return False, [(0, "", "ColumnNotFound", f"Column '{column_name}' not found in data")]
+        rules are dicts with column_name, rule_name and source_format. Built-in rules are
+        checked block by block and progress(rows_done, total_rows) is called after each
+        block; composite custom rules look at earlier errors of the column, so they are
+        checked over the whole frame in one call.
+        """
+        return DataValidator.build_validation_index(df, rules, progress, chunk_rows).error_cell_locations()
 
-            is_arithmetic = ' = ' in formula
+    @staticmethod
+    def build_validation_index(df: pd.DataFrame, rules: List[Dict], progress=None,
+                               chunk_rows: int = VALIDATION_CHUNK_ROWS) -> ValidationIndex:
+        """Run the template rules over df and keep the failures per rule and row for revalidation"""
+        total_rows = len(df)
+        rule_locations = [[] for _ in rules]
+        chunked = []
+        for index, rule in enumerate(rules):
+            accepted_date_formats = DataValidator._accepted_date_formats(rule)
+            if DataValidator._is_column_wide(rule):
+                _, rule_locations[index] = DataValidator.check_special_characters_in_column(
+                    df, rule['column_name'], rule['rule_name'], accepted_date_formats, check_null_cells=True
+                )
+            else:
+                chunked.append((index, rule, accepted_date_formats))
 
-            if is_arithmetic:
-                formula_parts = formula.strip().split(' = ', 1)
-                if len(formula_parts) != 2 or formula_parts[0] != f"'{column_name}'":
-                    return False, [(0, "", "InvalidFormula", "Arithmetic formula must be 'column_name = expression'")]
-                
-                right_side = formula_parts[1]
-                referenced_columns = [item.strip().lower() for item in re.findall(r"'([^']+)'", right_side)]
-                
-                for col in referenced_columns:
-                    if col not in df.columns.str.lower():
-                        return False, [(0, "", "ColumnNotFound", f"Referenced column '{col}' not found in data")]
-                
-                # Validate numeric values
-                for col in referenced_columns + [column_name]:
-                    for i, value in enumerate(df[col]):
-                        if pd.isna(value) or str(value).strip() == "":
-                            error_locations.append((i + 1, "NULL", f"{column_name}_Formula", f"Value is null or empty in column {col}"))
-                        else:
-                            try:
-                                float(str(value).strip())
-                            except ValueError:
-                                error_locations.append((i + 1, str(value), f"{column_name}_DataType", f"Invalid numeric value in column {col}: {value}"))
+        workers = ParallelValidator.plan_workers(total_rows, len(chunked))
+        if workers > 1:
+            # Built-in rules only need the column and resolved formats, so they can leave this process
+            specs = [
+                (rule['column_name'], rule['rule_name'],
+                 *DataValidator._engine_arguments(rule['rule_name'], accepted_date_formats))
+                for _, rule, accepted_date_formats in chunked
+            ]
+            results = ParallelValidator.check_rules(df, specs, workers, progress)
+            for (index, _, _), locations in zip(chunked, results):
+                rule_locations[index] = locations
+            chunked = []
 
-                valid = True
-                for i in range(len(df)):
-                    row_errors = [err for err in error_locations if err[0] == i + 1]
-                    if row_errors:
-                        valid = False
-                        continue
+        for start in range(0, total_rows if chunked else 0, chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            for index, rule, accepted_date_formats in chunked:
+                _, locations = DataValidator.check_special_characters_in_column(
+                    chunk, rule['column_name'], rule['rule_name'], accepted_date_formats, check_null_cells=True
+                )
+                rule_locations[index].extend((start + loc[0],) + tuple(loc[1:]) for loc in locations)
+            if progress:
+                progress(min(start + chunk_rows, total_rows), total_rows)
 
-                    local_dict = {}
-                    try:
-                        for col in referenced_columns:
-                            local_dict[col] = float(df.at[i, col])
-                    except ValueError:
-                        valid = False
-                        error_locations.append((i + 1, "", f"{column_name}_DataType", f"Invalid numeric value in referenced columns for row {i+1}"))
-                        continue
+        dependencies = [DataValidator._rule_dependencies(rule, df.columns) for rule in rules]
+        return ValidationIndex(rules, rule_locations, dependencies)
 
-                    expr = right_side.replace("'", "").replace(" AND ", " and ").replace(" OR ", " or ")
-                    
-                    try:
-                        expected = eval(expr, {"__builtins__": {}}, local_dict)
-                        expected_num = float(expected)
-                    except Exception as eval_err:
-                        valid = False
-                        error_locations.append((i + 1, "", "FormulaEvaluation", f"Error evaluating formula for row {i+1}: {str(eval_err)}"))
-                        continue
+    @staticmethod
+    def revalidate(df: pd.DataFrame, index: ValidationIndex, corrected_rows: Dict[str, np.ndarray]) -> List[str]:
+        """Update index for corrected cells of df and return the columns whose errors were recomputed.
 
-                    actual = df.at[i, column_name]
-                    if pd.isna(actual):
-                        valid = False
-                        error_locations.append((i + 1, "NULL", f"{column_name}_Formula", "Value is null"))
-                        continue
+        corrected_rows maps a column to the 0-based rows that changed. Only rules reading a
+        corrected column are re-run: built-in rules on the corrected rows alone, composite
+        custom rules (whose outcome depends on the rest of the column) over the whole column.
+        """
+        affected = index.rules_reading(corrected_rows)
+        for rule_index in affected:
+            rule = index.rules[rule_index]
+            accepted_date_formats = DataValidator._accepted_date_formats(rule)
+            if DataValidator._is_column_wide(rule):
+                _, locations = DataValidator.check_special_characters_in_column(
+                    df, rule['column_name'], rule['rule_name'], accepted_date_formats, check_null_cells=True
+                )
+                index.replace_all(rule_index, locations)
+                continue
+            rows = np.unique(np.concatenate([
+                np.asarray(corrected_rows[column], dtype=np.int64)
+                for column in index.dependencies[rule_index] if column in corrected_rows
+            ]))
+            _, locations = DataValidator.check_special_characters_in_column(
+                df.iloc[rows], rule['column_name'], rule['rule_name'], accepted_date_formats, check_null_cells=True
+            )
+            # Locations are numbered within the slice; map them back to rows of the frame
+            index.replace_rows(rule_index, rows + 1,
+                               [(int(rows[loc[0] - 1]) + 1,) + tuple(loc[1:]) for loc in locations])
+        logging.debug(f"Revalidated {len(affected)} rules for {sum(len(r) for r in corrected_rows.values())} corrected cells")
+        return sorted({index.rules[rule_index]['column_name'] for rule_index in affected})
 
-                    actual_value = str(actual).strip()
-                    expected_value = str(expected_num)
-                    try:
-                        actual_num = float(actual_value)
-                        if abs(actual_num - expected_num) > 1e-10:
-                            valid = False
-                            error_locations.append((i + 1, actual_value, f"{column_name}_Formula", f"Data Error: {column_name} ({actual_value}) does not match formula {right_side} ({expected_value})"))
-                    except ValueError:
-                        valid = False
-                        error_locations.append((i + 1, actual_value, f"{column_name}_DataType", f"Invalid numeric value for {column_name}: {actual_value}"))
+    @staticmethod
+    def rules_fingerprint(rules: List[Dict], *context) -> str:
+        """Digest of the rules, their current definitions and any context values a result depends on"""
+        definitions = {rule['rule_name']: RuleRegistry.get(rule['rule_name']) for rule in rules}
+        payload = json.dumps([rules, definitions, context], sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
 
-                return valid, error_locations
-            else:
-                # Handle comparison formulas
-                parts = formula.strip().split(' ', 3)
-                if len(parts) != 3 or parts[0] != f"'{column_name}'" or parts[1] not in ['=', '>', '<', '>=', '<=']:
-                    return False, [(0, "", "InvalidFormula", "Comparison formula must be 'column_name <operator> operand'")]
-                
-                operator_str = parts[1]
-                operand = parts[2]
-                valid = True
-                operator_map = {'=': operator.eq, '>': operator.gt, '<': operator.lt, '>=': operator.ge, '<=': operator.le}
-                op_func = operator_map[operator_str]
-                
-                if operand.startswith("'") and operand.endswith("'"):
-                    second_column = operand[1:-1].strip().lower()
-                    if second_column not in df.columns.str.lower():
-                        return False, [(0, "", "ColumnNotFound", f"Second column '{second_column}' not found in data")]
-                    
-                    for i in range(len(df)):
-                        left_value = df.iloc[i][column_name]
-                        right_value = df.iloc[i][second_column]
-                        if pd.isna(left_value) or str(left_value).strip() == "":
-                            error_locations.append((i + 1, "NULL", f"{column_name}_Formula", f"Value is null in column {column_name}"))
-                            valid = False
-                            continue
-                        if pd.isna(right_value) or str(right_value).strip() == "":
-                            error_locations.append((i + 1, str(left_value), f"{column_name}_Formula", f"Value is null in column {second_column}"))
-                            valid = False
-                            continue
-                        
-                        try:
-                            left_num = float(str(left_value).strip())
-                            right_num = float(str(right_value).strip())
-                            if not op_func(left_num, right_num):
-                                valid = False
-                                error_locations.append((i + 1, str(left_value), f"{column_name}_Formula", f"Failed comparison: {left_value} {operator_str} {right_value}"))
-                        except ValueError:
-                            valid = False
-                            error_locations.append((i + 1, str(left_value), f"{column_name}_DataType", f"Invalid numeric value in column {column_name}: {left_value} or {second_column}: {right_value}"))
-                else:
-                    try:
-                        operand_value = float(operand)
-                        for i, value in enumerate(df[column_name]):
-                            if pd.isna(value) or str(value).strip() == "":
-                                error_locations.append((i + 1, "NULL", f"{column_name}_Formula", "Value is null"))
-                                valid = False
-                                continue
-                            try:
-                                value_num = float(str(value).strip())
-                                if not op_func(value_num, operand_value):
-                                    valid = False
-                                    error_locations.append((i + 1, str(value), f"{column_name}_Formula", f"Failed comparison: {value} {operator_str} {operand_value}"))
-                            except ValueError:
-                                valid = False
-                                error_locations.append((i + 1, str(value), f"{column_name}_DataType", f"Invalid numeric value in column {column_name}: {value}"))
-                    except ValueError:
-                        return False, [(0, "", "InvalidOperand", f"Invalid operand for comparison: {operand}")]
+    @staticmethod
+    def _accepted_date_formats(rule: Dict) -> List[str]:
+        if rule['rule_name'].startswith('Date(') and rule.get('source_format'):
+            return [DATE_FORMAT_MAPPING.get(rule['source_format'], '%d-%m-%Y')]
+        return DEFAULT_DATE_FORMATS
 
-                return valid, error_locations
+    @staticmethod
+    def _engine_arguments(rule_name: str, accepted_date_formats: List[str]) -> Tuple[List[str], Optional[str]]:
+        """(accepted date formats, source format) a built-in rule is checked with"""
+        rule_data = RuleRegistry.get(rule_name)
+        if rule_name.startswith("Date(") and rule_data and rule_data['source_format']:
+            return [DATE_FORMAT_MAPPING.get(rule_data['source_format'], '%d-%m-%Y')], rule_data['source_format']
+        return accepted_date_formats, rule_data['source_format'] if rule_data else None
 
-        except Exception as e:
-            return False, error_locations + [(0, "", "FormulaEvaluation", f"Error evaluating formula for column {column_name}: {str(e)}")]
+    @staticmethod
+    def _is_column_wide(rule: Dict) -> bool:
+        """Composite custom rules are checked over a whole column at once"""
+        rule_data = RuleRegistry.get(rule['rule_name'])
+        return bool(rule_data and rule_data['is_custom'] and not rule['rule_name'].startswith('Date('))
+
+    @staticmethod
+    def _rule_dependencies(rule: Dict, columns) -> Set[str]:
+        """Columns a rule reads: its own, plus those a custom formula refers to by 'name'"""
+        dependencies = {rule['column_name']}
+        rule_data = RuleRegistry.get(rule['rule_name'])
+        if rule_data and rule_data['is_custom'] and rule_data.get('parameters'):
+            by_lower = {str(col).strip().lower(): col for col in columns}
+            for name in re.findall(r"'([^']+)'", rule_data['parameters']):
+                if name.strip().lower() in by_lower:
+                    dependencies.add(by_lower[name.strip().lower()])
+        return dependencies
+
+    @staticmethod
+    def run_validation_job(progress, df: pd.DataFrame, rules: List[Dict], rule_snapshot: Dict[str, Dict],
+                           store_settings: Tuple[str, str], owner: Optional[int] = None,
+                           template_id: Optional[int] = None) -> Dict:
+        """Job queue task: validate df in a worker process without database access.
+
+        The validated frame and its errors go to the ValidationResultStore; the job
+        result only carries the result id, so no rows pass through the job queue.
+        """
+        RuleRegistry.install(rule_snapshot)
+        ValidationResultStore.use_settings(store_settings)
+        index = DataValidator.build_validation_index(df, rules, progress)
+        result_id = ValidationResultStore.put(df, index.error_cell_locations(), owner=owner,
+                                              template_id=template_id, index=index)
+        progress(len(df), len(df))
+        return {'result_id': result_id}
+
+    # Sheets of one workbook validated at the same time by run_workbook_validation_job
+    SHEET_VALIDATION_THREADS = 4
+
+    @staticmethod
+    def run_workbook_validation_job(progress, file_path: str, sheet_plans: Dict[str, Dict],
+                                    rule_snapshot: Dict[str, Dict], cache_settings: Tuple[str, int],
+                                    store_settings: Tuple[str, str], owner: Optional[int] = None) -> Dict:
+        """Job queue task: parse a workbook once and validate each sheet against its own template.
+
+        sheet_plans maps a sheet name to its template_id, header_row, headers and rules.
+        The workbook is opened once and its sheets are parsed one after another; each
+        parsed sheet is validated on a thread while the next one is read, and large
+        sheets are further split across the parallel validator's processes. Each sheet
+        is kept as its own stored validation result. Progress is reported in sheets.
+        """
+        RuleRegistry.install(rule_snapshot)
+        ValidationResultStore.use_settings(store_settings)
+        if ParsedFileCache.settings() != tuple(cache_settings):
+            # Read the sheets the web process has already parsed
+            ParsedFileCache.configure(*cache_settings)
+
+        results = {}
+        progress(0, len(sheet_plans))
+        threads = max(1, min(DataValidator.SHEET_VALIDATION_THREADS, len(sheet_plans)))
+        with FileHandler.read_file(file_path) as sheets, ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = {}
+            for sheet_name, plan in sheet_plans.items():
+                df = sheets[sheet_name].iloc[plan['header_row'] + 1:].reset_index(drop=True)
+                df.columns = plan['headers']
+                futures[executor.submit(DataValidator.build_validation_index, df, plan['rules'])] = (sheet_name, df)
+            for future in as_completed(futures):
+                sheet_name, df = futures.pop(future)
+                template_id = sheet_plans[sheet_name]['template_id']
+                index = future.result()
+                results[sheet_name] = {
+                    'template_id': template_id,
+                    'result_id': ValidationResultStore.put(df, index.error_cell_locations(), owner=owner,
+                                                           template_id=template_id, index=index)
+                }
+                progress(len(results), len(sheet_plans))
+        logging.info(f"Validated {len(results)} sheets of {file_path}")
+        return {'sheets': {sheet_name: results[sheet_name] for sheet_name in sheet_plans}}
+
+    @staticmethod
+    def evaluate_column_rule(df: pd.DataFrame, column_name: str, formula: str, 
+                           headers: List[str], data_type: str) -> Tuple[bool, List[Tuple[int, str, str, str]]]:
+        """Evaluate custom column formulas from original app.py"""
+        return FormulaEvaluator.evaluate_column_rule(df, column_name, formula)
 
     @staticmethod
     def transform_date(value: Any, source_format: str, target_format: str) -> Any:
@@ -477,21 +408,8 @@ class DataValidator:
                 
             value_str = str(value).strip()
             
-            # Format mapping from display format to Python strftime format
-            format_map = {
-                'MM-DD-YYYY': '%m-%d-%Y', 
-                'DD-MM-YYYY': '%d-%m-%Y', 
-                'MM/DD/YYYY': '%m/%d/%Y', 
-                'DD/MM/YYYY': '%d/%m/%Y',
-                'MM-YYYY': '%m-%Y', 
-                'MM-YY': '%m-%y', 
-                'MM/YYYY': '%m/%Y', 
-                'MM/YY': '%m/%y'
-            }
-            
-            # Get Python formats
-            source_py_format = format_map.get(source_format)
-            target_py_format = format_map.get(target_format)
+            source_py_format = DATE_FORMAT_MAPPING.get(source_format)
+            target_py_format = DATE_FORMAT_MAPPING.get(target_format)
             
             if not source_py_format or not target_py_format:
                 logging.error(f"Invalid date format: source={source_format}, target={target_format}")
@@ -499,10 +417,7 @@ class DataValidator:
                 
             # Parse date with source format and convert to target format
             parsed_date = datetime.strptime(value_str, source_py_format)
-            transformed_value = parsed_date.strftime(target_py_format)
-            
-            logging.debug(f"Date transformation: '{value_str}' ({source_format}) -> '{transformed_value}' ({target_format})")
-            return transformed_value
+            return parsed_date.strftime(target_py_format)
             
         except ValueError as ve:
             logging.error(f"Date parsing error: {ve} - value: '{value}', source: {source_format}, target: {target_format}")
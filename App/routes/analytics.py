@@ -2,81 +2,80 @@ from flask import Blueprint, request, jsonify, session
 import logging
 from datetime import datetime, timedelta
 from config.database import get_db_connection
+from services.cache_manager import CacheManager
 from utils.decorators import require_auth, handle_exceptions
 
 analytics_bp = Blueprint('analytics', __name__)
 
+# Seconds a user's dashboard stats are served from the cache; writes through this
+# process drop them at once, other processes see changes within this time
+DASHBOARD_STATS_TTL = 120
+
+def _dashboard_stats_key(user_id):
+    return f"dashboard_stats:{user_id}"
+
+@analytics_bp.after_app_request
+def invalidate_dashboard_stats(response):
+    """A successful write may change the user's templates, rules or history"""
+    if request.method in ('POST', 'PUT', 'DELETE') and response.status_code < 400 and 'user_id' in session:
+        CacheManager.invalidate(_dashboard_stats_key(session['user_id']))
+    return response
+
 @analytics_bp.route('/dashboard-stats', methods=['GET'])
 @require_auth
 @handle_exceptions
 def get_dashboard_stats():
     """Get dashboard statistics for the user"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
         user_id = session['user_id']
-        
-        # Total templates
-        cursor.execute("""
-            SELECT COUNT(*) as total_templates
-            FROM excel_templates
-            WHERE user_id = %s AND status = 'ACTIVE'
-        """, (user_id,))
-        total_templates = cursor.fetchone()['total_templates']
-        
-        # Templates with rules
-        cursor.execute("""
-            SELECT COUNT(DISTINCT t.template_id) as templates_with_rules
-            FROM excel_templates t
-            JOIN template_columns tc ON t.template_id = tc.template_id
-            JOIN column_validation_rules cvr ON tc.column_id = cvr.column_id
-            WHERE t.user_id = %s AND t.status = 'ACTIVE'
-        """, (user_id,))
-        templates_with_rules = cursor.fetchone()['templates_with_rules']
-        
-        # Total validations performed
-        cursor.execute("""
-            SELECT COUNT(*) as total_validations
-            FROM validation_history
-            WHERE user_id = %s
-        """, (user_id,))
-        total_validations = cursor.fetchone()['total_validations']
-        
-        # Total errors corrected
-        cursor.execute("""
-            SELECT COALESCE(SUM(error_count), 0) as total_errors_corrected
-            FROM validation_history
-            WHERE user_id = %s
-        """, (user_id,))
-        total_errors_corrected = cursor.fetchone()['total_errors_corrected']
-        
-        # Recent activity (last 30 days)
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        cursor.execute("""
-            SELECT COUNT(*) as recent_validations
-            FROM validation_history
-            WHERE user_id = %s AND corrected_at >= %s
-        """, (user_id, thirty_days_ago))
-        recent_validations = cursor.fetchone()['recent_validations']
-        
-        cursor.close()
+        stats = CacheManager.get(_dashboard_stats_key(user_id))
+        if stats is None:
+            stats = _query_dashboard_stats(user_id)
+            CacheManager.put(_dashboard_stats_key(user_id), stats, ttl=DASHBOARD_STATS_TTL)
         
         return jsonify({
             'success': True,
-            'stats': {
-                'total_templates': total_templates,
-                'templates_with_rules': templates_with_rules,
-                'total_validations': total_validations,
-                'total_errors_corrected': total_errors_corrected,
-                'recent_validations': recent_validations,
-                'templates_without_rules': total_templates - templates_with_rules
-            }
+            'stats': stats
         })
         
     except Exception as e:
         logging.error(f"Error fetching dashboard stats: {str(e)}")
         return jsonify({'success': False, 'message': 'Failed to fetch dashboard stats'}), 500
 
+def _query_dashboard_stats(user_id):
+    """All dashboard counts in one round trip: template and history aggregates side by side"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    thirty_days_ago = datetime.now() - timedelta(days=30)
+    cursor.execute("""
+        SELECT t.total_templates, t.templates_with_rules,
+               h.total_validations, h.total_errors_corrected, h.recent_validations
+        FROM (
+            SELECT COUNT(*) AS total_templates,
+                   COALESCE(SUM(EXISTS (
+                       SELECT 1
+                       FROM template_columns tc
+                       JOIN column_validation_rules cvr ON tc.column_id = cvr.column_id
+                       WHERE tc.template_id = et.template_id
+                   )), 0) AS templates_with_rules
+            FROM excel_templates et
+            WHERE et.user_id = %s AND et.status = 'ACTIVE'
+        ) t
+        CROSS JOIN (
+            SELECT COUNT(*) AS total_validations,
+                   COALESCE(SUM(error_count), 0) AS total_errors_corrected,
+                   COALESCE(SUM(corrected_at >= %s), 0) AS recent_validations
+            FROM validation_history
+            WHERE user_id = %s
+        ) h
+    """, (user_id, thirty_days_ago, user_id))
+    row = cursor.fetchone()
+    cursor.close()
+    
+    stats = {key: int(value) for key, value in row.items()}
+    stats['templates_without_rules'] = stats['total_templates'] - stats['templates_with_rules']
+    return stats
+
 @analytics_bp.route('/validation-trends', methods=['GET'])
 @require_auth
 @handle_exceptions
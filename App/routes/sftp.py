@@ -1,10 +1,28 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
+import os
+import time
+import uuid
 import logging
+from config.database import get_db_connection
+from models.template import Template
+from models.validation import DataValidator
+from services.file_handler import FileHandler
+from services.job_queue import JobQueue
+from services.rule_registry import RuleRegistry
 from services.sftp_handler import SFTPHandler
+from services.validation_results import ValidationResultStore
 from utils.decorators import require_auth, handle_exceptions
 
 sftp_bp = Blueprint('sftp', __name__)
 
+def _local_path(path):
+    """Resolve a client-supplied local path inside the upload folder"""
+    upload_folder = os.path.realpath(current_app.config['UPLOAD_FOLDER'])
+    resolved = os.path.realpath(os.path.join(upload_folder, path))
+    if os.path.commonpath([upload_folder, resolved]) != upload_folder:
+        raise ValueError(f"Local path outside the upload folder: {path}")
+    return resolved
+
 @sftp_bp.route('/test-connection', methods=['POST'])
 @require_auth
 @handle_exceptions
@@ -24,7 +42,7 @@ def test_sftp_connection():
             'port': data.get('port', 22)
         }
         
-        success, message = SFTPHandler.test_connection(sftp_config)
+        success, message = SFTPHandler.test_connection(**sftp_config)
         
         if success:
             return jsonify({'success': True, 'message': 'SFTP connection successful'})
@@ -48,7 +66,10 @@ def upload_file_to_sftp():
         if not all(field in data for field in required_fields):
             return jsonify({'success': False, 'message': 'Missing required fields'}), 400
         
-        local_path = data['local_path']
+        try:
+            local_path = _local_path(data['local_path'])
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         remote_path = data['remote_path']
         sftp_config = data['sftp_config']
         
@@ -82,7 +103,10 @@ def download_file_from_sftp():
             return jsonify({'success': False, 'message': 'Missing required fields'}), 400
         
         remote_path = data['remote_path']
-        local_path = data['local_path']
+        try:
+            local_path = _local_path(data['local_path'])
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         sftp_config = data['sftp_config']
         
         # Download file
@@ -226,3 +250,84 @@ def get_sftp_file_info():
     except Exception as e:
         logging.error(f"Error getting SFTP file info: {str(e)}")
         return jsonify({'success': False, 'message': 'SFTP file info retrieval failed'}), 500
+
+def _queue_ingested_file(cursor, file_path, user_id):
+    """Submit a validation job for a downloaded file whose template already has rules"""
+    with FileHandler.read_file(file_path) as sheets:
+        sheet_name = next(iter(sheets))
+        # Only the first rows are parsed until the file is known to have a template with rules
+        header_row, headers = sheets.find_header(sheet_name)
+        if header_row == -1:
+            return {'validation': 'skipped', 'message': 'Could not detect header row'}
+
+        # Same template match as a manual upload of the file
+        template_id = Template.find_matching_template(cursor, os.path.basename(file_path), user_id, headers, sheet_name)
+        if template_id is None:
+            return {'validation': 'no_template'}
+        rules = Template.get_validation_rules(cursor, template_id)
+        if not rules:
+            return {'validation': 'no_rules', 'template_id': template_id}
+
+        data = sheets[sheet_name].iloc[header_row + 1:].reset_index(drop=True)
+    data.columns = headers
+    job_id = JobQueue.submit(DataValidator.run_validation_job, data, rules, RuleRegistry.snapshot(),
+                             ValidationResultStore.settings(), user_id, template_id, owner=user_id,
+                             meta={'template_id': template_id, 'rows': len(data), 'file': os.path.basename(file_path)})
+    return {'validation': 'queued', 'template_id': template_id, 'job_id': job_id}
+
+@sftp_bp.route('/bulk-ingest', methods=['POST'])
+@require_auth
+@handle_exceptions
+def bulk_ingest_from_sftp():
+    """Download matching files of a remote directory in parallel and queue their validation"""
+    try:
+        data = request.get_json()
+        if not data or 'sftp_config' not in data:
+            return jsonify({'success': False, 'message': 'Missing required fields'}), 400
+
+        sftp_config = data['sftp_config']
+        remote_dir = data.get('remote_dir', SFTPHandler.INBOUND_PATH)
+        pattern = data.get('pattern', '*')
+        local_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'ingest', uuid.uuid4().hex)
+
+        start = time.perf_counter()
+        files, message = SFTPHandler.download_directory(sftp_config, remote_dir, local_dir, pattern,
+                                                        data.get('max_workers'))
+        if files is None:
+            return jsonify({'success': False, 'message': f'Ingest failed: {message}'}), 500
+        download_seconds = time.perf_counter() - start
+
+        if data.get('validate', True):
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            try:
+                for entry in files:
+                    if not entry['success']:
+                        continue
+                    try:
+                        entry.update(_queue_ingested_file(cursor, entry['local_path'], session['user_id']))
+                    except Exception as e:
+                        logging.error(f"Error queueing validation of {entry['name']}: {str(e)}")
+                        entry.update({'validation': 'failed', 'message': str(e)})
+            finally:
+                cursor.close()
+
+        downloaded = [entry for entry in files if entry['success']]
+        total_bytes = sum(entry['size'] for entry in downloaded)
+        return jsonify({
+            'success': True,
+            'message': message,
+            'files': files,
+            'summary': {
+                'files': len(files),
+                'downloaded': len(downloaded),
+                'bytes': total_bytes,
+                'download_seconds': round(download_seconds, 4),
+                'mb_per_s': round(total_bytes / 1048576 / download_seconds, 2) if download_seconds > 0 else None,
+                'validation_jobs': sum(1 for entry in files if entry.get('validation') == 'queued')
+            }
+        })
+
+    except Exception as e:
+        logging.error(f"Error in SFTP bulk ingest: {str(e)}")
+        return jsonify({'success': False, 'message': 'SFTP bulk ingest failed'}), 500
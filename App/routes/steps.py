@@ -2,11 +2,14 @@ from flask import Blueprint, request, jsonify, session, current_app
 import os
 import json
 import pandas as pd
-from io import StringIO
 import logging
+from models.template import Template, ValidationHistory
 from models.validation import ValidationRule, DataValidator
 from services.file_handler import FileHandler
+from services.data_transformer import DataTransformer
 from config.database import get_db_connection
+from services.session_manager import SessionManager
+from utils.constants import DATE_FORMAT_MAPPING
 
 step_bp = Blueprint('steps', __name__)
 
@@ -30,9 +33,9 @@ def submit_step_one():
         from services.file_handler import FileHandler
         file_path = session['file_path']
         template_id = session['template_id']
-        sheets = FileHandler.read_file(file_path)
-        sheet_name = session.get('sheet_name', list(sheets.keys())[0])
-        df = sheets[sheet_name]
+        with FileHandler.read_file(file_path) as sheets:
+            sheet_name = session.get('sheet_name', list(sheets.keys())[0])
+            df = sheets[sheet_name]
         header_row = FileHandler.find_header_row(df)
         if header_row == -1:
             logging.error("Could not detect header row")
@@ -47,35 +50,9 @@ def submit_step_one():
         session['current_step'] = 2
 
         conn = get_db_connection()
+        Template.mark_selected_columns(conn, template_id, headers)
+        Template.save_column_rules(conn, template_id, validations, builtin_only=True)
         cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE template_columns
-            SET is_selected = FALSE
-            WHERE template_id = %s
-        """, (template_id,))
-        for header in headers:
-            cursor.execute("""
-                UPDATE template_columns
-                SET is_selected = TRUE
-                WHERE template_id = %s AND column_name = %s
-            """, (template_id, header))
-            cursor.execute("""
-                SELECT column_id FROM template_columns
-                WHERE template_id = %s AND column_name = %s
-            """, (template_id, header))
-            column_id = cursor.fetchone()[0]
-            for rule_name in validations.get(header, []):
-                cursor.execute("""
-                    SELECT rule_type_id FROM validation_rule_types
-                    WHERE rule_name = %s AND is_custom = FALSE
-                """, (rule_name,))
-                result = cursor.fetchone()
-                if result:
-                    rule_type_id = result[0]
-                    cursor.execute("""
-                        INSERT IGNORE INTO column_validation_rules (column_id, rule_type_id, rule_config)
-                        VALUES (%s, %s, %s)
-                    """, (column_id, rule_type_id, '{}'))
         
         # Mark template as configured after successful rule assignment
         cursor.execute("""
@@ -116,33 +93,19 @@ def save_existing_template_corrections(template_id):
             return jsonify({'success': False, 'message': 'Template not found'}), 404
         
         # Get the data to correct
-        df_json = session.get('df')
-        if not df_json:
+        df = SessionManager.load_dataframe()
+        if df is None:
             cursor.close()
             return jsonify({'success': False, 'message': 'No data available in session'}), 400
         
-        df = pd.read_json(StringIO(df_json))
         headers = json.loads(template['headers'])
         df.columns = headers
         df = df.iloc[session.get('header_row', 0) + 1:].reset_index(drop=True)
         
-        # Apply corrections
-        correction_count = 0
-        for column, row_corrections in corrections.items():
-            if column not in headers:
-                continue
-            for row_str, value in row_corrections.items():
-                try:
-                    row_index = int(row_str)
-                    if 0 <= row_index < len(df):
-                        # Store original value for correction tracking
-                        original_value = df.at[row_index, column]
-                        df.at[row_index, column] = value
-                        correction_count += 1
-                        logging.info(f"Applied correction: Row {row_index+1}, Column {column}, {original_value} → {value}")
-                except (ValueError, IndexError) as e:
-                    logging.warning(f"Invalid correction: {row_str}, {column}, {value} - {str(e)}")
-                    continue
+        # Apply corrections, keeping the values they replace for the audit records
+        applied = DataTransformer.apply_bulk_corrections(df, *DataTransformer.corrections_to_arrays(corrections, headers))
+        correction_count = len(applied['rows'])
+        logging.info(f"Applied {correction_count} corrections")
         
         # Save corrected file
         base_name, ext = os.path.splitext(template['template_name'])
@@ -151,7 +114,7 @@ def save_existing_template_corrections(template_id):
         
         try:
             if ext.lower() == '.xlsx':
-                df.to_excel(corrected_file_path, index=False, sheet_name=template['sheet_name'])
+                FileHandler.write_excel(df, corrected_file_path, template['sheet_name'])
                 logging.info(f"Saved Excel file: {corrected_file_path}")
             else:
                 df.to_csv(corrected_file_path, index=False)
@@ -172,47 +135,18 @@ def save_existing_template_corrections(template_id):
         history_id = cursor.lastrowid or cursor.execute("SELECT LAST_INSERT_ID()").fetchone()[0]
         
         # Save individual corrections for tracking
-        correction_records = []
-        for column, row_corrections in corrections.items():
-            if column not in headers:
-                continue
-            for row_str, corrected_value in row_corrections.items():
-                try:
-                    row_index = int(row_str)
-                    if 0 <= row_index < len(df):
-                        # Get original value from session data for comparison
-                        original_df = pd.read_json(StringIO(session['df']))
-                        original_df.columns = headers
-                        original_df = original_df.iloc[session.get('header_row', 0) + 1:].reset_index(drop=True)
-                        
-                        original_value = str(original_df.at[row_index, column]) if row_index < len(original_df) else 'NULL'
-                        
-                        correction_records.append((
-                            history_id, 
-                            row_index + 1, 
-                            column, 
-                            original_value, 
-                            corrected_value, 
-                            'validation_rule'
-                        ))
-                except (ValueError, IndexError):
-                    continue
-        
-        if correction_records:
-            cursor.executemany("""
-                INSERT INTO validation_corrections 
-                (history_id, row_index, column_name, original_value, corrected_value, rule_failed)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    corrected_value = VALUES(corrected_value),
-                    rule_failed = VALUES(rule_failed)
-            """, correction_records)
+        correction_records = [
+            (history_id, int(row) + 1, column, str(before), corrected_value, 'validation_rule')
+            for column, row, before, corrected_value in zip(applied['columns'], applied['rows'],
+                                                            applied['before'], applied['values'])
+        ]
+        ValidationHistory.insert_corrections(cursor, correction_records)
         
         conn.commit()
         cursor.close()
         
         # Update session with corrected data
-        session['corrected_df'] = df.to_json()
+        SessionManager.store_dataframe(df, 'corrected_df')
         session['corrected_file_path'] = corrected_file_path
         
         logging.info(f"Successfully saved {correction_count} corrections for template {template_id}")
@@ -258,75 +192,11 @@ def submit_step_two():
             return jsonify({'success': False, 'message': 'Session data missing'}), 400
 
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Debug: Check what rules exist in validation_rule_types
-        cursor.execute("SELECT rule_type_id, rule_name FROM validation_rule_types WHERE is_active = TRUE")
-        available_rules = cursor.fetchall()
-        logging.info(f"Available rules in database: {available_rules}")
-        
-        # Debug: Check template columns
-        cursor.execute("SELECT column_id, column_name FROM template_columns WHERE template_id = %s", (template_id,))
-        template_columns = cursor.fetchall()
-        logging.info(f"Template columns: {template_columns}")
-        
-        # Delete existing rules first
-        cursor.execute("""
-            DELETE FROM column_validation_rules
-            WHERE column_id IN (
-                SELECT column_id FROM template_columns WHERE template_id = %s
-            )
-        """, (template_id,))
-        deleted_rows = cursor.rowcount
-        logging.info(f"Deleted {deleted_rows} existing validation rules")
-        
-        # Insert new rules
-        rules_inserted = 0
-        for header, rules in validations.items():
-            logging.info(f"Processing header '{header}' with rules {rules}")
-            
-            cursor.execute("""
-                SELECT column_id FROM template_columns
-                WHERE template_id = %s AND column_name = %s
-            """, (template_id, header))
-            result = cursor.fetchone()
-            
-            if not result:
-                logging.warning(f"Column '{header}' not found in template_columns")
-                continue
-                
-            column_id = result['column_id']
-            logging.info(f"Found column_id {column_id} for header '{header}'")
-            
-            for rule_name in rules:
-                logging.info(f"Looking for rule '{rule_name}' in validation_rule_types")
-                
-                cursor.execute("""
-                    SELECT rule_type_id FROM validation_rule_types
-                    WHERE rule_name = %s
-                """, (rule_name,))
-                result = cursor.fetchone()
-                
-                if result:
-                    rule_type_id = result['rule_type_id']
-                    logging.info(f"Found rule_type_id {rule_type_id} for rule '{rule_name}'")
-                    
-                    cursor.execute("""
-                        INSERT IGNORE INTO column_validation_rules (column_id, rule_type_id, rule_config)
-                        VALUES (%s, %s, %s)
-                    """, (column_id, rule_type_id, '{}'))
-                    
-                    if cursor.rowcount > 0:
-                        rules_inserted += 1
-                        logging.info(f"Inserted validation rule: column_id={column_id}, rule_type_id={rule_type_id}")
-                    else:
-                        logging.warning(f"Rule already exists or insert failed: column_id={column_id}, rule_type_id={rule_type_id}")
-                else:
-                    logging.error(f"Rule '{rule_name}' not found in validation_rule_types table")
-        
+        rules_inserted = Template.save_column_rules(conn, template_id, validations, replace=True)
         logging.info(f"Total rules inserted: {rules_inserted}")
         
         # Mark template as configured after successful rule assignment
+        cursor = conn.cursor()
         cursor.execute("""
             UPDATE excel_templates 
             SET is_corrected = TRUE 
@@ -430,11 +300,10 @@ def validate_existing_template(template_id):
         logging.warning("Unauthorized access to /validate-existing: session missing")
         return jsonify({'success': False, 'message': 'Not logged in'}), 401
     try:
-        df_json = session.get('df')
-        if not df_json:
+        df = SessionManager.load_dataframe()
+        if df is None:
             logging.error("No data available in session")
             return jsonify({'success': False, 'message': 'No data available'}), 400
-        df = pd.read_json(StringIO(df_json))
         headers = session['headers']
         df.columns = headers
         df = df.iloc[session['header_row'] + 1:].reset_index(drop=True)
@@ -457,11 +326,7 @@ def validate_existing_template(template_id):
             column_name = rule['column_name']
             rule_name = rule['rule_name']
             if rule_name.startswith('Date(') and rule['source_format']:
-                format_map = {
-                    'MM-DD-YYYY': '%m-%d-%Y', 'DD-MM-YYYY': '%d-%m-%Y', 'MM/DD/YYYY': '%m/%d/%Y', 'DD/MM/YYYY': '%d/%m/%Y',
-                    'MM-YYYY': '%m-%Y', 'MM-YY': '%m-%y', 'MM/YYYY': '%m/%Y', 'MM/YY': '%m/%y'
-                }
-                accepted_date_formats = [format_map.get(rule['source_format'], '%d-%m-%Y')]
+                accepted_date_formats = [DATE_FORMAT_MAPPING.get(rule['source_format'], '%d-%m-%Y')]
             error_count, locations = DataValidator.check_special_characters_in_column(
                 df, column_name, rule_name, accepted_date_formats, check_null_cells=True
             )
@@ -492,15 +357,17 @@ def handle_step(step):
     """Handle different validation steps - from original app.py"""
     if 'loggedin' not in session:
         return jsonify({'error': 'Not logged in'}), 401
-    if 'df' not in session or session['df'] is None:
-        logging.error("Session data missing: 'df' not found or is None")
+    if not SessionManager.has_dataframe():
+        logging.error("Session data missing: no uploaded DataFrame")
         return jsonify({'error': 'Please upload a file first'}), 400
     
     session['current_step'] = step
     try:
-        df = pd.read_json(StringIO(session['df']))
+        df = SessionManager.load_dataframe()
+        if df is None:
+            raise ValueError("Stored DataFrame not found")
     except Exception as e:
-        logging.error(f"Error reading session['df']: {str(e)}")
+        logging.error(f"Error loading session DataFrame: {str(e)}")
         return jsonify({'error': 'Invalid session data: Unable to load DataFrame'}), 500
     
     headers = session['headers']
@@ -532,37 +399,9 @@ def handle_step(step):
 
             # Mark selected headers in the database
             conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("UPDATE template_columns SET is_selected = FALSE WHERE template_id = %s", (session['template_id'],))
-            for header in selected_headers:
-                cursor.execute("""
-                    UPDATE template_columns
-                    SET is_selected = TRUE
-                    WHERE template_id = %s AND column_name = %s
-                """, (session['template_id'], header))
-                
-                # Auto-assign validation rules to database
-                cursor.execute("""
-                    SELECT column_id FROM template_columns
-                    WHERE template_id = %s AND column_name = %s
-                """, (session['template_id'], header))
-                column_result = cursor.fetchone()
-                if column_result:
-                    column_id = column_result[0]
-                    for rule_name in validations.get(header, []):
-                        cursor.execute("""
-                            SELECT rule_type_id FROM validation_rule_types
-                            WHERE rule_name = %s AND is_custom = FALSE
-                        """, (rule_name,))
-                        rule_result = cursor.fetchone()
-                        if rule_result:
-                            rule_type_id = rule_result[0]
-                            cursor.execute("""
-                                INSERT IGNORE INTO column_validation_rules (column_id, rule_type_id, rule_config)
-                                VALUES (%s, %s, %s)
-                            """, (column_id, rule_type_id, '{}'))
+            Template.mark_selected_columns(conn, session['template_id'], selected_headers)
+            Template.save_column_rules(conn, session['template_id'], validations, builtin_only=True)
             conn.commit()
-            cursor.close()
 
             return jsonify({'success': True, 'headers': selected_headers, 'validations': validations})
         return jsonify({'headers': headers})
@@ -585,33 +424,8 @@ def handle_step(step):
                 logging.debug(f"DataFrame after removing header row: {df.to_dict()}")
 
                 conn = get_db_connection()
-                cursor = conn.cursor(dictionary=True)
-                cursor.execute("SELECT column_id, column_name FROM template_columns WHERE template_id = %s", (session['template_id'],))
-                column_map = {row['column_name']: row['column_id'] for row in cursor.fetchall()}
-                cursor.execute("SELECT rule_type_id, rule_name FROM validation_rule_types WHERE is_active = TRUE")
-                rule_map = {row['rule_name']: row['rule_type_id'] for row in cursor.fetchall()}
-                cursor.execute("DELETE FROM column_validation_rules WHERE column_id IN (SELECT column_id FROM template_columns WHERE template_id = %s)", (session['template_id'],))
-
-                validation_data = []
-                for header, rule_names in validations.items():
-                    column_id = column_map.get(header)
-                    if not column_id:
-                        continue
-                    for rule_name in rule_names:
-                        rule_type_id = rule_map.get(rule_name)
-                        if rule_type_id:
-                            validation_data.append((column_id, rule_type_id, json.dumps({})))
-                        else:
-                            logging.warning(f"No rule_type_id found for validation {rule_name}")
-                if validation_data:
-                    cursor.executemany("""
-                        INSERT INTO column_validation_rules (column_id, rule_type_id, rule_config)
-                        VALUES (%s, %s, %s)
-                        ON DUPLICATE KEY UPDATE rule_config = VALUES(rule_config)
-                    """, validation_data)
-                    logging.debug(f"Inserted validation rules: {validation_data}")
+                Template.save_column_rules(conn, session['template_id'], validations, replace=True, active_only=True)
                 conn.commit()
-                cursor.close()
                 session['current_step'] = 3
                 return jsonify({'success': True})
             except Exception as e:
@@ -677,28 +491,17 @@ def save_corrections(step):
         
         if step == 3:
             # Process step 3 corrections
-            df_json = session.get('df')
-            if not df_json:
+            df = SessionManager.load_dataframe()
+            if df is None:
                 return jsonify({'error': 'No data available in session'}), 400
             
-            df = pd.read_json(StringIO(df_json))
             headers = session['headers']
             df.columns = headers
             df = df.iloc[session['header_row'] + 1:].reset_index(drop=True)
             
             # Apply corrections
-            correction_count = 0
-            for column, row_corrections in corrections.items():
-                if column not in headers:
-                    continue
-                for row_str, value in row_corrections.items():
-                    try:
-                        row_index = int(row_str)
-                        if 0 <= row_index < len(df):
-                            df.at[row_index, column] = value
-                            correction_count += 1
-                    except (ValueError, IndexError):
-                        continue
+            applied = DataTransformer.apply_bulk_corrections(df, *DataTransformer.corrections_to_arrays(corrections, headers))
+            correction_count = len(applied['rows'])
             
             # Save corrected file
             template_name = session.get('template_name', 'corrected_file')
@@ -716,24 +519,12 @@ def save_corrections(step):
             history_id = cursor.lastrowid
             
             # Save individual corrections
-            correction_records = []
-            for column, row_corrections in corrections.items():
-                for row_str, corrected_value in row_corrections.items():
-                    try:
-                        row_index = int(row_str)
-                        if 0 <= row_index < len(df):
-                            correction_records.append((
-                                history_id, row_index + 1, column, 'original_value', corrected_value, 'validation_rule'
-                            ))
-                    except (ValueError, IndexError):
-                        continue
-            
-            if correction_records:
-                cursor.executemany("""
-                    INSERT INTO validation_corrections 
-                    (history_id, row_index, column_name, original_value, corrected_value, rule_failed)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, correction_records)
+            correction_records = [
+                (history_id, int(row) + 1, column, str(before), corrected_value, 'validation_rule')
+                for column, row, before, corrected_value in zip(applied['columns'], applied['rows'],
+                                                                applied['before'], applied['values'])
+            ]
+            ValidationHistory.insert_corrections(cursor, correction_records)
             
             conn.commit()
             cursor.close()
@@ -2,13 +2,15 @@ from flask import Blueprint, request, jsonify, session, send_file, current_app,
 import os
 import json
 import pandas as pd
-from io import StringIO
 import logging
 from models.template import Template
 from models.user import User
 from models.validation import ValidationRule, DataValidator
 from services.file_handler import FileHandler
 from config.database import get_db_connection
+from services.session_manager import SessionManager
+from services.rule_registry import RuleRegistry
+from services.cache_manager import CacheManager
 
 templates_bp = Blueprint('templates', __name__)
 
@@ -73,36 +75,8 @@ def submit_step_two():
             return jsonify({'success': False, 'message': 'Session data missing'}), 400
 
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            DELETE FROM column_validation_rules
-            WHERE column_id IN (
-                SELECT column_id FROM template_columns WHERE template_id = %s
-            )
-        """, (template_id,))
-        for header, rules in validations.items():
-            cursor.execute("""
-                SELECT column_id FROM template_columns
-                WHERE template_id = %s AND column_name = %s
-            """, (template_id, header))
-            result = cursor.fetchone()
-            if not result:
-                continue
-            column_id = result[0]
-            for rule_name in rules:
-                cursor.execute("""
-                    SELECT rule_type_id FROM validation_rule_types
-                    WHERE rule_name = %s
-                """, (rule_name,))
-                result = cursor.fetchone()
-                if result:
-                    rule_type_id = result[0]
-                    cursor.execute("""
-                        INSERT IGNORE INTO column_validation_rules (column_id, rule_type_id, rule_config)
-                        VALUES (%s, %s, %s)
-                    """, (column_id, rule_type_id, '{}'))
+        Template.save_column_rules(conn, template_id, validations, replace=True)
         conn.commit()
-        cursor.close()
 
         session['validations'] = validations
         session['current_step'] = 3 if action == 'review' else 2
@@ -134,55 +108,53 @@ def upload():
 
     try:
         from services.file_handler import FileHandler
-        sheets = FileHandler.read_file(file_path)
-        sheet_names = list(sheets.keys())
-        if not sheet_names:
-            return jsonify({'error': 'No sheets found in the file'}), 400
+        with FileHandler.read_file(file_path) as sheets:
+            sheet_names = list(sheets.keys())
+            if not sheet_names:
+                return jsonify({'error': 'No sheets found in the file'}), 400
             
-        sheet_name = sheet_names[0]
-        df = sheets[sheet_name]
-        header_row = FileHandler.find_header_row(df)
-        if header_row == -1:
-            return jsonify({'error': 'Could not detect header row'}), 400
+            # The sheet the step flow works on; every sheet gets its own template below
+            sheet_name = request.form.get('sheet_name') or sheet_names[0]
+            if sheet_name not in sheets:
+                return jsonify({'error': f'Sheet {sheet_name} not found in the file'}), 400
+            df = sheets[sheet_name]
+            header_row = FileHandler.find_header_row(df)
+            if header_row == -1:
+                return jsonify({'error': 'Could not detect header row'}), 400
             
-        headers = df.iloc[header_row].tolist()
-        if not headers or all(not h for h in headers):
-            return jsonify({'error': 'No valid headers found in the file'}), 400
+            headers = df.iloc[header_row].tolist()
+            if not headers or all(not h for h in headers):
+                return jsonify({'error': 'No valid headers found in the file'}), 400
+
+            # Other sheets are only read up to their header row; sheets without one are left out
+            sheet_headers = {}
+            for name in sheet_names:
+                if name == sheet_name:
+                    sheet_headers[name] = headers
+                    continue
+                other_header_row, other_headers = sheets.find_header(name)
+                if other_header_row != -1 and any(other_headers):
+                    sheet_headers[name] = other_headers
     except Exception as e:
         return jsonify({'error': f'Error processing file: {str(e)}'}), 400
 
     # Clear session data
-    for key in ['df', 'header_row', 'headers', 'sheet_name', 'current_step', 'selected_headers', 'validations', 'error_cell_locations', 'data_rows', 'corrected_file_path']:
+    for key in ['df', 'header_row', 'headers', 'sheet_name', 'current_step', 'selected_headers', 'validations', 'error_cell_locations', 'data_rows', 'corrected_file_path', 'file_digest']:
         session.pop(key, None)
 
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        # Check for existing templates - exactly like old.py
-        cursor.execute("""
-            SELECT template_id, headers, sheet_name
-            FROM excel_templates
-            WHERE template_name = %s AND user_id = %s AND status = 'ACTIVE'
-            ORDER BY created_at DESC
-        """, (file.filename, session['user_id']))
-        existing_templates = cursor.fetchall()
+        # Check for existing templates of each sheet
+        sheet_templates = Template.find_sheet_templates(cursor, file.filename, session['user_id'], sheet_headers)
 
-        template_id = None
+        template_id = sheet_templates.get(sheet_name)
         has_existing_rules = False
         validations = {}
         selected_headers = []
 
-        matching_template = None
-        for template in existing_templates:
-            stored_headers = json.loads(template['headers']) if template['headers'] else []
-            stored_sheet_name = template['sheet_name']
-            if stored_headers == headers and stored_sheet_name == sheet_name:
-                matching_template = template
-                break
-
-        if matching_template:
-            template_id = matching_template['template_id']
+        if template_id:
             cursor.execute("""
                 SELECT tc.column_name, vrt.rule_name
                 FROM template_columns tc
@@ -200,25 +172,43 @@ def upload():
                 if column_name not in selected_headers:
                     selected_headers.append(column_name)
             has_existing_rules = len(validations) > 0
-        else:
+
+        rule_counts = {}
+        if sheet_templates:
+            placeholders = ', '.join(['%s'] * len(sheet_templates))
+            cursor.execute(f"""
+                SELECT tc.template_id, COUNT(*) AS rule_count
+                FROM template_columns tc
+                JOIN column_validation_rules cvr ON tc.column_id = cvr.column_id
+                WHERE tc.template_id IN ({placeholders}) AND tc.is_selected = TRUE
+                GROUP BY tc.template_id
+            """, tuple(sheet_templates.values()))
+            rule_counts = {row['template_id']: row['rule_count'] for row in cursor.fetchall()}
+
+        for name, sheet_columns in sheet_headers.items():
+            if name in sheet_templates:
+                continue
             cursor.execute("""
                 INSERT INTO excel_templates (template_name, user_id, sheet_name, headers, is_corrected)
                 VALUES (%s, %s, %s, %s, %s)
-            """, (file.filename, session['user_id'], sheet_name, json.dumps(headers), False))
-            template_id = cursor.lastrowid
-            column_data = [(template_id, header, i + 1, False) for i, header in enumerate(headers)]
+            """, (file.filename, session['user_id'], name, json.dumps(sheet_columns), False))
+            sheet_templates[name] = cursor.lastrowid
+            column_data = [(sheet_templates[name], header, i + 1, False) for i, header in enumerate(sheet_columns)]
             cursor.executemany("""
                 INSERT INTO template_columns (template_id, column_name, column_position, is_selected)
                 VALUES (%s, %s, %s, %s)
             """, column_data)
+        template_id = sheet_templates[sheet_name]
 
         conn.commit()
         cursor.close()
 
         # Set session data - exactly like old.py
         session['file_path'] = file_path
+        # Content hash of the file the session's frame was read from; keys cached validation results
+        session['file_digest'] = sheets.digest
         session['template_id'] = template_id
-        session['df'] = df.to_json()
+        SessionManager.store_dataframe(df)
         session['header_row'] = header_row
         session['headers'] = headers
         session['sheet_name'] = sheet_name
@@ -229,7 +219,14 @@ def upload():
 
         return jsonify({
             'success': True,
-            'sheets': {sheet_name: {'headers': headers}},
+            'sheets': {
+                name: {
+                    'headers': sheet_columns,
+                    'template_id': sheet_templates[name],
+                    'has_existing_rules': rule_counts.get(sheet_templates[name], 0) > 0
+                }
+                for name, sheet_columns in sheet_headers.items()
+            },
             'file_name': file.filename,
             'template_id': template_id,
             'has_existing_rules': has_existing_rules,
@@ -258,9 +255,9 @@ def submit_step_one():
         
         file_path = session['file_path']
         template_id = session['template_id']
-        sheets = FileHandler.read_file(file_path)
-        sheet_name = session.get('sheet_name', list(sheets.keys())[0])
-        df = sheets[sheet_name]
+        with FileHandler.read_file(file_path) as sheets:
+            sheet_name = session.get('sheet_name', list(sheets.keys())[0])
+            df = sheets[sheet_name]
         header_row = FileHandler.find_header_row(df)
         if header_row == -1:
             return jsonify({'success': False, 'message': 'Could not detect header row'}), 400
@@ -274,32 +271,9 @@ def submit_step_one():
         session['current_step'] = 2
 
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE template_columns SET is_selected = FALSE WHERE template_id = %s", (template_id,))
-        for header in headers:
-            cursor.execute("""
-                UPDATE template_columns SET is_selected = TRUE
-                WHERE template_id = %s AND column_name = %s
-            """, (template_id, header))
-            cursor.execute("""
-                SELECT column_id FROM template_columns
-                WHERE template_id = %s AND column_name = %s
-            """, (template_id, header))
-            column_id = cursor.fetchone()[0]
-            for rule_name in validations.get(header, []):
-                cursor.execute("""
-                    SELECT rule_type_id FROM validation_rule_types
-                    WHERE rule_name = %s AND is_custom = FALSE
-                """, (rule_name,))
-                result = cursor.fetchone()
-                if result:
-                    rule_type_id = result[0]
-                    cursor.execute("""
-                        INSERT IGNORE INTO column_validation_rules (column_id, rule_type_id, rule_config)
-                        VALUES (%s, %s, %s)
-                    """, (column_id, rule_type_id, '{}'))
+        Template.mark_selected_columns(conn, template_id, headers)
+        Template.save_column_rules(conn, template_id, validations, builtin_only=True)
         conn.commit()
-        cursor.close()
         return jsonify({'success': True, 'headers': headers, 'validations': validations})
     except Exception as e:
         logging.error(f"Error in step 1: {str(e)}")
@@ -347,15 +321,15 @@ def get_template(template_id, sheet_name):
             logging.warning(f"No headers or file missing for template_id: {template_id}, attempting to read from file")
             if os.path.exists(file_path):
                 try:
-                    sheets = FileHandler.read_file(file_path)
-                    sheet_names = list(sheets.keys())
-                    logging.debug(f"Available sheets: {sheet_names}")
-                    if not sheet_names:
-                        logging.error(f"No sheets found in file {file_path}")
-                        cursor.close()
-                        return jsonify({'error': 'No sheets found in the file'}), 400
-                    actual_sheet_name = stored_sheet_name if stored_sheet_name in sheets else sheet_names[0]
-                    df = sheets[actual_sheet_name]
+                    with FileHandler.read_file(file_path) as sheets:
+                        sheet_names = list(sheets.keys())
+                        logging.debug(f"Available sheets: {sheet_names}")
+                        if not sheet_names:
+                            logging.error(f"No sheets found in file {file_path}")
+                            cursor.close()
+                            return jsonify({'error': 'No sheets found in the file'}), 400
+                        actual_sheet_name = stored_sheet_name if stored_sheet_name in sheets else sheet_names[0]
+                        df = sheets[actual_sheet_name]
                     header_row = FileHandler.find_header_row(df)
                     if header_row == -1:
                         logging.error(f"Could not detect header row in file {file_path}")
@@ -371,8 +345,9 @@ def get_template(template_id, sheet_name):
                     """, (json.dumps(headers), actual_sheet_name, template_id))
                     conn.commit()
                     session['file_path'] = file_path
+                    session['file_digest'] = sheets.digest
                     session['template_id'] = template_id
-                    session['df'] = df.to_json()
+                    SessionManager.store_dataframe(df)
                     session['header_row'] = header_row
                     session['headers'] = headers
                     session['sheet_name'] = actual_sheet_name
@@ -451,36 +426,8 @@ def update_template_rules(template_id):
 
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("SELECT column_id, column_name FROM template_columns WHERE template_id = %s AND is_selected = TRUE", (template_id,))
-        column_map = {row['column_name']: row['column_id'] for row in cursor.fetchall()}
-
-        cursor.execute("SELECT rule_type_id, rule_name FROM validation_rule_types WHERE is_active = TRUE")
-        rule_map = {row['rule_name']: row['rule_type_id'] for row in cursor.fetchall()}
-
-        cursor.execute("DELETE FROM column_validation_rules WHERE column_id IN (SELECT column_id FROM template_columns WHERE template_id = %s AND is_selected = TRUE)", (template_id,))
-
-        validation_data = []
-        for header, rule_names in rules.items():
-            column_id = column_map.get(header)
-            if not column_id:
-                continue
-            for rule_name in rule_names:
-                rule_type_id = rule_map.get(rule_name)
-                if rule_type_id:
-                    validation_data.append((column_id, rule_type_id, json.dumps({})))
-                else:
-                    logging.warning(f"No rule_type_id found for validation {rule_name}")
-        if validation_data:
-            cursor.executemany("""
-                INSERT INTO column_validation_rules (column_id, rule_type_id, rule_config)
-                VALUES (%s, %s, %s)
-                ON DUPLICATE KEY UPDATE rule_config = VALUES(rule_config)
-            """, validation_data)
-            logging.debug(f"Inserted validation rules: {validation_data}")
+        Template.save_column_rules(conn, template_id, rules, replace=True, selected_only=True, active_only=True)
         conn.commit()
-        cursor.close()
         return jsonify({'success': True})
     except Exception as e:
         logging.error(f'Error updating template rules: {str(e)}')
@@ -518,6 +465,9 @@ def delete_template(template_id):
 
         conn.commit()
         cursor.close()
+        # Template-specific rules are removed by ON DELETE CASCADE
+        RuleRegistry.invalidate()
+        CacheManager.invalidate_template(template_id)
         return jsonify({'success': True, 'message': 'Template deleted successfully'})
     except Exception as e:
         logging.error(f'Error deleting template: {str(e)}')
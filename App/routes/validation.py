@@ -1,12 +1,22 @@
-from flask import Blueprint, request, jsonify, session, current_app
+from flask import Blueprint, Response, request, jsonify, session, current_app
 import os
 import json
 import pandas as pd
-from io import StringIO
 import logging
+from models.template import Template, ValidationHistory
 from models.validation import ValidationRule, DataValidator
 from services.file_handler import FileHandler
+from services.data_transformer import DataTransformer
 from config.database import get_db_connection
+from services.session_manager import SessionManager
+from services.streaming_validator import StreamingValidator
+from services.rule_registry import RuleRegistry
+from services.job_queue import JobQueue
+from services.validation_results import ValidationResultStore
+from services.dataframe_store import DataFrameStore
+from services.parsed_file_cache import ParsedFileCache
+from services.cache_manager import CacheManager
+from utils.helpers import DataHelper
 
 validation_bp = Blueprint('validation', __name__)
 
@@ -71,43 +81,8 @@ def handle_step_two_submission():
             return jsonify({'success': False, 'message': 'Session data missing'}), 400
 
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Delete existing rules
-        cursor.execute("""
-            DELETE FROM column_validation_rules
-            WHERE column_id IN (SELECT column_id FROM template_columns WHERE template_id = %s)
-        """, (template_id,))
-        
-        # Insert new rules
-        rules_inserted = 0
-        for header, rules in validations.items():
-            cursor.execute("""
-                SELECT column_id FROM template_columns
-                WHERE template_id = %s AND column_name = %s
-            """, (template_id, header))
-            result = cursor.fetchone()
-            if not result:
-                continue
-            column_id = result[0]
-            
-            for rule_name in rules:
-                cursor.execute("""
-                    SELECT rule_type_id FROM validation_rule_types
-                    WHERE rule_name = %s
-                """, (rule_name,))
-                result = cursor.fetchone()
-                if result:
-                    rule_type_id = result[0]
-                    cursor.execute("""
-                        INSERT IGNORE INTO column_validation_rules (column_id, rule_type_id, rule_config)
-                        VALUES (%s, %s, %s)
-                    """, (column_id, rule_type_id, '{}'))
-                    rules_inserted += 1
-                    logging.info(f"Inserted rule: {header} -> {rule_name}")
-        
+        rules_inserted = Template.save_column_rules(conn, template_id, validations, replace=True)
         conn.commit()
-        cursor.close()
 
         session['validations'] = validations
         session['current_step'] = 3 if action == 'review' else 2
@@ -216,6 +191,7 @@ def create_custom_rule():
         rule_id = cursor.lastrowid
         
         conn.commit()
+        RuleRegistry.invalidate()
         
         # Verify the rule was inserted
         cursor.execute("""
@@ -251,6 +227,81 @@ def create_custom_rule():
             conn.rollback()
         return jsonify({'success': False, 'message': f'Database error: {str(e)}'}), 500
 
+def _get_owned_custom_rule(cursor, rule_id):
+    """Fetch a custom rule that belongs to one of the current user's templates"""
+    cursor.execute("""
+        SELECT vrt.rule_type_id, vrt.rule_name, vrt.template_id, vrt.column_name
+        FROM validation_rule_types vrt
+        JOIN excel_templates et ON vrt.template_id = et.template_id
+        WHERE vrt.rule_type_id = %s AND et.user_id = %s
+    """, (rule_id, session['user_id']))
+    return cursor.fetchone()
+
+@validation_bp.route('/rules/<int:rule_id>', methods=['PUT'])
+def update_rule(rule_id):
+    """Update a template-specific rule"""
+    if 'loggedin' not in session or 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+
+    data = request.get_json() or {}
+    updatable = ['description', 'parameters', 'source_format', 'target_format', 'is_active']
+    updates = {field: data[field] for field in updatable if field in data}
+    if not updates:
+        return jsonify({'success': False, 'message': f"Nothing to update; allowed fields: {', '.join(updatable)}"}), 400
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        if not _get_owned_custom_rule(cursor, rule_id):
+            cursor.close()
+            return jsonify({'success': False, 'message': 'Rule not found'}), 404
+
+        assignments = ', '.join(f"{field} = %s" for field in updates)
+        cursor.execute(f"UPDATE validation_rule_types SET {assignments} WHERE rule_type_id = %s",
+                       (*updates.values(), rule_id))
+        conn.commit()
+        cursor.close()
+        RuleRegistry.invalidate()
+
+        logging.info(f"Updated rule {rule_id}: {list(updates)}")
+        return jsonify({'success': True, 'message': 'Rule updated successfully', 'rule_id': rule_id})
+    except Exception as e:
+        logging.error(f"Database error updating rule {rule_id}: {str(e)}")
+        if 'cursor' in locals():
+            cursor.close()
+        if 'conn' in locals():
+            conn.rollback()
+        return jsonify({'success': False, 'message': f'Database error: {str(e)}'}), 500
+
+@validation_bp.route('/rules/<int:rule_id>', methods=['DELETE'])
+def delete_rule(rule_id):
+    """Delete a template-specific rule and its column assignments"""
+    if 'loggedin' not in session or 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        if not _get_owned_custom_rule(cursor, rule_id):
+            cursor.close()
+            return jsonify({'success': False, 'message': 'Rule not found'}), 404
+
+        # column_validation_rules references rule types with ON DELETE RESTRICT
+        cursor.execute("DELETE FROM column_validation_rules WHERE rule_type_id = %s", (rule_id,))
+        cursor.execute("DELETE FROM validation_rule_types WHERE rule_type_id = %s", (rule_id,))
+        conn.commit()
+        cursor.close()
+        RuleRegistry.invalidate()
+
+        logging.info(f"Deleted rule {rule_id}")
+        return jsonify({'success': True, 'message': 'Rule deleted successfully'})
+    except Exception as e:
+        logging.error(f"Database error deleting rule {rule_id}: {str(e)}")
+        if 'cursor' in locals():
+            cursor.close()
+        if 'conn' in locals():
+            conn.rollback()
+        return jsonify({'success': False, 'message': f'Database error: {str(e)}'}), 500
+
 @validation_bp.route('/rule-configurations', methods=['GET'])
 def get_rule_configurations():
     """Get rule configurations - from original app.py"""
@@ -439,9 +490,9 @@ def get_validation_corrections(history_id):
             cursor.close()
             return jsonify({'error': 'Corrected file not found'}), 404
 
-        sheets = FileHandler.read_file(file_path)
-        sheet_name = list(sheets.keys())[0]
-        df = sheets[sheet_name]
+        with FileHandler.read_file(file_path) as sheets:
+            sheet_name = list(sheets.keys())[0]
+            df = sheets[sheet_name]
         header_row = FileHandler.find_header_row(df)
         if header_row == -1:
             cursor.close()
@@ -568,61 +619,166 @@ def validate_existing_template(template_id):
         logging.warning("Unauthorized access to /validate-existing: session missing")
         return jsonify({'success': False, 'message': 'Not logged in'}), 401
     try:
-        df_json = session.get('df')
-        if not df_json:
+        df = SessionManager.load_dataframe()
+        if df is None:
             logging.error("No data available in session")
             return jsonify({'success': False, 'message': 'No data available'}), 400
-        df = pd.read_json(StringIO(df_json))
         headers = session['headers']
         df.columns = headers
         df = df.iloc[session['header_row'] + 1:].reset_index(drop=True)
 
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT tc.column_name, vrt.rule_name, vrt.source_format
-            FROM template_columns tc
-            JOIN column_validation_rules cvr ON tc.column_id = cvr.column_id
-            JOIN validation_rule_types vrt ON cvr.rule_type_id = vrt.rule_type_id
-            WHERE tc.template_id = %s AND tc.is_selected = TRUE AND vrt.rule_name NOT LIKE 'Transform-Date(%'
-        """, (template_id,))
-        rules = cursor.fetchall()
+        rules = Template.get_validation_rules(cursor, template_id)
         cursor.close()
 
-        error_cell_locations = {}
-        accepted_date_formats = ['%d-%m-%Y', '%m-%d-%Y', '%m/%d/%Y', '%d/%m/%Y', '%m-%Y', '%m-%y', '%m/%Y', '%m/%y']
-        for rule in rules:
-            column_name = rule['column_name']
-            rule_name = rule['rule_name']
-            if rule_name.startswith('Date(') and rule['source_format']:
-                format_map = {
-                    'MM-DD-YYYY': '%m-%d-%Y', 'DD-MM-YYYY': '%d-%m-%Y', 'MM/DD/YYYY': '%m/%d/%Y', 'DD/MM/YYYY': '%d/%m/%Y',
-                    'MM-YYYY': '%m-%Y', 'MM-YY': '%m-%y', 'MM/YYYY': '%m/%Y', 'MM/YY': '%m/%y'
-                }
-                accepted_date_formats = [format_map.get(rule['source_format'], '%d-%m-%Y')]
-            error_count, locations = DataValidator.check_special_characters_in_column(
-                df, column_name, rule_name, accepted_date_formats, check_null_cells=True
-            )
-            if error_count > 0:
-                error_cell_locations[column_name] = [
-                    {'row': loc[0], 'value': loc[1], 'rule_failed': loc[2], 'reason': loc[3]}
-                    for loc in locations
-                ]
-
-        data_rows = df.to_dict('records')
-        for row in data_rows:
-            for key, value in row.items():
-                if pd.isna(value) or value == '':
-                    row[key] = 'NULL'
-
+        # Results depend on the file's content, the rules and which rows of which sheet are data
+        file_digest = session.get('file_digest')
+        fingerprint = DataValidator.rules_fingerprint(rules, session.get('sheet_name'), session['header_row'], headers)
+        index = CacheManager.get_cached_validation_results(template_id, file_digest, fingerprint) if file_digest else None
+        if index is None:
+            index = DataValidator.build_validation_index(df, rules)
+            if file_digest:
+                CacheManager.cache_validation_results(template_id, file_digest, index, fingerprint)
+        else:
+            logging.debug(f"Validation of template {template_id} served from cache")
+        error_cell_locations = index.error_cell_locations()
         logging.info(f"Validation completed for template {template_id}: {len(error_cell_locations)} columns with errors")
+
+        if _wants_full_payload():
+            return jsonify({'success': True, **_full_payload(df, error_cell_locations)})
+
+        # Keep the result server-side and send only the requested (by default the first) page
+        previous_id = session.pop('validation_result_id', None)
+        if previous_id:
+            ValidationResultStore.delete(previous_id)
+        result_id = ValidationResultStore.put(df, error_cell_locations, owner=session['user_id'],
+                                              template_id=template_id, index=index)
+        session['validation_result_id'] = result_id
+        return jsonify({'success': True, **_stored_result_payload(ValidationResultStore.get_meta(result_id))})
+    except Exception as e:
+        logging.error(f"Error validating template {template_id}: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+def _result_query_options():
+    """errors_only and columns query arguments of the result endpoints"""
+    errors_only = request.args.get('errors_only', 'false').lower() in ('1', 'true', 'yes')
+    columns = [col for col in request.args.get('columns', '').split(',') if col]
+    return errors_only, columns or None
+
+def _wants_full_payload():
+    """Legacy clients opt in to every row in one response with format=full"""
+    return request.args.get('format') == 'full'
+
+def _full_payload(df, error_cell_locations):
+    return {
+        'error_cell_locations': error_cell_locations,
+        'data_rows': DataHelper.normalize_data_rows(df.to_dict('records'))
+    }
+
+def _stored_result_payload(meta):
+    """Summary of a stored result and the page the query asks for"""
+    errors_only, columns = _result_query_options()
+    return {
+        'summary': ValidationResultStore.summary(meta),
+        **ValidationResultStore.page(meta, request.args.get('page', 1, type=int),
+                                     request.args.get('page_size', ValidationResultStore.DEFAULT_PAGE_SIZE, type=int),
+                                     errors_only, columns)
+    }
+
+def _get_owned_result(result_id):
+    try:
+        meta = ValidationResultStore.get_meta(result_id)
+    except ValueError:
+        return None
+    if not meta or meta['owner'] != session['user_id']:
+        return None
+    return meta
+
+@validation_bp.route('/validation-results/<result_id>', methods=['GET'])
+def get_validation_result_page(result_id):
+    """One page of a stored validation result (page, page_size, errors_only, columns)"""
+    if 'loggedin' not in session or 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    meta = _get_owned_result(result_id)
+    if not meta:
+        return jsonify({'success': False, 'message': 'Validation result not found'}), 404
+    try:
+        return jsonify({'success': True, **_stored_result_payload(meta)})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'success': False, 'message': str(e)}), 410
+    except Exception as e:
+        logging.error(f"Error reading validation result {result_id}: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@validation_bp.route('/validation-results/<result_id>/ndjson', methods=['GET'])
+def stream_validation_result(result_id):
+    """Stored validation result as newline-delimited JSON, one row per line"""
+    if 'loggedin' not in session or 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    meta = _get_owned_result(result_id)
+    if not meta:
+        return jsonify({'success': False, 'message': 'Validation result not found'}), 404
+    try:
+        errors_only, columns = _result_query_options()
+        lines = ValidationResultStore.iter_ndjson(meta, errors_only, columns)
+        return Response(lines, mimetype='application/x-ndjson')
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'success': False, 'message': str(e)}), 410
+    except Exception as e:
+        logging.error(f"Error streaming validation result {result_id}: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@validation_bp.route('/validation-results/<result_id>', methods=['DELETE'])
+def delete_validation_result(result_id):
+    """Discard a stored validation result"""
+    if 'loggedin' not in session or 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    if not _get_owned_result(result_id):
+        return jsonify({'success': False, 'message': 'Validation result not found'}), 404
+    ValidationResultStore.delete(result_id)
+    if session.get('validation_result_id') == result_id:
+        session.pop('validation_result_id', None)
+    return jsonify({'success': True})
+
+@validation_bp.route('/validation-results/<result_id>/revalidate', methods=['POST'])
+def revalidate_validation_result(result_id):
+    """Apply a corrections delta to a stored result and re-run only the rules it affects"""
+    if 'loggedin' not in session or 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    meta = _get_owned_result(result_id)
+    if not meta:
+        return jsonify({'success': False, 'message': 'Validation result not found'}), 404
+    index = ValidationResultStore.get_index(meta)
+    if index is None:
+        return jsonify({'success': False, 'message': 'Validation result cannot be revalidated; validate again'}), 409
+    try:
+        corrections = (request.get_json(silent=True) or {}).get('corrections', {})
+        if not isinstance(corrections, dict):
+            return jsonify({'success': False, 'message': 'corrections must map columns to {row: value}'}), 400
+        df = DataFrameStore.get(result_id)
+        if df is None:
+            return jsonify({'success': False, 'message': f'Validation result {result_id} has expired'}), 410
+
+        applied = DataTransformer.apply_bulk_corrections(df, *DataTransformer.corrections_to_arrays(corrections))
+        corrected_rows = {column: applied['rows'][applied['columns'] == column]
+                          for column in pd.unique(applied['columns'])}
+        revalidated_columns = DataValidator.revalidate(df, index, corrected_rows)
+        ValidationResultStore.update(meta, df, index)
         return jsonify({
             'success': True,
-            'error_cell_locations': error_cell_locations,
-            'data_rows': data_rows
+            'summary': ValidationResultStore.summary(meta),
+            'corrected_cells': len(applied['rows']),
+            'revalidated_columns': revalidated_columns,
+            # Only the revalidated columns; a column missing here has no errors left
+            'error_cell_locations': index.error_cell_locations(revalidated_columns)
         })
     except Exception as e:
-        logging.error(f"Error validating template {template_id}: {str(e)}")
+        logging.error(f"Error revalidating result {result_id}: {str(e)}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @validation_bp.route('/validate-existing/<int:template_id>', methods=['POST'])
@@ -649,32 +805,19 @@ def save_existing_template_corrections(template_id):
             cursor.close()
             return jsonify({'success': False, 'message': 'Template not found'}), 404
         
-        df_json = session.get('df')
-        if not df_json:
+        df = SessionManager.load_dataframe()
+        if df is None:
             cursor.close()
             return jsonify({'success': False, 'message': 'No data available in session'}), 400
         
-        df = pd.read_json(StringIO(df_json))
         headers = json.loads(template['headers'])
         df.columns = headers
         df = df.iloc[session.get('header_row', 0) + 1:].reset_index(drop=True)
         
-        # Apply corrections
-        correction_count = 0
-        for column, row_corrections in corrections.items():
-            if column not in headers:
-                continue
-            for row_str, value in row_corrections.items():
-                try:
-                    row_index = int(row_str)
-                    if 0 <= row_index < len(df):
-                        original_value = df.at[row_index, column]
-                        df.at[row_index, column] = value
-                        correction_count += 1
-                        logging.info(f"Applied correction: Row {row_index+1}, Column {column}, {original_value} → {value}")
-                except (ValueError, IndexError) as e:
-                    logging.warning(f"Invalid correction: {row_str}, {column}, {value} - {str(e)}")
-                    continue
+        # Apply corrections, keeping the values they replace for the audit records
+        applied = DataTransformer.apply_bulk_corrections(df, *DataTransformer.corrections_to_arrays(corrections, headers))
+        correction_count = len(applied['rows'])
+        logging.info(f"Applied {correction_count} corrections")
         
         # Save corrected file
         base_name, ext = os.path.splitext(template['template_name'])
@@ -696,43 +839,19 @@ def save_existing_template_corrections(template_id):
         history_id = cursor.lastrowid
         
         # Save individual corrections for tracking
-        correction_records = []
-        for column, row_corrections in corrections.items():
-            if column not in headers:
-                continue
-            for row_str, corrected_value in row_corrections.items():
-                try:
-                    row_index = int(row_str)
-                    if 0 <= row_index < len(df):
-                        original_df = pd.read_json(StringIO(session['df']))
-                        original_df.columns = headers
-                        original_df = original_df.iloc[session.get('header_row', 0) + 1:].reset_index(drop=True)
-                        
-                        original_value = str(original_df.at[row_index, column]) if row_index < len(original_df) else 'NULL'
-                        
-                        correction_records.append((
-                            history_id, 
-                            row_index + 1, 
-                            column, 
-                            original_value, 
-                            corrected_value, 
-                            f'{phase}_rule'
-                        ))
-                except (ValueError, IndexError):
-                    continue
-        
-        if correction_records:
-            cursor.executemany("""
-                INSERT INTO validation_corrections 
-                (history_id, row_index, column_name, original_value, corrected_value, rule_failed)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, correction_records)
+        rule_failed = f'{phase}_rule'
+        correction_records = [
+            (history_id, int(row) + 1, column, str(before), corrected_value, rule_failed)
+            for column, row, before, corrected_value in zip(applied['columns'], applied['rows'],
+                                                            applied['before'], applied['values'])
+        ]
+        ValidationHistory.insert_corrections(cursor, correction_records)
         
         conn.commit()
         cursor.close()
         
         # Update session with corrected data for future steps
-        session['corrected_df'] = df.to_json()
+        SessionManager.store_dataframe(df, 'corrected_df')
         session['corrected_file_path'] = corrected_file_path
         
         logging.info(f"Successfully saved {correction_count} corrections for template {template_id}")
@@ -753,6 +872,235 @@ def save_existing_template_corrections(template_id):
             conn.rollback()
         return jsonify({'success': False, 'message': f'Failed to save corrections: {str(e)}'}), 500
 
+@validation_bp.route('/validate-existing/<int:template_id>/stream', methods=['POST'])
+def stream_validate_existing_template(template_id):
+    """Validate the uploaded text file chunk by chunk without loading it into memory"""
+    if 'loggedin' not in session or 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    try:
+        file_path = session.get('file_path')
+        if not file_path or not os.path.exists(file_path):
+            return jsonify({'success': False, 'message': 'No uploaded file available'}), 400
+        if not StreamingValidator.supports(file_path):
+            return jsonify({'success': False, 'message': 'Streaming validation supports CSV, TXT and DAT files only'}), 400
+
+        data = request.get_json(silent=True) or {}
+        corrections = data.get('corrections', {})
+        phase = data.get('phase', 'corrected')
+        chunk_size = int(data.get('chunk_size', StreamingValidator.DEFAULT_CHUNK_SIZE))
+
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT template_id FROM excel_templates WHERE template_id = %s AND user_id = %s",
+                       (template_id, session['user_id']))
+        if not cursor.fetchone():
+            cursor.close()
+            return jsonify({'success': False, 'message': 'Template not found'}), 404
+        rules = Template.get_validation_rules(cursor, template_id)
+        cursor.close()
+
+        output_path, errors_path = StreamingValidator.output_paths(file_path, current_app.config['UPLOAD_FOLDER'], phase)
+        result = StreamingValidator.validate_file(
+            file_path, rules, errors_path, output_path=output_path,
+            corrections=corrections, chunk_size=chunk_size
+        )
+        session['corrected_file_path'] = output_path
+
+        return jsonify({
+            'success': True,
+            'total_rows': result['total_rows'],
+            'error_counts': result['error_counts'],
+            'error_samples': result['error_samples'],
+            'errors_file': os.path.basename(errors_path),
+            'corrected_file_path': output_path,
+            'correction_count': result['correction_count']
+        })
+    except Exception as e:
+        logging.error(f"Error in streaming validation for template {template_id}: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@validation_bp.route('/validate-existing/<int:template_id>/jobs', methods=['POST'])
+def submit_validation_job(template_id):
+    """Queue validation of the uploaded data and return a job id to poll"""
+    if 'loggedin' not in session or 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    try:
+        df = SessionManager.load_dataframe()
+        if df is None:
+            return jsonify({'success': False, 'message': 'No data available'}), 400
+        df.columns = session['headers']
+        df = df.iloc[session['header_row'] + 1:].reset_index(drop=True)
+
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT template_id FROM excel_templates WHERE template_id = %s AND user_id = %s",
+                       (template_id, session['user_id']))
+        if not cursor.fetchone():
+            cursor.close()
+            return jsonify({'success': False, 'message': 'Template not found'}), 404
+        rules = Template.get_validation_rules(cursor, template_id)
+        cursor.close()
+
+        # Workers have no database access; they validate against a copy of the rule metadata
+        # and keep the result in the result store for the owner to page through
+        job_id = JobQueue.submit(DataValidator.run_validation_job, df, rules, RuleRegistry.snapshot(),
+                                 ValidationResultStore.settings(), session['user_id'], template_id,
+                                 owner=session['user_id'], meta={'template_id': template_id, 'rows': len(df)})
+        return jsonify({'success': True, 'job_id': job_id, 'status': 'queued'}), 202
+    except Exception as e:
+        logging.error(f"Error submitting validation job for template {template_id}: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@validation_bp.route('/validate-existing/<int:template_id>/workbook', methods=['POST'])
+def submit_workbook_validation_job(template_id):
+    """Queue one job validating every sheet of the template's workbook against that sheet's template"""
+    if 'loggedin' not in session or 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT template_name FROM excel_templates
+            WHERE template_id = %s AND user_id = %s AND status = 'ACTIVE'
+        """, (template_id, session['user_id']))
+        template = cursor.fetchone()
+        if not template:
+            cursor.close()
+            return jsonify({'success': False, 'message': 'Template not found'}), 404
+
+        file_path = session.get('file_path')
+        if not file_path or os.path.basename(file_path) != template['template_name']:
+            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], template['template_name'])
+        if not os.path.exists(file_path):
+            cursor.close()
+            return jsonify({'success': False, 'message': 'No uploaded file available'}), 400
+
+        # Only header rows are read here; the job parses the sheets
+        skipped = {}
+        sheet_headers = {}
+        with FileHandler.read_file(file_path) as sheets:
+            for sheet_name in sheets:
+                header_row, headers = sheets.find_header(sheet_name)
+                if header_row == -1:
+                    skipped[sheet_name] = 'no_header'
+                else:
+                    sheet_headers[sheet_name] = (header_row, headers)
+        sheet_templates = Template.find_sheet_templates(
+            cursor, template['template_name'], session['user_id'],
+            {sheet_name: headers for sheet_name, (_, headers) in sheet_headers.items()}
+        )
+        rules = Template.get_validation_rules_by_template(cursor, list(sheet_templates.values()))
+        cursor.close()
+
+        sheet_plans = {}
+        for sheet_name, (header_row, headers) in sheet_headers.items():
+            sheet_template_id = sheet_templates.get(sheet_name)
+            if sheet_template_id is None:
+                skipped[sheet_name] = 'no_template'
+            elif not rules[sheet_template_id]:
+                skipped[sheet_name] = 'no_rules'
+            else:
+                sheet_plans[sheet_name] = {'template_id': sheet_template_id, 'header_row': header_row,
+                                           'headers': headers, 'rules': rules[sheet_template_id]}
+        if not sheet_plans:
+            return jsonify({'success': False, 'message': 'No sheet of this workbook has validation rules',
+                            'skipped': skipped}), 400
+
+        job_id = JobQueue.submit(DataValidator.run_workbook_validation_job, file_path, sheet_plans,
+                                 RuleRegistry.snapshot(), ParsedFileCache.settings(),
+                                 ValidationResultStore.settings(), session['user_id'],
+                                 owner=session['user_id'],
+                                 meta={'template_id': template_id, 'sheets': list(sheet_plans)})
+        return jsonify({'success': True, 'job_id': job_id, 'status': 'queued',
+                        'sheets': list(sheet_plans), 'skipped': skipped}), 202
+    except Exception as e:
+        logging.error(f"Error submitting workbook validation job for template {template_id}: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+def _get_owned_job(job_id):
+    try:
+        job = JobQueue.status(job_id)
+    except ValueError:
+        return None
+    if not job or job['owner'] != session['user_id']:
+        return None
+    return job
+
+@validation_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Status and row-level progress of a background job"""
+    if 'loggedin' not in session or 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    job = _get_owned_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@validation_bp.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Result of a finished validation job, in the same shape as GET /validate-existing.
+
+    A workbook job answers with the result id and summary of each sheet under
+    'sheets'; their rows are read through /validation-results/<result_id>.
+    """
+    if 'loggedin' not in session or 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    job = _get_owned_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    if job['status'] == 'failed':
+        return jsonify({'success': False, 'status': 'failed', 'message': job['error']}), 500
+    if job['status'] != 'completed':
+        return jsonify({'success': False, 'status': job['status'], 'progress': job['progress'],
+                        'message': 'Job has not finished yet'}), 409
+    try:
+        result = JobQueue.result(job_id)
+        if 'sheets' in result:
+            sheets = {}
+            for sheet_name, sheet in result['sheets'].items():
+                meta = _get_owned_result(sheet['result_id'])
+                if not meta:
+                    raise LookupError(f"Validation result of sheet {sheet_name} has expired")
+                sheets[sheet_name] = {'template_id': sheet['template_id'],
+                                      'summary': ValidationResultStore.summary(meta)}
+                if _wants_full_payload():
+                    sheets[sheet_name]['error_cell_locations'] = ValidationResultStore.error_cell_locations(meta)
+            return jsonify({'success': True, 'sheets': sheets})
+
+        meta = _get_owned_result(result['result_id'])
+        if not meta:
+            raise LookupError('Validation result has expired')
+        if _wants_full_payload():
+            df = DataFrameStore.get(meta['result_id'])
+            if df is None:
+                raise LookupError('Validation result has expired')
+            return jsonify({'success': True, **_full_payload(df, ValidationResultStore.error_cell_locations(meta))})
+        return jsonify({'success': True, **_stored_result_payload(meta)})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'success': False, 'message': str(e)}), 410
+    except Exception as e:
+        logging.error(f"Error loading result of job {job_id}: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@validation_bp.route('/jobs/<job_id>', methods=['DELETE'])
+def delete_job(job_id):
+    """Cancel a queued job or discard a finished one"""
+    if 'loggedin' not in session or 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+    job = _get_owned_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    if job['status'] == 'completed':
+        # The stored results go with the job
+        result = JobQueue.result(job_id)
+        sheets = result['sheets'].values() if 'sheets' in result else [result]
+        for sheet in sheets:
+            ValidationResultStore.delete(sheet['result_id'])
+    JobQueue.delete(job_id)
+    return jsonify({'success': True})
+
 @validation_bp.route('/validate-row/<int:template_id>', methods=['POST'])
 def validate_row(template_id):
     """Validate single row - from original app.py"""
@@ -864,58 +1212,9 @@ def submit_step_two_validation():
             return jsonify({'success': False, 'message': 'Session data missing'}), 400
 
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Debug: Log current state
         logging.info(f"🔄 Processing rules for template_id: {template_id}")
-        
-        # Get column mapping
-        cursor.execute("SELECT column_id, column_name FROM template_columns WHERE template_id = %s", (template_id,))
-        column_map = {row['column_name']: row['column_id'] for row in cursor.fetchall()}
-        logging.info(f"📋 Column mapping: {column_map}")
-        
-        # Get rule mapping
-        cursor.execute("SELECT rule_type_id, rule_name FROM validation_rule_types WHERE is_active = TRUE")
-        rule_map = {row['rule_name']: row['rule_type_id'] for row in cursor.fetchall()}
-        logging.info(f"⚙️ Available rules: {list(rule_map.keys())}")
-        
-        # Delete existing rules for this template
-        cursor.execute("""
-            DELETE FROM column_validation_rules
-            WHERE column_id IN (
-                SELECT column_id FROM template_columns WHERE template_id = %s
-            )
-        """, (template_id,))
-        deleted_count = cursor.rowcount
-        logging.info(f"🗑️ Deleted {deleted_count} existing validation rules")
-
-        # Insert new rules
-        rules_inserted = 0
-        for header, rule_names in validations.items():
-            column_id = column_map.get(header)
-            if not column_id:
-                logging.warning(f"⚠️ Column '{header}' not found in template_columns")
-                continue
-                
-            logging.info(f"📝 Processing column '{header}' (ID: {column_id}) with rules: {rule_names}")
-            
-            for rule_name in rule_names:
-                rule_type_id = rule_map.get(rule_name)
-                if rule_type_id:
-                    try:
-                        cursor.execute("""
-                            INSERT INTO column_validation_rules (column_id, rule_type_id, rule_config)
-                            VALUES (%s, %s, %s)
-                        """, (column_id, rule_type_id, '{}'))
-                        rules_inserted += 1
-                        logging.info(f"✅ Inserted rule: {header} → {rule_name} (rule_type_id: {rule_type_id})")
-                    except Exception as e:
-                        logging.error(f"❌ Failed to insert rule {rule_name} for column {header}: {str(e)}")
-                else:
-                    logging.error(f"❌ Rule '{rule_name}' not found in validation_rule_types table")
-        
+        rules_inserted = Template.save_column_rules(conn, template_id, validations, replace=True, active_only=True)
         conn.commit()
-        cursor.close()
         logging.info(f"🎉 Step 2 completed successfully. {rules_inserted} rules saved to database.")
 
         # Update session
@@ -5,17 +5,46 @@ Provides business logic and data processing services
 """
 
 from .validator import ValidationService
-from .file_handler import FileHandler
+from .file_handler import FileHandler, LazyWorkbook
 from .data_transformer import DataTransformer
+from .date_parser import DateParser
 from .sftp_handler import SFTPHandler
 from .cache_manager import CacheManager
 from .memory_manager import MemoryManager
+from .validation_engine import ValidationEngine
+from .dataframe_store import DataFrameStore
+from .formula_evaluator import FormulaEvaluator
+from .streaming_validator import StreamingValidator
+from .rule_registry import RuleRegistry
+from .type_inference import TypeInference
+from .job_queue import JobQueue
+from .validation_results import ValidationResultStore
+from .validation_index import ValidationIndex
+from .sftp_pool import SFTPConnectionPool
+from .parsed_file_cache import ParsedFileCache
+from .parallel_validator import ParallelValidator
+from .blob_store import BlobStore
 
 __all__ = [
     'ValidationService',
     'FileHandler', 
+    'LazyWorkbook',
     'DataTransformer',
+    'DateParser',
     'SFTPHandler',
     'CacheManager',
-    'MemoryManager'
+    'MemoryManager',
+    'ValidationEngine',
+    'DataFrameStore',
+    'FormulaEvaluator',
+    'StreamingValidator',
+    'RuleRegistry',
+    'TypeInference',
+    'JobQueue',
+    'ValidationResultStore',
+    'ValidationIndex',
+    'SFTPConnectionPool',
+    'ParsedFileCache',
+    'ParallelValidator',
+    'BlobStore'
 ]
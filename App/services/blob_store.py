@@ -0,0 +1,193 @@
+# services/blob_store.py
+"""
+Compressed, expiring storage of session payloads.
+
+Sessions keep only small values (ids, headers, step state); anything large a
+request wants to carry over to the next one, such as validation results or
+temporary processing data, is pickled, zlib-compressed and written to a blob
+file whose header holds its expiry time. Rewriting a blob with the same
+content only moves its expiry forward, so unchanged payloads are not written
+again, and expired blobs are dropped on read and by a periodic sweep.
+"""
+
+import os
+import time
+import uuid
+import zlib
+import struct
+import pickle
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class BlobStore:
+    """Blob files of compressed pickles with a per-blob expiry"""
+
+    FILE_EXTENSION = '.blob'
+    # Expiry timestamp stored in front of the compressed payload
+    HEADER = struct.Struct('<d')
+    # Fast compression: payloads are mostly repetitive JSON-like rows
+    COMPRESSION_LEVEL = 1
+    DEFAULT_TTL_SECONDS = 24 * 3600
+    # Seconds between sweeps of expired blobs triggered by writes
+    CLEANUP_INTERVAL = 600
+
+    _storage_dir: Optional[str] = None
+    _default_ttl = DEFAULT_TTL_SECONDS
+    # blob id -> digest of its stored payload, to skip rewriting unchanged content
+    _digests: 'OrderedDict[str, str]' = OrderedDict()
+    _max_digests = 4096
+    _last_cleanup = 0.0
+    _stats = {'writes': 0, 'unchanged': 0, 'expired': 0}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, storage_dir: str, default_ttl: int = DEFAULT_TTL_SECONDS):
+        """Set the storage directory and the lifetime of blobs stored without a ttl"""
+        os.makedirs(storage_dir, exist_ok=True)
+        with cls._lock:
+            cls._storage_dir = storage_dir
+            cls._default_ttl = int(default_ttl)
+            cls._digests.clear()
+            cls._last_cleanup = time.time()
+            cls._stats = dict.fromkeys(cls._stats, 0)
+        logging.info(f"Blob store configured at {storage_dir} (default ttl {default_ttl}s)")
+
+    @classmethod
+    def storage_dir(cls) -> str:
+        if cls._storage_dir is None:
+            cls.configure(os.path.join(tempfile.gettempdir(), 'blobs'))
+        return cls._storage_dir
+
+    @classmethod
+    def blob_path(cls, blob_id: str) -> str:
+        # Ids are generated here; reject anything that could escape the storage directory
+        if not blob_id or os.path.basename(blob_id) != blob_id:
+            raise ValueError(f"Invalid blob id: {blob_id}")
+        return os.path.join(cls.storage_dir(), f"{blob_id}{cls.FILE_EXTENSION}")
+
+    @classmethod
+    def put(cls, data: Any, blob_id: Optional[str] = None, ttl: Optional[int] = None) -> str:
+        """Store data under blob_id (a new id if None) for ttl seconds and return the id"""
+        blob_id = blob_id or uuid.uuid4().hex
+        path = cls.blob_path(blob_id)
+        expires_at = time.time() + (cls._default_ttl if ttl is None else ttl)
+        payload = zlib.compress(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), cls.COMPRESSION_LEVEL)
+        digest = hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+        with cls._lock:
+            unchanged = cls._digests.get(blob_id) == digest
+        if unchanged and cls._touch(path, expires_at):
+            with cls._lock:
+                cls._stats['unchanged'] += 1
+            return blob_id
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(cls.HEADER.pack(expires_at))
+            f.write(payload)
+        os.replace(tmp_path, path)
+        with cls._lock:
+            cls._digests[blob_id] = digest
+            cls._digests.move_to_end(blob_id)
+            while len(cls._digests) > cls._max_digests:
+                cls._digests.popitem(last=False)
+            cls._stats['writes'] += 1
+            sweep = time.time() - cls._last_cleanup > cls.CLEANUP_INTERVAL
+            if sweep:
+                cls._last_cleanup = time.time()
+        logging.debug(f"Stored blob {blob_id}: {len(payload)} bytes compressed")
+        if sweep:
+            cls.cleanup()
+        return blob_id
+
+    @classmethod
+    def get(cls, blob_id: str) -> Optional[Any]:
+        """Stored data, or None if the blob is missing or expired"""
+        path = cls.blob_path(blob_id)
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        expires_at = cls.HEADER.unpack_from(raw)[0] if len(raw) >= cls.HEADER.size else 0.0
+        if expires_at <= time.time():
+            cls.delete(blob_id)
+            with cls._lock:
+                cls._stats['expired'] += 1
+            return None
+        try:
+            return pickle.loads(zlib.decompress(raw[cls.HEADER.size:]))
+        except Exception as e:
+            logging.warning(f"Corrupt blob {blob_id}, discarding it: {str(e)}")
+            cls.delete(blob_id)
+            return None
+
+    @classmethod
+    def exists(cls, blob_id: str) -> bool:
+        """Whether the blob is stored and has not expired, without loading it"""
+        expires_at = cls._read_expiry(cls.blob_path(blob_id))
+        return expires_at is not None and expires_at > time.time()
+
+    @classmethod
+    def delete(cls, blob_id: str):
+        with cls._lock:
+            cls._digests.pop(blob_id, None)
+        try:
+            os.remove(cls.blob_path(blob_id))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"Error deleting blob {blob_id}: {str(e)}")
+
+    @classmethod
+    def cleanup(cls):
+        """Delete expired blobs and temp files left by interrupted writes"""
+        now = time.time()
+        directory = cls.storage_dir()
+        removed = 0
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            try:
+                if filename.endswith(cls.FILE_EXTENSION):
+                    expires_at = cls._read_expiry(path)
+                    if expires_at is not None and expires_at <= now:
+                        cls.delete(filename[:-len(cls.FILE_EXTENSION)])
+                        removed += 1
+                elif os.path.isfile(path) and os.path.getmtime(path) < now - cls.CLEANUP_INTERVAL:
+                    os.remove(path)
+            except Exception as e:
+                logging.error(f"Error cleaning up blob {filename}: {str(e)}")
+        with cls._lock:
+            cls._stats['expired'] += removed
+        if removed:
+            logging.info(f"Cleaned up {removed} expired blobs")
+
+    @classmethod
+    def stats(cls) -> Dict:
+        with cls._lock:
+            return dict(cls._stats)
+
+    @classmethod
+    def _touch(cls, path: str, expires_at: float) -> bool:
+        """Move a stored blob's expiry in place; False if the file is gone"""
+        try:
+            with open(path, 'r+b') as f:
+                f.write(cls.HEADER.pack(expires_at))
+            return True
+        except FileNotFoundError:
+            return False
+
+    @classmethod
+    def _read_expiry(cls, path: str) -> Optional[float]:
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(cls.HEADER.size)
+        except FileNotFoundError:
+            return None
+        # A truncated file counts as expired
+        return cls.HEADER.unpack(header)[0] if len(header) == cls.HEADER.size else 0.0
@@ -1,46 +1,266 @@
-import json
+# services/cache_manager.py
+"""
+Process-wide cache of DataFrames and computed results.
+
+Entries are kept in memory in least-recently-used order under a byte budget
+and expire after their TTL. DataFrames are sized with memory_usage(deep=True)
+and other values are held pickled, so the budget counts the bytes actually
+held. With a spill directory configured, entries evicted from memory move to
+disk (under their own byte budget) and are promoted back on their next hit.
+Readers always receive their own copy of a cached value.
+"""
+
+import os
+import time
+import shutil
+import pickle
+import hashlib
 import logging
-from typing import Any, Optional
-from flask import session
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
 
 class CacheManager:
-    @staticmethod
-    def cache_dataframe(df, key: str):
-        """Cache DataFrame in session with compression"""
+    """Byte-bounded LRU cache with TTL and an optional disk tier"""
+
+    DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+    DEFAULT_TTL_SECONDS = 3600
+    SPILL_EXTENSION = '.pkl'
+    VALIDATION_RESULTS_PREFIX = 'validation_results'
+
+    _max_bytes = DEFAULT_MAX_BYTES
+    _default_ttl = DEFAULT_TTL_SECONDS
+    # key -> (value, nbytes, expires_at); value is a DataFrame or pickled bytes
+    _entries: 'OrderedDict[str, tuple]' = OrderedDict()
+    _bytes = 0
+    _spill_dir: Optional[str] = None
+    _spill_max_bytes = 0
+    # key -> (path, nbytes, expires_at) of entries spilled to disk
+    _spilled: 'OrderedDict[str, tuple]' = OrderedDict()
+    _spill_bytes = 0
+    _stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'spills': 0, 'spill_hits': 0}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, max_bytes: int = DEFAULT_MAX_BYTES, default_ttl: int = DEFAULT_TTL_SECONDS,
+                  spill_dir: Optional[str] = None, spill_max_bytes: int = 0):
+        """Set the memory budget, default TTL and disk tier (spill_max_bytes 0 disables it)"""
+        cls.clear()
+        with cls._lock:
+            cls._max_bytes = int(max_bytes)
+            cls._default_ttl = int(default_ttl)
+            cls._spill_max_bytes = int(spill_max_bytes) if spill_dir else 0
+            # One directory per process: entries are process-local, the disk tier included
+            cls._spill_dir = os.path.join(spill_dir, str(os.getpid())) if cls._spill_max_bytes else None
+            cls._stats = dict.fromkeys(cls._stats, 0)
+        if cls._spill_dir:
+            cls._remove_stale_spill_dirs(spill_dir)
+            os.makedirs(cls._spill_dir, exist_ok=True)
+        logging.info(f"Cache configured: {max_bytes / 1024 ** 2:.0f} MB in memory, ttl {default_ttl}s, "
+                     f"{cls._spill_max_bytes / 1024 ** 2:.0f} MB on disk")
+
+    @classmethod
+    def put(cls, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """Cache a value; False if it is larger than the whole memory budget"""
+        if isinstance(value, pd.DataFrame):
+            stored = value.copy()
+            nbytes = int(stored.memory_usage(index=True, deep=True).sum())
+        else:
+            stored = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            nbytes = len(stored)
+        expires_at = time.time() + (cls._default_ttl if ttl is None else ttl)
+
+        spill = []
+        with cls._lock:
+            cls._discard(key)
+            if nbytes > cls._max_bytes:
+                logging.debug(f"Not caching {key}: {nbytes} bytes exceed the cache size")
+                return False
+            cls._entries[key] = (stored, nbytes, expires_at)
+            cls._bytes += nbytes
+            while cls._bytes > cls._max_bytes:
+                evicted_key, (evicted, evicted_bytes, evicted_expiry) = cls._entries.popitem(last=False)
+                cls._bytes -= evicted_bytes
+                cls._stats['evictions'] += 1
+                if cls._spill_dir and evicted_bytes <= cls._spill_max_bytes:
+                    spill.append((evicted_key, evicted, evicted_expiry))
+        for evicted_key, evicted, evicted_expiry in spill:
+            cls._spill(evicted_key, evicted, evicted_expiry)
+        return True
+
+    @classmethod
+    def get(cls, key: str) -> Optional[Any]:
+        """Cached value, from memory or the disk tier; None on a miss"""
+        now = time.time()
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None and entry[2] <= now:
+                cls._discard(key)
+                cls._stats['expirations'] += 1
+                entry = None
+            if entry is not None:
+                cls._entries.move_to_end(key)
+                cls._stats['hits'] += 1
+            spilled = cls._spilled.pop(key, None) if entry is None else None
+            if spilled is not None:
+                cls._spill_bytes -= spilled[1]
+        if entry is not None:
+            return cls._thaw(entry[0])
+        if spilled is None:
+            with cls._lock:
+                cls._stats['misses'] += 1
+            return None
+
+        path, _, expires_at = spilled
         try:
-            # Convert to JSON with compression
-            session[key] = df.to_json(orient='records', date_format='iso')
-            logging.debug(f"Cached DataFrame with key: {key}")
+            with open(path, 'rb') as f:
+                stored = pickle.load(f) if path.endswith(f".frame{cls.SPILL_EXTENSION}") else f.read()
+            os.remove(path)
         except Exception as e:
-            logging.error(f"Error caching DataFrame: {e}")
-    
+            logging.warning(f"Spilled cache entry {key} unreadable: {str(e)}")
+            stored = None
+        with cls._lock:
+            if stored is None or expires_at <= now:
+                cls._stats['expirations' if stored is not None else 'misses'] += 1
+                return None
+            cls._stats['spill_hits'] += 1
+        value = cls._thaw(stored)
+        cls.put(key, value, ttl=expires_at - now)
+        return value
+
+    @classmethod
+    def invalidate(cls, key: str):
+        with cls._lock:
+            cls._discard(key)
+
+    @classmethod
+    def invalidate_prefix(cls, prefix: str):
+        """Drop every entry whose key starts with prefix"""
+        with cls._lock:
+            for key in [key for key in list(cls._entries) + list(cls._spilled) if key.startswith(prefix)]:
+                cls._discard(key)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls._bytes = 0
+            cls._spilled.clear()
+            cls._spill_bytes = 0
+            spill_dir = cls._spill_dir
+        if spill_dir and os.path.isdir(spill_dir):
+            shutil.rmtree(spill_dir, ignore_errors=True)
+            os.makedirs(spill_dir, exist_ok=True)
+
+    @classmethod
+    def stats(cls) -> Dict:
+        with cls._lock:
+            stats = dict(cls._stats)
+            stats.update(entries=len(cls._entries), bytes=cls._bytes, max_bytes=cls._max_bytes,
+                         spilled_entries=len(cls._spilled), spilled_bytes=cls._spill_bytes)
+        return stats
+
+    @staticmethod
+    def cache_dataframe(df: pd.DataFrame, key: str, ttl: Optional[int] = None) -> bool:
+        """Cache a DataFrame; readers get their own copy"""
+        return CacheManager.put(key, df, ttl)
+
     @staticmethod
-    def get_cached_dataframe(key: str):
+    def get_cached_dataframe(key: str) -> Optional[pd.DataFrame]:
         """Retrieve cached DataFrame"""
-        try:
-            if key in session:
-                data = session[key]
-                return pd.read_json(data, orient='records')
-            return None
-        except Exception as e:
-            logging.error(f"Error retrieving cached DataFrame: {e}")
-            return None
-    
+        value = CacheManager.get(key)
+        return value if isinstance(value, pd.DataFrame) else None
+
     @staticmethod
-    def cache_validation_results(template_id: int, results: dict):
-        """Cache validation results for reuse"""
-        cache_key = f"validation_results_{template_id}"
-        session[cache_key] = json.dumps(results)
-        logging.debug(f"Cached validation results for template {template_id}")
-    
+    def cache_validation_results(template_id: int, file_hash: str, results: Any,
+                                 fingerprint: str = '', ttl: Optional[int] = None) -> bool:
+        """Cache validation results of a template over a file's content.
+
+        fingerprint identifies anything else the results depend on (e.g. the rules
+        and the sheet), so a change to those is a different entry.
+        """
+        return CacheManager.put(CacheManager._results_key(template_id, file_hash, fingerprint), results, ttl)
+
     @staticmethod
-    def get_cached_validation_results(template_id: int) -> Optional[dict]:
+    def get_cached_validation_results(template_id: int, file_hash: str, fingerprint: str = '') -> Optional[Any]:
         """Retrieve cached validation results"""
-        cache_key = f"validation_results_{template_id}"
-        if cache_key in session:
+        return CacheManager.get(CacheManager._results_key(template_id, file_hash, fingerprint))
+
+    @staticmethod
+    def invalidate_template(template_id: int):
+        """Drop every cached validation result of a template"""
+        CacheManager.invalidate_prefix(f"{CacheManager.VALIDATION_RESULTS_PREFIX}:{template_id}:")
+
+    @staticmethod
+    def _results_key(template_id: int, file_hash: str, fingerprint: str) -> str:
+        return f"{CacheManager.VALIDATION_RESULTS_PREFIX}:{template_id}:{file_hash}:{fingerprint}"
+
+    @staticmethod
+    def _thaw(stored: Any) -> Any:
+        return stored.copy() if isinstance(stored, pd.DataFrame) else pickle.loads(stored)
+
+    @classmethod
+    def _discard(cls, key: str):
+        """Remove a key from both tiers (caller holds the lock)"""
+        entry = cls._entries.pop(key, None)
+        if entry is not None:
+            cls._bytes -= entry[1]
+        spilled = cls._spilled.pop(key, None)
+        if spilled is not None:
+            cls._spill_bytes -= spilled[1]
             try:
-                return json.loads(session[cache_key])
-            except Exception as e:
-                logging.error(f"Error retrieving cached validation results: {e}")
-                return None
-        return None
\ No newline at end of file
+                os.remove(spilled[0])
+            except OSError:
+                pass
+
+    @classmethod
+    def _spill(cls, key: str, stored: Any, expires_at: float):
+        """Write an entry evicted from memory to the disk tier, evicting the oldest spilled ones"""
+        is_frame = isinstance(stored, pd.DataFrame)
+        name = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        path = os.path.join(cls._spill_dir, f"{name}{'.frame' if is_frame else ''}{cls.SPILL_EXTENSION}")
+        try:
+            with open(path, 'wb') as f:
+                if is_frame:
+                    pickle.dump(stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+                else:
+                    f.write(stored)
+            nbytes = os.path.getsize(path)
+        except Exception as e:
+            logging.warning(f"Could not spill cache entry {key}: {str(e)}")
+            return
+        with cls._lock:
+            if key in cls._entries or nbytes > cls._spill_max_bytes:
+                # Cached again meanwhile, or too large once pickled
+                os.remove(path)
+                return
+            # An older spill of the key had the same path, which now holds this one
+            previous = cls._spilled.pop(key, None)
+            if previous is not None:
+                cls._spill_bytes -= previous[1]
+            cls._spilled[key] = (path, nbytes, expires_at)
+            cls._spill_bytes += nbytes
+            cls._stats['spills'] += 1
+            while cls._spill_bytes > cls._spill_max_bytes:
+                oldest = next(iter(cls._spilled))
+                cls._discard(oldest)
+                cls._stats['evictions'] += 1
+
+    @classmethod
+    def _remove_stale_spill_dirs(cls, spill_dir: str):
+        """Spill directories of processes that no longer run"""
+        if not os.path.isdir(spill_dir):
+            return
+        for name in os.listdir(spill_dir):
+            path = os.path.join(spill_dir, name)
+            if not name.isdigit() or not os.path.isdir(path) or int(name) == os.getpid():
+                continue
+            try:
+                os.kill(int(name), 0)
+            except ProcessLookupError:
+                shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
@@ -1,38 +1,91 @@
 import pandas as pd
+import numpy as np
 import logging
 from datetime import  datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from services.date_parser import DateParser
 
 class DataTransformer:
     @staticmethod
     def apply_corrections_to_dataframe(df: pd.DataFrame, corrections: Dict, headers: List[str]) -> int:
         """Apply user corrections to DataFrame with comprehensive tracking"""
-        correction_count = 0
-        
-        try:
-            for column, row_corrections in corrections.items():
-                if column not in headers:
-                    logging.warning(f"Column {column} not found in headers")
+        columns, rows, values = DataTransformer.corrections_to_arrays(corrections, headers)
+        return len(DataTransformer.apply_bulk_corrections(df, columns, rows, values)['rows'])
+
+    @staticmethod
+    def corrections_to_arrays(corrections: Dict, headers: Optional[List[str]] = None
+                              ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Flatten a {column: {row: value}} payload into (columns, rows, values) arrays.
+
+        Rows are 0-based data rows; keys that are not integers are dropped, as are
+        columns missing from headers when headers are given.
+        """
+        columns, rows, values = [], [], []
+        for column, row_corrections in corrections.items():
+            if headers is not None and column not in headers:
+                logging.warning(f"Column {column} not found in headers")
+                continue
+            if not isinstance(row_corrections, dict):
+                logging.warning(f"Invalid corrections for column {column}: {row_corrections!r}")
+                continue
+            for row_str, corrected_value in row_corrections.items():
+                try:
+                    rows.append(int(row_str))
+                except (TypeError, ValueError):
+                    logging.warning(f"Invalid correction: {row_str}, {column}, {corrected_value}")
                     continue
-                
-                for row_str, corrected_value in row_corrections.items():
-                    try:
-                        row_index = int(row_str)
-                        if row_index < len(df):
-                            original_value = df.at[row_index, column]
-                            df.at[row_index, column] = corrected_value
-                            correction_count += 1
-                            logging.debug(f"Applied correction: Row {row_index}, Column {column}, "
-                                         f"'{original_value}' -> '{corrected_value}'")
-                    except (ValueError, IndexError) as e:
-                        logging.warning(f"Invalid correction: {row_str}, {column}, {corrected_value}: {e}")
-                        continue
-            
-            return correction_count
-            
+                columns.append(column)
+                values.append(corrected_value)
+        return (DataTransformer._object_array(columns), np.asarray(rows, dtype=np.int64),
+                DataTransformer._object_array(values))
+
+    @staticmethod
+    def apply_bulk_corrections(df: pd.DataFrame, columns: Sequence, rows: Sequence, values: Sequence
+                               ) -> Dict[str, np.ndarray]:
+        """Apply corrections given as parallel arrays of column names, 0-based row positions and values.
+
+        Corrections for unknown (or duplicated) columns and rows outside the frame are
+        dropped in one vectorized check, then each column gets a single positional
+        assignment. Returns the applied corrections in input order with the values they
+        replaced: {'columns', 'rows', 'before', 'values'}.
+        """
+        try:
+            columns = DataTransformer._object_array(columns)
+            rows = np.asarray(rows, dtype=np.int64)
+            values = DataTransformer._object_array(values)
+            if not len(columns) == len(rows) == len(values):
+                raise ValueError("columns, rows and values must have the same length")
+
+            unique_columns = df.columns[~df.columns.duplicated(keep=False)]
+            keep = pd.Index(columns).isin(unique_columns) & (rows >= 0) & (rows < len(df))
+            if not keep.all():
+                logging.warning(f"Skipped {int((~keep).sum())} corrections outside the data or its columns")
+                columns, rows, values = columns[keep], rows[keep], values[keep]
+
+            before = np.empty(len(rows), dtype=object)
+            codes, names = pd.factorize(columns)
+            order = np.argsort(codes, kind='stable')
+            groups = np.split(order, np.flatnonzero(np.diff(codes[order])) + 1) if len(order) else []
+            for selected in groups:
+                position = df.columns.get_loc(names[codes[selected[0]]])
+                current = df.iloc[:, position]
+                before[selected] = current.to_numpy(dtype=object)[rows[selected]]
+                # Corrections arrive as text; keep typed columns from coercing or rejecting them
+                if current.dtype != object:
+                    df.isetitem(position, current.astype(object))
+                df.iloc[rows[selected], position] = values[selected]
+
+            logging.debug(f"Applied {len(rows)} corrections to {len(names)} columns")
+            return {'columns': columns, 'rows': rows, 'before': before, 'values': values}
         except Exception as e:
             logging.error(f"Error applying corrections: {str(e)}")
             raise
+
+    @staticmethod
+    def _object_array(items: Sequence) -> np.ndarray:
+        # Built element-wise so list or tuple values stay single cells
+        return np.fromiter(items, dtype=object, count=len(items))
     
     @staticmethod
     def transform_date(value: str, source_format: str, target_format: str) -> str:
@@ -41,33 +94,23 @@ class DataTransformer:
             if pd.isna(value) or not str(value).strip():
                 return value
             
-            value_str = str(value).strip()
-            
-            # Format mapping for common date formats
-            format_map = {
-                'MM-DD-YYYY': '%m-%d-%Y', 'DD-MM-YYYY': '%d-%m-%Y',
-                'MM/DD/YYYY': '%m/%d/%Y', 'DD/MM/YYYY': '%d/%m/%Y',
-                'MM-YYYY': '%m-%Y', 'MM-YY': '%m-%y',
-                'MM/YYYY': '%m/%Y', 'MM/YY': '%m/%y',
-                'YYYY-MM-DD': '%Y-%m-%d', 'YYYY/MM/DD': '%Y/%m/%d'
-            }
-            
-            source_strftime = format_map.get(source_format, '%d-%m-%Y')
-            target_strftime = format_map.get(target_format, '%Y-%m-%d')
-            
-            # Parse source date
-            parsed_date = datetime.strptime(value_str, source_strftime)
-            
-            # Format to target
-            transformed_date = parsed_date.strftime(target_strftime)
-            
-            logging.debug(f"Date transformation: {value_str} ({source_format}) -> "
-                         f"{transformed_date} ({target_format})")
-            return transformed_date
+            source_strftime = DateParser.strftime_format(source_format, '%d-%m-%Y')
+            target_strftime = DateParser.strftime_format(target_format, '%Y-%m-%d')
+            return datetime.strptime(str(value).strip(), source_strftime).strftime(target_strftime)
             
         except ValueError as e:
             logging.warning(f"Date transformation failed for '{value}': {e}")
             return value  # Return original value if transformation fails
         except Exception as e:
             logging.error(f"Unexpected error in date transformation: {e}")
-            return value
\ No newline at end of file
+            return value
+
+    @staticmethod
+    def transform_date_column(series: pd.Series, source_format: str, target_format: str
+                              ) -> Tuple[pd.Series, np.ndarray]:
+        """Transform a whole column of dates, parsing each distinct value once.
+
+        Returns the transformed column and the mask of rows that did not parse, which
+        keep their original value as transform_date does.
+        """
+        return DateParser.transform_column(series, source_format, target_format)
@@ -0,0 +1,123 @@
+# services/dataframe_store.py
+"""
+Server-side DataFrame store.
+
+Uploaded sheets are written once to a binary frame file keyed by an upload id
+and kept in a small in-process LRU, so the session only carries the id and
+each step loads the frame without a JSON round-trip.
+"""
+
+import os
+import time
+import uuid
+import pickle
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import pandas as pd
+
+
+class DataFrameStore:
+    """Per-upload frame files with an in-process LRU of loaded frames"""
+
+    FILE_EXTENSION = '.pkl'
+
+    _storage_dir: Optional[str] = None
+    _max_frames = 8
+    _frames: 'OrderedDict[str, pd.DataFrame]' = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, storage_dir: str, max_frames: int = 8):
+        """Set the storage directory and LRU size"""
+        os.makedirs(storage_dir, exist_ok=True)
+        with cls._lock:
+            cls._storage_dir = storage_dir
+            cls._max_frames = max_frames
+            cls._frames.clear()
+        logging.info(f"DataFrame store configured at {storage_dir} (LRU size {max_frames})")
+
+    @classmethod
+    def storage_dir(cls) -> str:
+        if cls._storage_dir is None:
+            cls.configure(os.path.join(tempfile.gettempdir(), 'frames'))
+        return cls._storage_dir
+
+    @classmethod
+    def frame_path(cls, frame_id: str) -> str:
+        # Ids are generated here; reject anything that could escape the storage directory
+        if not frame_id or os.path.basename(frame_id) != frame_id:
+            raise ValueError(f"Invalid frame id: {frame_id}")
+        return os.path.join(cls.storage_dir(), f"{frame_id}{cls.FILE_EXTENSION}")
+
+    @classmethod
+    def put(cls, df: pd.DataFrame, frame_id: Optional[str] = None) -> str:
+        """Persist a DataFrame and return its id"""
+        frame_id = frame_id or uuid.uuid4().hex
+        path = cls.frame_path(frame_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        # Pickle keeps the parsed cell types exactly (raw sheets mix header
+        # strings and data in the same column, which columnar formats would coerce)
+        df.to_pickle(tmp_path, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        cls._remember(frame_id, df.copy())
+        logging.debug(f"Stored DataFrame {frame_id}, shape: {df.shape}")
+        return frame_id
+
+    @classmethod
+    def get(cls, frame_id: str) -> Optional[pd.DataFrame]:
+        """Load a DataFrame by id; callers receive their own copy"""
+        with cls._lock:
+            df = cls._frames.get(frame_id)
+            if df is not None:
+                cls._frames.move_to_end(frame_id)
+                return df.copy()
+
+        path = cls.frame_path(frame_id)
+        if not os.path.exists(path):
+            logging.warning(f"DataFrame {frame_id} not found in store")
+            return None
+        df = pd.read_pickle(path)
+        cls._remember(frame_id, df)
+        return df.copy()
+
+    @classmethod
+    def delete(cls, frame_id: str):
+        """Remove a DataFrame from memory and disk"""
+        with cls._lock:
+            cls._frames.pop(frame_id, None)
+        try:
+            os.remove(cls.frame_path(frame_id))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"Error deleting stored DataFrame {frame_id}: {str(e)}")
+
+    @classmethod
+    def cleanup(cls, max_age_hours: int = 24):
+        """Delete frame files older than the given age"""
+        cutoff = time.time() - max_age_hours * 3600
+        directory = cls.storage_dir()
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            try:
+                if not os.path.isfile(path) or os.path.getmtime(path) >= cutoff:
+                    continue
+                if filename.endswith(cls.FILE_EXTENSION):
+                    cls.delete(filename[:-len(cls.FILE_EXTENSION)])
+                else:
+                    os.remove(path)  # leftover temp file from an interrupted write
+                logging.info(f"Cleaned up stored DataFrame: {filename}")
+            except Exception as e:
+                logging.error(f"Error cleaning up stored DataFrame {filename}: {str(e)}")
+
+    @classmethod
+    def _remember(cls, frame_id: str, df: pd.DataFrame):
+        with cls._lock:
+            cls._frames[frame_id] = df
+            cls._frames.move_to_end(frame_id)
+            while len(cls._frames) > cls._max_frames:
+                cls._frames.popitem(last=False)
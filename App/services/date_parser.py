@@ -0,0 +1,149 @@
+# services/date_parser.py
+"""
+Whole-column date parsing for Date(...) and Transform-Date(...) rules.
+
+Dates in a column repeat heavily, so each distinct string is parsed once with
+pd.to_datetime(format=..., errors='coerce') and the verdicts or transformed
+strings are mapped back onto the rows. pandas cannot represent years outside
+1677-2262 that datetime.strptime accepts; distinct values it rejects that
+carry a four-digit year are re-checked with strptime so the verdicts match
+the per-cell checks exactly.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.constants import DATE_FORMAT_MAPPING
+
+
+class DateParser:
+    """Vectorized date checks and format conversion over distinct values"""
+
+    # Display formats accepted as transform sources and targets
+    FORMATS = {**DATE_FORMAT_MAPPING, 'YYYY-MM-DD': '%Y-%m-%d', 'YYYY/MM/DD': '%Y/%m/%d'}
+
+    RELATIVE_DATES = ['now', 'today']
+
+    # Upper bound on remembered date verdicts when a cache is shared across calls
+    MAX_CACHED_VERDICTS = 100000
+
+    @staticmethod
+    def strftime_format(display_format: Optional[str], default: Optional[str] = None) -> Optional[str]:
+        """strftime pattern of a display format such as 'DD-MM-YYYY'"""
+        return DateParser.FORMATS.get(display_format, default)
+
+    @staticmethod
+    def is_date(value: str, accepted_formats: List[str]) -> bool:
+        """Check one string against the accepted formats"""
+        if not isinstance(value, str):
+            return False
+        for date_format in accepted_formats:
+            try:
+                datetime.strptime(value, date_format)
+                return True
+            except ValueError:
+                pass
+        return False
+
+    @staticmethod
+    def valid_mask(text: pd.Series, accepted_formats: List[str],
+                   verdict_cache: Optional[Dict[str, bool]] = None) -> np.ndarray:
+        """Check stripped date strings against the accepted formats, parsing each distinct value once.
+
+        verdict_cache may be shared by callers that check the same rule repeatedly
+        (e.g. chunks of one file) so values seen before are not parsed again.
+        """
+        if text.empty:
+            return np.zeros(0, dtype=bool)
+        codes, uniques = pd.factorize(text.to_numpy(dtype=object))
+        uniques = np.asarray(uniques, dtype=object)
+        if verdict_cache is None:
+            return DateParser._valid_uniques(uniques, accepted_formats)[codes]
+
+        if len(verdict_cache) > DateParser.MAX_CACHED_VERDICTS:
+            verdict_cache.clear()
+        cached = pd.Series(uniques).map(verdict_cache).to_numpy(dtype=object)
+        unseen = pd.isna(cached)
+        if unseen.any():
+            verdicts = DateParser._valid_uniques(uniques[unseen], accepted_formats)
+            cached[unseen] = verdicts
+            verdict_cache.update(zip(uniques[unseen], verdicts.tolist()))
+        return cached.astype(bool)[codes]
+
+    @staticmethod
+    def transform_column(series: pd.Series, source_format: str, target_format: str
+                         ) -> Tuple[pd.Series, np.ndarray]:
+        """Rewrite a column of dates from one display format to another.
+
+        Returns the transformed column and the mask of rows that did not parse; those
+        rows, nulls and blank cells keep their original value.
+        """
+        source = DateParser.strftime_format(source_format, '%d-%m-%Y')
+        target = DateParser.strftime_format(target_format, '%Y-%m-%d')
+        values = series.to_numpy(dtype=object)
+        # str() per cell, as transform_date does (astype(str) on a datetime column drops midnight times)
+        text = pd.Series(values, dtype=object).astype(str).str.strip().to_numpy(dtype=object)
+        pending = ~(pd.isna(values) | (text == ''))
+
+        codes, uniques = pd.factorize(text[pending])
+        formatted = DateParser._format_uniques(np.asarray(uniques, dtype=object), source, target)
+        converted = formatted[codes]
+        parsed = ~pd.isna(converted)
+
+        result = values.copy()
+        rows = np.flatnonzero(pending)
+        result[rows[parsed]] = converted[parsed]
+        invalid = np.zeros(len(values), dtype=bool)
+        invalid[rows[~parsed]] = True
+        if invalid.any():
+            logging.warning(f"{int(invalid.sum())} values did not match date format {source_format}")
+        return pd.Series(result, index=series.index, name=series.name, dtype=object), invalid
+
+    @staticmethod
+    def _valid_uniques(uniques: np.ndarray, accepted_formats: List[str]) -> np.ndarray:
+        valid = np.zeros(len(uniques), dtype=bool)
+        for date_format in accepted_formats:
+            pending = np.flatnonzero(~valid)
+            if not len(pending):
+                break
+            parsed = DateParser._parse(uniques[pending], date_format)
+            valid[pending] = ~pd.isna(parsed)
+        for i in DateParser._out_of_bounds_candidates(uniques, valid, accepted_formats):
+            valid[i] = DateParser.is_date(uniques[i], accepted_formats)
+        return valid
+
+    @staticmethod
+    def _format_uniques(uniques: np.ndarray, source: str, target: str) -> np.ndarray:
+        """Distinct values rewritten to the target format, None where they do not parse"""
+        formatted = np.full(len(uniques), None, dtype=object)
+        if not len(uniques):
+            return formatted
+        parsed = DateParser._parse(uniques, source)
+        ok = ~pd.isna(parsed)
+        formatted[ok] = parsed[ok].strftime(target).to_numpy(dtype=object)
+        for i in DateParser._out_of_bounds_candidates(uniques, ok, [source]):
+            try:
+                formatted[i] = datetime.strptime(uniques[i], source).strftime(target)
+            except ValueError:
+                pass
+        return formatted
+
+    @staticmethod
+    def _parse(values: np.ndarray, date_format: str) -> pd.DatetimeIndex:
+        parsed = pd.DatetimeIndex(pd.to_datetime(values, format=date_format, errors='coerce'))
+        # pandas reads these as the current time whatever the format; strptime rejects them
+        relative = np.isin(values, DateParser.RELATIVE_DATES)
+        return parsed.where(~relative, pd.NaT) if relative.any() else parsed
+
+    @staticmethod
+    def _out_of_bounds_candidates(uniques: np.ndarray, valid: np.ndarray, accepted_formats: List[str]) -> np.ndarray:
+        """Rejected values that strptime may still accept: a %Y format and a four-digit run"""
+        if valid.all() or not any('%Y' in date_format for date_format in accepted_formats):
+            return np.zeros(0, dtype=np.int64)
+        rejected = np.flatnonzero(~valid)
+        has_year = pd.Series(uniques[rejected], dtype=object).str.contains(r'\d{4}', regex=True).to_numpy(dtype=bool)
+        return rejected[has_year]
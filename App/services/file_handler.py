@@ -1,49 +1,72 @@
 import pandas as pd
+import numpy as np
 import os
 import csv
 import io
 import logging
+from collections.abc import Mapping
+from datetime import date, datetime, timedelta
 from typing import Dict, Tuple, List, Optional
+from pandas.io.parsers import TextParser
 from openpyxl import Workbook
-from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 from openpyxl.utils import get_column_letter
+from utils.constants import MAX_HEADER_DETECTION_ROWS
+from services.parsed_file_cache import ParsedFileCache
+
+try:
+    import python_calamine
+except ImportError:  # optional faster Excel reader
+    python_calamine = None
 
 class FileHandler:
+    # Frames with at least this many cells are written with the streaming writer
+    STREAMING_EXCEL_CELLS = 500000
+    # Rows converted per block by the streaming writer
+    EXCEL_WRITE_CHUNK_ROWS = 20000
+
     @staticmethod
-    def read_file(file_path: str) -> Dict[str, pd.DataFrame]:
-        """Read file and return dictionary of DataFrames by sheet name - from original app.py"""
+    def read_file(file_path: str, engine: Optional[str] = None, use_cache: bool = True) -> 'LazyWorkbook':
+        """Open a file as a mapping of sheet name to DataFrame; sheets are parsed when first accessed"""
         try:
             logging.debug(f"Reading file: {file_path}")
-            if file_path.endswith('.xlsx') or file_path.endswith('.xls'):
-                xl = pd.ExcelFile(file_path)
-                logging.debug(f"Excel file detected, sheets: {xl.sheet_names}")
-                sheets = {sheet_name: pd.read_excel(file_path, sheet_name=sheet_name, header=None) 
-                         for sheet_name in xl.sheet_names}
-                return sheets
-            elif file_path.endswith(('.txt', '.csv', '.dat')):
-                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                    content = f.read()
-                if not content.strip():
-                    logging.error("File is empty")
-                    raise ValueError("File is empty.")
-                try:
-                    dialect = csv.Sniffer().sniff(content[:1024])
-                    sep = dialect.delimiter
-                    logging.debug(f"CSV file detected, delimiter: {sep}")
-                except:
-                    sep = FileHandler.detect_delimiter(file_path)
-                    logging.debug(f"Delimiter detection failed, using fallback: {sep}")
-                df = pd.read_csv(file_path, header=None, sep=sep, encoding='utf-8', quotechar='"', engine='python')
-                df.columns = [str(col) for col in df.columns]
-                logging.debug(f"CSV file read, shape: {df.shape}")
-                return {'Sheet1': df}
-            else:
-                logging.error("Unsupported file type")
-                raise ValueError("Unsupported file type.")
+            return LazyWorkbook(file_path, engine, use_cache)
         except Exception as e:
             logging.error(f"Error reading file {file_path}: {str(e)}")
             raise ValueError(f"Error reading file: {str(e)}")
 
+    @staticmethod
+    def read_text_file(file_path: str, nrows: Optional[int] = None, sep: Optional[str] = None) -> pd.DataFrame:
+        """Read a delimited text file without a header row, optionally only its first rows"""
+        sep = sep or FileHandler.sniff_delimiter(file_path)
+        try:
+            df = pd.read_csv(file_path, header=None, sep=sep, encoding='utf-8', quotechar='"', engine='c',
+                             nrows=nrows)
+        except pd.errors.ParserError:
+            logging.debug("C parser failed, retrying with the python engine")
+            df = pd.read_csv(file_path, header=None, sep=sep, encoding='utf-8', quotechar='"', engine='python',
+                             nrows=nrows)
+        df.columns = [str(col) for col in df.columns]
+        logging.debug(f"CSV file read, shape: {df.shape}")
+        return df
+
+    @staticmethod
+    def sniff_delimiter(file_path: str, sample_size: int = 64 * 1024) -> str:
+        """Detect the delimiter of a text file from a small prefix instead of the whole file"""
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read(sample_size)
+        if not content.strip():
+            logging.error("File is empty")
+            raise ValueError("File is empty.")
+        try:
+            dialect = csv.Sniffer().sniff(content[:1024])
+            sep = dialect.delimiter
+            logging.debug(f"CSV file detected, delimiter: {sep}")
+        except csv.Error:
+            sep = FileHandler.detect_delimiter(file_path)
+            logging.debug(f"Delimiter detection failed, using fallback: {sep}")
+        return sep
+
     @staticmethod
     def detect_delimiter(file_path: str) -> str:
         """Intelligent delimiter detection for CSV files - from original app.py"""
@@ -99,7 +122,7 @@ class FileHandler:
             corrected_file_path = os.path.join(upload_folder, corrected_filename)
             
             if ext.lower() == '.xlsx':
-                df.to_excel(corrected_file_path, index=False, sheet_name=sheet_name or 'Sheet1')
+                FileHandler.write_excel(df, corrected_file_path, sheet_name or 'Sheet1')
                 logging.info(f"Saved Excel file: {corrected_file_path}")
             else:
                 df.to_csv(corrected_file_path, index=False)
@@ -110,30 +133,30 @@ class FileHandler:
             logging.error(f"Error saving corrected file: {str(e)}")
             raise
 
+    @staticmethod
+    def write_excel(df: pd.DataFrame, file_path: str, sheet_name: str = 'Sheet1', streaming: Optional[bool] = None):
+        """Write df to an .xlsx file, streaming it when the frame is large (see STREAMING_EXCEL_CELLS)"""
+        if streaming is None:
+            streaming = df.size >= FileHandler.STREAMING_EXCEL_CELLS
+        if streaming:
+            FileHandler.create_excel_with_formatting(df, file_path, sheet_name)
+        else:
+            df.to_excel(file_path, index=False, sheet_name=sheet_name)
+
     @staticmethod
     def create_excel_with_formatting(df: pd.DataFrame, file_path: str, sheet_name: str = 'Sheet1'):
-        """Create Excel file with proper formatting and error handling"""
+        """Create Excel file row by row in openpyxl write-only mode, with illegal characters removed"""
         try:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = sheet_name
-            
-            # Write headers
-            for col_idx, header in enumerate(df.columns, 1):
-                ws.cell(row=1, column=col_idx, value=str(header))
+            # A write-only workbook streams rows to disk instead of keeping a cell object per value
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet(title=sheet_name)
+            ws.append([str(header) for header in df.columns])
             
-            # Write data with error handling for illegal characters
-            for row_idx, row in enumerate(df.itertuples(index=False), 2):
-                for col_idx, value in enumerate(row, 1):
-                    try:
-                        # Handle illegal characters in Excel
-                        if isinstance(value, str):
-                            # Remove illegal characters for XML
-                            value = ''.join(char for char in value if ord(char) >= 32 or char in ['\t', '\n', '\r'])
-                        ws.cell(row=row_idx, column=col_idx, value=value)
-                    except IllegalCharacterError:
-                        # Replace with cleaned string
-                        ws.cell(row=row_idx, column=col_idx, value=str(value).encode('ascii', 'ignore').decode('ascii'))
+            for start in range(0, len(df), FileHandler.EXCEL_WRITE_CHUNK_ROWS):
+                chunk = df.iloc[start:start + FileHandler.EXCEL_WRITE_CHUNK_ROWS]
+                columns = [FileHandler._excel_values(chunk.iloc[:, i]) for i in range(chunk.shape[1])]
+                for row in zip(*columns):
+                    ws.append(row)
             
             wb.save(file_path)
             logging.info(f"Excel file saved successfully: {file_path}")
@@ -141,6 +164,23 @@ class FileHandler:
             logging.error(f"Error creating Excel file: {str(e)}")
             raise
 
+    @staticmethod
+    def _excel_values(column: pd.Series) -> list:
+        """Cell values of a column for openpyxl: missing values as None, strings without XML-illegal characters"""
+        missing = column.isna().to_numpy()
+        values = column.to_numpy(dtype=object, copy=True)
+        if column.dtype == object:
+            is_str = np.fromiter((isinstance(value, str) for value in values), dtype=bool, count=len(values))
+            if is_str.any():
+                strings = pd.Series(values[is_str])
+                # Control characters other than tab, newline and carriage return are not allowed in XML
+                dirty = strings.str.contains(ILLEGAL_CHARACTERS_RE, regex=True).to_numpy()
+                if dirty.any():
+                    positions = np.flatnonzero(is_str)[dirty]
+                    values[positions] = strings[dirty].str.replace(ILLEGAL_CHARACTERS_RE, '', regex=True).to_numpy()
+        values[missing] = None
+        return values.tolist()
+
     @staticmethod
     def validate_file_size(file_path: str, max_size_mb: int = 100) -> bool:
         """Validate file size"""
@@ -233,3 +273,181 @@ class FileHandler:
         except Exception as e:
             logging.error(f"Error creating backup: {str(e)}")
             raise
+
+
+class LazyWorkbook(Mapping):
+    """Sheets of an uploaded file, parsed once each and only when accessed.
+
+    The workbook itself is opened once. Excel files are read with calamine
+    when python-calamine is installed, falling back to pandas' own readers
+    for a workbook or sheet calamine cannot handle; cells are converted the
+    same way pd.read_excel converts them, so both engines give the same frames.
+    Text files are a single sheet named Sheet1.
+
+    With use_cache, parsed sheets are kept in the ParsedFileCache under the
+    hash of the file's bytes; a file seen before is not even opened unless
+    one of its sheets has not been parsed yet.
+    """
+
+    EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+    TEXT_EXTENSIONS = ('.txt', '.csv', '.dat')
+    TEXT_SHEET_NAME = 'Sheet1'
+
+    def __init__(self, file_path: str, engine: Optional[str] = None, use_cache: bool = True):
+        self.file_path = file_path
+        self.delimiter = None
+        self.digest = None
+        self._requested_engine = engine
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._calamine = None
+        self._excel = None
+        self._opened = False
+        if not file_path.lower().endswith(self.TEXT_EXTENSIONS + self.EXCEL_EXTENSIONS):
+            logging.error("Unsupported file type")
+            raise ValueError("Unsupported file type.")
+
+        if use_cache:
+            self.digest = ParsedFileCache.digest(file_path)
+            cached = ParsedFileCache.get_workbook(self.digest)
+            if cached is not None:
+                self.engine = 'cache'
+                self._sheet_names = cached['sheet_names']
+                self.delimiter = cached['delimiter']
+                logging.debug(f"Parsed file cache hit for {file_path}, sheets: {self._sheet_names}")
+                return
+        self._open()
+        if self.digest is not None:
+            ParsedFileCache.put_workbook(self.digest, self._sheet_names, self.delimiter)
+
+    def _open(self):
+        """Open the file itself, once, for a sheet the cache does not have"""
+        self._opened = True
+        file_path, engine = self.file_path, self._requested_engine
+        if file_path.lower().endswith(self.TEXT_EXTENSIONS):
+            self.engine = 'text'
+            self.delimiter = self.delimiter or FileHandler.sniff_delimiter(file_path)
+            self._sheet_names = [self.TEXT_SHEET_NAME]
+        else:
+            self.engine = 'pandas'
+            if engine in (None, 'calamine') and python_calamine is not None:
+                try:
+                    self._calamine = python_calamine.CalamineWorkbook.from_path(file_path)
+                    self.engine = 'calamine'
+                except Exception as e:
+                    logging.warning(f"calamine could not open {file_path}, using pandas: {str(e)}")
+            if self._calamine is not None:
+                self._sheet_names = list(self._calamine.sheet_names)
+            else:
+                self._excel = pd.ExcelFile(file_path)
+                self._sheet_names = list(self._excel.sheet_names)
+            logging.debug(f"Excel file detected ({self.engine}), sheets: {self._sheet_names}")
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self._sheet_names)
+
+    def __getitem__(self, sheet_name: str) -> pd.DataFrame:
+        if sheet_name not in self._frames:
+            if sheet_name not in self._sheet_names:
+                raise KeyError(sheet_name)
+            self._frames[sheet_name] = self._load(sheet_name)
+        return self._frames[sheet_name]
+
+    def __iter__(self):
+        return iter(self._sheet_names)
+
+    def __len__(self) -> int:
+        return len(self._sheet_names)
+
+    def __contains__(self, sheet_name) -> bool:
+        return sheet_name in self._sheet_names
+
+    def head(self, sheet_name: Optional[str] = None, nrows: int = MAX_HEADER_DETECTION_ROWS) -> pd.DataFrame:
+        """First rows of a sheet, without parsing the rest of it unless it is already loaded"""
+        sheet_name = self._sheet_names[0] if sheet_name is None else sheet_name
+        if sheet_name in self._frames:
+            return self._frames[sheet_name].iloc[:nrows]
+        if sheet_name not in self._sheet_names:
+            raise KeyError(sheet_name)
+        if self.digest is not None:
+            cached = ParsedFileCache.get_sheet(self.digest, self._sheet_names.index(sheet_name))
+            if cached is not None:
+                self._frames[sheet_name] = cached[0]
+                return self._frames[sheet_name].iloc[:nrows]
+        return self._parse(sheet_name, nrows)
+
+    def find_header(self, sheet_name: Optional[str] = None) -> Tuple[int, List]:
+        """Header row index and header values of a sheet, read from its first rows only"""
+        sheet_name = self._sheet_names[0] if sheet_name is None else sheet_name
+        if self.digest is not None and sheet_name in self._sheet_names and sheet_name not in self._frames:
+            cached = ParsedFileCache.get_header_row(self.digest, self._sheet_names.index(sheet_name))
+            if cached is not None:
+                return cached
+        head = self.head(sheet_name)
+        header_row = FileHandler.find_header_row(head)
+        if header_row == -1:
+            return -1, []
+        return header_row, head.iloc[header_row].tolist()
+
+    def close(self):
+        if self._calamine is not None:
+            self._calamine.close()
+        if self._excel is not None:
+            self._excel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _load(self, sheet_name: str) -> pd.DataFrame:
+        """Whole sheet from the parsed file cache, or parsed and then cached"""
+        if self.digest is None:
+            return self._parse(sheet_name)
+        sheet_index = self._sheet_names.index(sheet_name)
+        cached = ParsedFileCache.get_sheet(self.digest, sheet_index)
+        if cached is not None:
+            return cached[0]
+        df = self._parse(sheet_name)
+        ParsedFileCache.put_sheet(self.digest, sheet_index, df, FileHandler.find_header_row(df))
+        return df
+
+    def _parse(self, sheet_name: str, nrows: Optional[int] = None) -> pd.DataFrame:
+        if not self._opened:
+            self._open()
+        try:
+            if self.engine == 'text':
+                return FileHandler.read_text_file(self.file_path, nrows, self.delimiter)
+            if self._calamine is not None:
+                try:
+                    return self._parse_calamine(sheet_name, nrows)
+                except Exception as e:
+                    logging.warning(f"calamine failed on sheet {sheet_name} of {self.file_path}, "
+                                    f"using pandas: {str(e)}")
+            if self._excel is None:
+                self._excel = pd.ExcelFile(self.file_path)
+            return self._excel.parse(sheet_name, header=None, nrows=nrows)
+        except Exception as e:
+            logging.error(f"Error reading sheet {sheet_name} of {self.file_path}: {str(e)}")
+            raise ValueError(f"Error reading file: {str(e)}")
+
+    def _parse_calamine(self, sheet_name: str, nrows: Optional[int] = None) -> pd.DataFrame:
+        rows = self._calamine.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False, nrows=nrows)
+        if not rows:
+            return pd.DataFrame()
+        data = [[LazyWorkbook._convert_cell(value) for value in row] for row in rows]
+        # The parser pd.read_excel hands sheet data to, for the same NA handling and dtype inference
+        return TextParser(data, header=None).read()
+
+    @staticmethod
+    def _convert_cell(value):
+        """Cell value as pandas' Excel readers return it"""
+        if isinstance(value, float):
+            as_int = int(value) if np.isfinite(value) else None
+            return as_int if as_int == value else value
+        if isinstance(value, (datetime, date)):
+            return pd.Timestamp(value)
+        if isinstance(value, timedelta):
+            return pd.Timedelta(value)
+        return value
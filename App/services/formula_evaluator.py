@@ -0,0 +1,328 @@
+# services/formula_evaluator.py
+"""
+Compiled evaluation of custom column formulas.
+
+Formulas such as 'total' = 'price' * 'qty' or 'end' >= 'start' are parsed
+once into an AST, checked against a whitelist of numeric operations and
+evaluated over whole columns with NumPy. Compiled formulas are cached by
+their text, so validating the same template again skips parsing entirely.
+"""
+
+import re
+import ast
+import math
+import logging
+from functools import lru_cache
+from typing import List, Tuple, Dict, Callable
+
+import numpy as np
+import pandas as pd
+
+from services.validation_engine import ValidationEngine
+
+
+class CompiledFormula:
+    """A whitelisted formula expression bound to the columns it references"""
+
+    def __init__(self, expression: str, columns: List[str], placeholders: List[str],
+                 evaluate: Callable, code):
+        self.expression = expression
+        self.columns = columns
+        self.placeholders = placeholders
+        self.evaluate = evaluate
+        self.code = code
+
+    def evaluate_rows(self, numbers: Dict[str, np.ndarray], rows: np.ndarray) -> Tuple[np.ndarray, Dict[int, str]]:
+        """Evaluate the formula for the given row positions; returns (expected, {row: error})"""
+        env = {placeholder: numbers[column][rows] for placeholder, column in zip(self.placeholders, self.columns)}
+        try:
+            with np.errstate(all='ignore'):
+                expected = np.asarray(self.evaluate(env), dtype=float)
+            expected = np.broadcast_to(expected, rows.shape).copy()
+            exact = ~np.isfinite(expected)
+        except Exception:
+            expected = np.full(rows.shape, np.nan)
+            exact = np.ones(rows.shape, dtype=bool)
+
+        # Non-finite results (division by zero, overflow, complex powers, inf inputs) are
+        # re-evaluated per row so they fail or pass exactly as plain Python arithmetic does
+        errors = {}
+        for k in np.flatnonzero(exact):
+            row_env = {placeholder: float(env[placeholder][k]) for placeholder in self.placeholders}
+            try:
+                expected[k] = float(eval(self.code, {"__builtins__": {}}, row_env))
+            except Exception as eval_err:
+                errors[int(rows[k])] = str(eval_err)
+        return expected, errors
+
+
+class FormulaEvaluator:
+    """Vectorized evaluation of arithmetic and comparison column rules"""
+
+    BINARY_OPERATORS = {
+        ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide,
+        ast.FloorDiv: np.floor_divide, ast.Mod: np.remainder
+    }
+    COMPARE_OPERATORS = {
+        ast.Eq: np.equal, ast.NotEq: np.not_equal, ast.Lt: np.less,
+        ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal
+    }
+    RULE_OPERATORS = {
+        '=': np.equal, '>': np.greater, '<': np.less, '>=': np.greater_equal, '<=': np.less_equal
+    }
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def compile_expression(expression: str) -> CompiledFormula:
+        """Parse and whitelist the right-hand side of an arithmetic formula (cached by text)"""
+        columns, placeholders = [], []
+
+        def placeholder_for(match):
+            column = match.group(1).strip().lower()
+            if column not in columns:
+                columns.append(column)
+                placeholders.append(f"col_{len(columns) - 1}")
+            return placeholders[columns.index(column)]
+
+        source = re.sub(r"'([^']+)'", placeholder_for, expression)
+        source = source.replace(" AND ", " and ").replace(" OR ", " or ")
+        try:
+            tree = ast.parse(source.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Invalid formula syntax: {e.msg}")
+
+        evaluate = FormulaEvaluator._build(tree.body, set(placeholders))
+        code = compile(tree, '<formula>', 'eval')
+        logging.debug(f"Compiled formula {expression!r} over columns {columns}")
+        return CompiledFormula(expression, columns, placeholders, evaluate, code)
+
+    @staticmethod
+    def evaluate_column_rule(df: pd.DataFrame, column_name: str, formula: str) -> Tuple[bool, List[Tuple[int, str, str, str]]]:
+        """Evaluate a custom column formula and return (valid, error_locations)"""
+        error_locations = []
+        try:
+            column_name = column_name.strip().lower()
+            if column_name not in df.columns.str.lower():
+                return False, [(0, "", "ColumnNotFound", f"Column '{column_name}' not found in data")]
+
+            if ' = ' in formula:
+                formula_parts = formula.strip().split(' = ', 1)
+                if len(formula_parts) != 2 or formula_parts[0] != f"'{column_name}'":
+                    return False, [(0, "", "InvalidFormula", "Arithmetic formula must be 'column_name = expression'")]
+                error_locations = FormulaEvaluator._check_arithmetic(df, column_name, formula_parts[1])
+            else:
+                parts = formula.strip().split(' ', 2)
+                if len(parts) != 3 or parts[0] != f"'{column_name}'" or parts[1] not in FormulaEvaluator.RULE_OPERATORS:
+                    return False, [(0, "", "InvalidFormula", "Comparison formula must be 'column_name <operator> operand'")]
+                error_locations = FormulaEvaluator._check_comparison(df, column_name, parts[1], parts[2])
+
+            return not error_locations, error_locations
+        except Exception as e:
+            return False, error_locations + [(0, "", "FormulaEvaluation", f"Error evaluating formula for column {column_name}: {str(e)}")]
+
+    @staticmethod
+    def _check_arithmetic(df: pd.DataFrame, column_name: str, right_side: str) -> List[Tuple]:
+        referenced_columns = [item.strip().lower() for item in re.findall(r"'([^']+)'", right_side)]
+        for col in referenced_columns:
+            if col not in df.columns.str.lower():
+                return [(0, "", "ColumnNotFound", f"Referenced column '{col}' not found in data")]
+
+        try:
+            compiled = FormulaEvaluator.compile_expression(right_side)
+        except ValueError as e:
+            return [(0, "", "InvalidFormula", str(e))]
+
+        # All referenced columns and the target column must hold numbers
+        error_locations = []
+        parsed = {}
+        has_error = np.zeros(len(df), dtype=bool)
+        for col in referenced_columns + [column_name]:
+            if col not in parsed:
+                parsed[col] = FormulaEvaluator._numeric(df[col])
+            blank, invalid, _, raw = parsed[col]
+            for i in np.flatnonzero(blank | invalid):
+                if blank[i]:
+                    error_locations.append((int(i) + 1, "NULL", f"{column_name}_Formula", f"Value is null or empty in column {col}"))
+                else:
+                    error_locations.append((int(i) + 1, str(raw[i]), f"{column_name}_DataType", f"Invalid numeric value in column {col}: {raw[i]}"))
+            has_error |= blank | invalid
+
+        rows = np.flatnonzero(~has_error)
+        if len(rows) == 0:
+            return error_locations
+
+        numbers = {col: values[2] for col, values in parsed.items()}
+        expected, eval_errors = compiled.evaluate_rows(numbers, rows)
+        actual = numbers[column_name][rows]
+        with np.errstate(invalid='ignore'):
+            mismatch = np.abs(actual - expected) > 1e-10
+        raw_actual = parsed[column_name][3]
+
+        for k in np.flatnonzero(mismatch | np.isin(rows, list(eval_errors))):
+            i = int(rows[k])
+            if i in eval_errors:
+                error_locations.append((i + 1, "", "FormulaEvaluation", f"Error evaluating formula for row {i+1}: {eval_errors[i]}"))
+                continue
+            actual_value = str(raw_actual[i]).strip()
+            expected_value = str(float(expected[k]))
+            error_locations.append((i + 1, actual_value, f"{column_name}_Formula",
+                                    f"Data Error: {column_name} ({actual_value}) does not match formula {right_side} ({expected_value})"))
+        return error_locations
+
+    @staticmethod
+    def _check_comparison(df: pd.DataFrame, column_name: str, operator_str: str, operand: str) -> List[Tuple]:
+        op_func = FormulaEvaluator.RULE_OPERATORS[operator_str]
+        blank, invalid, left, raw = FormulaEvaluator._numeric(df[column_name])
+        error_locations = []
+
+        if operand.startswith("'") and operand.endswith("'"):
+            second_column = operand[1:-1].strip().lower()
+            if second_column not in df.columns.str.lower():
+                return [(0, "", "ColumnNotFound", f"Second column '{second_column}' not found in data")]
+
+            right_blank, right_invalid, right, right_raw = FormulaEvaluator._numeric(df[second_column])
+            numeric = ~(blank | right_blank | invalid | right_invalid)
+            failed = np.zeros(len(df), dtype=bool)
+            failed[numeric] = ~op_func(left[numeric], right[numeric])
+
+            for i in np.flatnonzero(~numeric | failed):
+                row, left_value, right_value = int(i) + 1, raw[i], right_raw[i]
+                if blank[i]:
+                    error_locations.append((row, "NULL", f"{column_name}_Formula", f"Value is null in column {column_name}"))
+                elif right_blank[i]:
+                    error_locations.append((row, str(left_value), f"{column_name}_Formula", f"Value is null in column {second_column}"))
+                elif not numeric[i]:
+                    error_locations.append((row, str(left_value), f"{column_name}_DataType",
+                                            f"Invalid numeric value in column {column_name}: {left_value} or {second_column}: {right_value}"))
+                else:
+                    error_locations.append((row, str(left_value), f"{column_name}_Formula",
+                                            f"Failed comparison: {left_value} {operator_str} {right_value}"))
+            return error_locations
+
+        try:
+            operand_value = float(operand)
+        except ValueError:
+            return [(0, "", "InvalidOperand", f"Invalid operand for comparison: {operand}")]
+
+        numeric = ~(blank | invalid)
+        failed = np.zeros(len(df), dtype=bool)
+        failed[numeric] = ~op_func(left[numeric], operand_value)
+
+        for i in np.flatnonzero(~numeric | failed):
+            row, value = int(i) + 1, raw[i]
+            if blank[i]:
+                error_locations.append((row, "NULL", f"{column_name}_Formula", "Value is null"))
+            elif invalid[i]:
+                error_locations.append((row, str(value), f"{column_name}_DataType", f"Invalid numeric value in column {column_name}: {value}"))
+            else:
+                error_locations.append((row, str(value), f"{column_name}_Formula", f"Failed comparison: {value} {operator_str} {operand_value}"))
+        return error_locations
+
+    @staticmethod
+    def _numeric(series: pd.Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Parse a column like float(str(value).strip()); returns (blank, invalid, numbers, raw values)"""
+        values = series.reset_index(drop=True)
+        raw = values.to_numpy(dtype=object)
+        text = ValidationEngine.to_text(values)
+        blank = (values.isna() | (text == '')).to_numpy(dtype=bool)
+
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            return blank, np.zeros(len(values), dtype=bool), values.to_numpy(dtype=float), raw
+
+        parseable = ValidationEngine._fast_then_exact(text, ValidationEngine.FLOAT_FAST_PATTERN, ValidationEngine._is_float)
+        invalid = ~blank & ~parseable
+        numbers = np.full(len(values), np.nan)
+        ok = ~blank & parseable
+        if ok.any():
+            ok_text = text[ok]
+            lookup = {value: float(value) for value in ok_text.unique()}
+            numbers[ok] = ok_text.map(lookup).to_numpy(dtype=float)
+        return blank, invalid, numbers, raw
+
+    @staticmethod
+    def _build(node: ast.AST, names: set) -> Callable:
+        """Turn a whitelisted AST node into a function of the column arrays"""
+        if not any(isinstance(child, ast.Name) for child in ast.walk(node)):
+            return FormulaEvaluator._fold_constant(node)
+
+        if isinstance(node, ast.Name):
+            if node.id not in names:
+                raise ValueError(f"Unknown name in formula: {node.id}")
+            return lambda env: env[node.id]
+
+        if isinstance(node, ast.UnaryOp):
+            operand = FormulaEvaluator._build(node.operand, names)
+            if isinstance(node.op, ast.USub):
+                return lambda env: np.negative(operand(env))
+            if isinstance(node.op, ast.UAdd):
+                return lambda env: np.positive(operand(env))
+            if isinstance(node.op, ast.Not):
+                return lambda env: (operand(env) == 0).astype(float)
+
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+            base = FormulaEvaluator._build(node.left, names)
+            exponent = FormulaEvaluator._build(node.right, names)
+            return lambda env: FormulaEvaluator._power(base(env), exponent(env))
+
+        if isinstance(node, ast.BinOp) and type(node.op) in FormulaEvaluator.BINARY_OPERATORS:
+            op_func = FormulaEvaluator.BINARY_OPERATORS[type(node.op)]
+            left = FormulaEvaluator._build(node.left, names)
+            right = FormulaEvaluator._build(node.right, names)
+            return lambda env: op_func(left(env), right(env))
+
+        if isinstance(node, ast.Compare) and all(type(op) in FormulaEvaluator.COMPARE_OPERATORS for op in node.ops):
+            operands = [FormulaEvaluator._build(operand, names) for operand in [node.left] + node.comparators]
+            op_funcs = [FormulaEvaluator.COMPARE_OPERATORS[type(op)] for op in node.ops]
+
+            def compare(env):
+                values = [operand(env) for operand in operands]
+                result = True
+                for op_func, left, right in zip(op_funcs, values, values[1:]):
+                    result = np.logical_and(result, op_func(left, right))
+                return np.asarray(result, dtype=float)
+            return compare
+
+        if isinstance(node, ast.BoolOp):
+            operands = [FormulaEvaluator._build(value, names) for value in node.values]
+            is_and = isinstance(node.op, ast.And)
+
+            def boolean(env):
+                # Python semantics: 'and' yields the first falsy operand, 'or' the first truthy one
+                values = [operand(env) for operand in operands]
+                result = values[-1]
+                for value in reversed(values[:-1]):
+                    result = np.where(value != 0, result, value) if is_and else np.where(value != 0, value, result)
+                return result
+            return boolean
+
+        raise ValueError(f"Unsupported formula element: {type(node).__name__}")
+
+    @staticmethod
+    def _power(base, exponent) -> np.ndarray:
+        """Element-wise C pow() as used by Python floats; NumPy's SIMD power can differ in the last bit"""
+        def safe_pow(x, y):
+            try:
+                return math.pow(x, y)
+            except (ValueError, OverflowError):
+                return math.nan
+        return np.vectorize(safe_pow, otypes=[float])(base, exponent)
+
+    @staticmethod
+    def _fold_constant(node: ast.AST) -> Callable:
+        """Evaluate a column-free sub-expression once, with plain Python semantics"""
+        for child in ast.walk(node):
+            if isinstance(child, ast.Constant) and not isinstance(child.value, (int, float)):
+                raise ValueError(f"Unsupported constant in formula: {child.value!r}")
+            if not isinstance(child, (ast.Constant, ast.UnaryOp, ast.BinOp, ast.Compare, ast.BoolOp,
+                                      ast.unaryop, ast.operator, ast.cmpop, ast.boolop)):
+                raise ValueError(f"Unsupported formula element: {type(child).__name__}")
+        try:
+            value = float(eval(compile(ast.Expression(node), '<formula>', 'eval'), {"__builtins__": {}}))
+        except Exception as e:
+            # Leave the failure to row evaluation so each row reports the same error as before
+            error = e
+
+            def fail(env):
+                raise error
+            return fail
+        return lambda env: value
@@ -0,0 +1,223 @@
+# services/job_queue.py
+"""
+Background job queue backed by a local process pool.
+
+A job is submitted with a picklable task and its arguments and gets an id.
+The task runs in a worker process and receives a progress callback as its
+first argument. Job state lives in a small JSON file per job and the result
+in a pickle next to it, so any web worker process can answer a status poll
+or hand out the result; no external broker is involved.
+"""
+
+import os
+import json
+import time
+import uuid
+import pickle
+import logging
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class JobProgress:
+    """Progress callback handed to tasks: progress(done, total)"""
+
+    # Minimum seconds between progress writes; the final update is always written
+    MIN_INTERVAL = 0.5
+
+    def __init__(self, job_dir: str, job_id: str):
+        self.job_dir = job_dir
+        self.job_id = job_id
+        self._last_write = 0.0
+
+    def __call__(self, done: int, total: int):
+        now = time.time()
+        if done < total and now - self._last_write < self.MIN_INTERVAL:
+            return
+        self._last_write = now
+        JobQueue._update_status(self.job_dir, self.job_id, progress=JobQueue._progress(done, total))
+
+
+class JobQueue:
+    """Submit tasks to a process pool and track them by job id"""
+
+    STATUS_EXTENSION = '.json'
+    RESULT_EXTENSION = '.result.pkl'
+    FINISHED = ('completed', 'failed')
+
+    _job_dir: Optional[str] = None
+    _max_workers = 2
+    # Called once in each worker process before it runs jobs, e.g. to apply settings
+    _initializer: Optional[Callable] = None
+    _initargs: Tuple = ()
+    _executor: Optional[ProcessPoolExecutor] = None
+    _futures: Dict[str, Any] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, job_dir: str, max_workers: int = 2, initializer: Optional[Callable] = None,
+                  initargs: Tuple = ()):
+        """Set the job state directory, the number of worker processes and their initializer"""
+        os.makedirs(job_dir, exist_ok=True)
+        cls.shutdown(wait=False)
+        with cls._lock:
+            cls._job_dir = job_dir
+            cls._max_workers = max(1, int(max_workers))
+            cls._initializer = initializer
+            cls._initargs = tuple(initargs)
+        logging.info(f"Job queue configured at {job_dir} ({cls._max_workers} workers)")
+
+    @classmethod
+    def job_dir(cls) -> str:
+        if cls._job_dir is None:
+            cls.configure(os.path.join(tempfile.gettempdir(), 'jobs'))
+        return cls._job_dir
+
+    @classmethod
+    def submit(cls, task: Callable, *args, owner: Optional[int] = None, kind: str = 'validation',
+               meta: Optional[Dict] = None) -> str:
+        """Queue task(progress, *args) and return its job id"""
+        job_id = uuid.uuid4().hex
+        job_dir = cls.job_dir()
+        cls._write_status(job_dir, job_id, {
+            'job_id': job_id,
+            'kind': kind,
+            'owner': owner,
+            'meta': meta or {},
+            'status': 'queued',
+            'progress': cls._progress(0, 0),
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'error': None
+        })
+        with cls._lock:
+            if cls._executor is None:
+                # Workers are spawned, not forked, so they never inherit the web
+                # process's open connections or held locks. They do not inherit its
+                # class-level settings either; the initializer applies those
+                cls._executor = ProcessPoolExecutor(max_workers=cls._max_workers,
+                                                    mp_context=multiprocessing.get_context('spawn'),
+                                                    initializer=cls._initializer, initargs=cls._initargs)
+            future = cls._executor.submit(cls._run, job_dir, job_id, task, args)
+            cls._futures[job_id] = future
+        future.add_done_callback(lambda f: cls._on_done(job_dir, job_id, f))
+        logging.info(f"Submitted {kind} job {job_id}")
+        return job_id
+
+    @classmethod
+    def status(cls, job_id: str) -> Optional[Dict]:
+        """Current state of a job, or None if it is unknown"""
+        try:
+            with open(cls._path(job_id, cls.STATUS_EXTENSION), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def result(cls, job_id: str) -> Any:
+        """Result of a completed job"""
+        with open(cls._path(job_id, cls.RESULT_EXTENSION), 'rb') as f:
+            return pickle.load(f)
+
+    @classmethod
+    def delete(cls, job_id: str):
+        """Forget a job, cancelling it if it has not started yet"""
+        with cls._lock:
+            future = cls._futures.pop(job_id, None)
+        if future is not None:
+            future.cancel()
+        for extension in (cls.STATUS_EXTENSION, cls.RESULT_EXTENSION):
+            try:
+                os.remove(cls._path(job_id, extension))
+            except FileNotFoundError:
+                pass
+
+    @classmethod
+    def cleanup(cls, max_age_hours: int = 24):
+        """Delete state and results of jobs older than the given age"""
+        cutoff = time.time() - max_age_hours * 3600
+        directory = cls.job_dir()
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            try:
+                if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    logging.info(f"Cleaned up job file: {filename}")
+            except Exception as e:
+                logging.error(f"Error cleaning up job file {filename}: {str(e)}")
+
+    @classmethod
+    def stats(cls) -> Dict:
+        with cls._lock:
+            active = sum(1 for future in cls._futures.values() if not future.done())
+            return {'workers': cls._max_workers, 'active_jobs': active, 'started': cls._executor is not None}
+
+    @classmethod
+    def shutdown(cls, wait: bool = True):
+        with cls._lock:
+            executor, cls._executor = cls._executor, None
+            cls._futures.clear()
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    @staticmethod
+    def _run(job_dir: str, job_id: str, task: Callable, args: tuple):
+        """Worker-side wrapper: runs the task and records its outcome"""
+        JobQueue._update_status(job_dir, job_id, status='running', started_at=time.time())
+        try:
+            result = task(JobProgress(job_dir, job_id), *args)
+            result_path = os.path.join(job_dir, f"{job_id}{JobQueue.RESULT_EXTENSION}")
+            tmp_path = f"{result_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, result_path)
+            JobQueue._update_status(job_dir, job_id, status='completed', finished_at=time.time())
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {str(e)}")
+            JobQueue._update_status(job_dir, job_id, status='failed', finished_at=time.time(), error=str(e))
+
+    @classmethod
+    def _on_done(cls, job_dir: str, job_id: str, future):
+        with cls._lock:
+            cls._futures.pop(job_id, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # The worker died before it could record the failure itself
+            logging.error(f"Job {job_id} crashed: {str(error)}")
+            cls._update_status(job_dir, job_id, status='failed', finished_at=time.time(), error=str(error))
+
+    @staticmethod
+    def _progress(done: int, total: int) -> Dict:
+        return {'done': done, 'total': total, 'percent': round(100.0 * done / total, 1) if total else 0.0}
+
+    @classmethod
+    def _path(cls, job_id: str, extension: str) -> str:
+        # Ids are generated here; reject anything that could escape the job directory
+        if not job_id or os.path.basename(job_id) != job_id:
+            raise ValueError(f"Invalid job id: {job_id}")
+        return os.path.join(cls.job_dir(), f"{job_id}{extension}")
+
+    @staticmethod
+    def _update_status(job_dir: str, job_id: str, **changes):
+        path = os.path.join(job_dir, f"{job_id}{JobQueue.STATUS_EXTENSION}")
+        try:
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return  # deleted while running
+        state.update(changes)
+        JobQueue._write_status(job_dir, job_id, state)
+
+    @staticmethod
+    def _write_status(job_dir: str, job_id: str, state: Dict):
+        path = os.path.join(job_dir, f"{job_id}{JobQueue.STATUS_EXTENSION}")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
@@ -1,22 +1,34 @@
 import gc
 import logging
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Iterator
+from utils.constants import LOW_CARDINALITY_RATIO
 
 class MemoryManager:
+    @staticmethod
+    def iter_file_chunks(file_path: str, chunk_size: int = 10000, **read_kwargs) -> Iterator[pd.DataFrame]:
+        """Yield a delimited file chunk by chunk with the C parser, never holding more than one chunk"""
+        read_kwargs.setdefault('engine', 'c')
+        try:
+            with pd.read_csv(file_path, chunksize=chunk_size, **read_kwargs) as reader:
+                for chunk_number, chunk in enumerate(reader, start=1):
+                    yield chunk
+                    
+                    # Periodic garbage collection
+                    if chunk_number % 10 == 0:
+                        gc.collect()
+        except Exception as e:
+            logging.error(f"Error reading file in chunks: {e}")
+            raise
+
     @staticmethod
     def process_large_file_in_chunks(file_path: str, chunk_size: int = 10000):
-        """Process large files in chunks to manage memory"""
+        """Load a large file chunk by chunk with memory-optimized dtypes"""
         try:
-            chunk_list = []
-            for chunk in pd.read_csv(file_path, chunksize=chunk_size):
-                # Process chunk
-                processed_chunk = MemoryManager._process_chunk(chunk)
-                chunk_list.append(processed_chunk)
-                
-                # Periodic garbage collection
-                if len(chunk_list) % 10 == 0:
-                    gc.collect()
+            chunk_list = [
+                MemoryManager._process_chunk(chunk)
+                for chunk in MemoryManager.iter_file_chunks(file_path, chunk_size)
+            ]
             
             # Combine processed chunks
             return pd.concat(chunk_list, ignore_index=True)
@@ -30,7 +42,7 @@ class MemoryManager:
         """Process individual chunk with memory optimization"""
         # Apply memory-efficient transformations
         for col in chunk.select_dtypes(include=['object']):
-            if chunk[col].nunique() / len(chunk) < 0.5:  # High repetition
+            if chunk[col].nunique() / len(chunk) < LOW_CARDINALITY_RATIO:  # High repetition
                 chunk[col] = chunk[col].astype('category')
         
         return chunk
@@ -0,0 +1,230 @@
+# services/parallel_validator.py
+"""
+Parallel evaluation of built-in rules across row shards.
+
+The frame is never pickled to the workers. Each column a rule reads is
+converted to text once, factorized, and its codes, null mask and distinct
+values are copied into shared memory; a worker attaches to those buffers and
+validates a range of rows of one column against every rule on that column.
+Shard results carry global row numbers and are concatenated in row order, so
+the merged locations are those of ValidationEngine.check_column on the whole
+column. The number of workers is chosen from the amount of work (rows times
+rules) and small inputs are checked in-process.
+"""
+
+import os
+import math
+import pickle
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.validation_engine import ValidationEngine
+
+# (column_name, rule_name, accepted_date_formats, source_format) of one rule
+RuleSpec = Tuple[str, str, List[str], Optional[str]]
+# (shared memory name, shape, dtype) of an array placed in shared memory
+SharedArray = Tuple[str, Tuple[int, ...], str]
+
+
+class ParallelValidator:
+    """Process pool validating row shards of shared-memory columns"""
+
+    # Rows x rules a worker should receive before another one is worth starting
+    MIN_CELLS_PER_WORKER = 500000
+    # Shards per worker, so a slow shard does not leave the other workers idle
+    SHARDS_PER_WORKER = 2
+    MIN_SHARD_ROWS = 50000
+
+    _max_workers = os.cpu_count() or 1
+    _executor: Optional[ProcessPoolExecutor] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, max_workers: int = 0):
+        """Set the largest pool size; 0 uses every CPU"""
+        cls.shutdown()
+        with cls._lock:
+            cls._max_workers = max(1, int(max_workers) or os.cpu_count() or 1)
+        logging.info(f"Parallel validation configured with up to {cls._max_workers} workers")
+
+    @staticmethod
+    def cpu_share(max_workers: int, processes: int) -> int:
+        """Pool size for each of processes processes validating at once: their share of
+        the CPUs, capped at max_workers (0: no cap)"""
+        share = max(1, (os.cpu_count() or 1) // max(1, int(processes)))
+        return min(int(max_workers), share) if max_workers else share
+
+    @classmethod
+    def plan_workers(cls, rows: int, rule_count: int) -> int:
+        """Degree of parallelism for validating rule_count rules over rows"""
+        by_size = (rows * rule_count) // cls.MIN_CELLS_PER_WORKER
+        by_shards = math.ceil(rows / cls.MIN_SHARD_ROWS)
+        return max(1, min(cls._max_workers, os.cpu_count() or 1, by_size, by_shards))
+
+    @classmethod
+    def check_rules(cls, df: pd.DataFrame, specs: List[RuleSpec], workers: Optional[int] = None,
+                    progress: Optional[Callable[[int, int], None]] = None) -> List[List[Tuple]]:
+        """Error locations (row, value, rule_failed, reason) of each rule over its whole column"""
+        total_rows = len(df)
+        workers = cls.plan_workers(total_rows, len(specs)) if workers is None else min(workers, cls._max_workers)
+        if workers <= 1 or not specs:
+            return cls._check_serial(df, specs, progress)
+
+        by_column: Dict[str, List[int]] = {}
+        for position, spec in enumerate(specs):
+            by_column.setdefault(spec[0], []).append(position)
+        shard_rows = max(cls.MIN_SHARD_ROWS, math.ceil(total_rows / (workers * cls.SHARDS_PER_WORKER)))
+        bounds = [(start, min(start + shard_rows, total_rows)) for start in range(0, total_rows, shard_rows)]
+
+        segments: Dict[Tuple[int, int], List[Tuple]] = {}
+        created: List[shared_memory.SharedMemory] = []
+        try:
+            executor = cls._get_executor()
+            futures = {}
+            for column, positions in by_column.items():
+                buffers = cls._share_column(df[column], created)
+                column_specs = [specs[position] for position in positions]
+                for start, stop in bounds:
+                    future = executor.submit(_check_shard, buffers, start, stop, column_specs)
+                    futures[future] = (positions, start, stop)
+
+            done_rows, total_work = 0, total_rows * len(by_column)
+            for future in as_completed(futures):
+                positions, start, stop = futures[future]
+                for position, locations in zip(positions, future.result()):
+                    segments[(position, start)] = locations
+                done_rows += stop - start
+                if progress:
+                    progress(done_rows * total_rows // total_work, total_rows)
+        except BrokenProcessPool as e:
+            logging.error(f"Validation worker pool failed, validating in-process: {str(e)}")
+            cls.shutdown()
+            return cls._check_serial(df, specs, progress)
+        finally:
+            for shm in created:
+                shm.close()
+                shm.unlink()
+
+        logging.debug(f"Validated {len(specs)} rules over {total_rows} rows in {len(bounds)} shards "
+                      f"on {workers} workers")
+        return [
+            [loc for start, _ in bounds for loc in segments[(position, start)]]
+            for position in range(len(specs))
+        ]
+
+    @classmethod
+    def shutdown(cls, wait: bool = True):
+        with cls._lock:
+            executor, cls._executor = cls._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    @classmethod
+    def stats(cls) -> Dict:
+        with cls._lock:
+            return {'max_workers': cls._max_workers, 'started': cls._executor is not None}
+
+    @classmethod
+    def _get_executor(cls) -> ProcessPoolExecutor:
+        with cls._lock:
+            if cls._executor is None:
+                # Spawned like the job queue workers: no inherited connections or locks
+                cls._executor = ProcessPoolExecutor(max_workers=cls._max_workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+            return cls._executor
+
+    @staticmethod
+    def _check_serial(df: pd.DataFrame, specs: List[RuleSpec],
+                      progress: Optional[Callable[[int, int], None]] = None) -> List[List[Tuple]]:
+        results = [
+            ValidationEngine.check_column(df[column], rule_name, accepted_formats, True, source_format)[1]
+            for column, rule_name, accepted_formats, source_format in specs
+        ]
+        if progress:
+            progress(len(df), len(df))
+        return results
+
+    @classmethod
+    def _share_column(cls, series: pd.Series, created: List[shared_memory.SharedMemory]) -> Dict:
+        """Place a column's text codes, null mask and distinct values in shared memory"""
+        values = series.to_numpy(dtype=object)
+        if series.dtype == object and pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty'):
+            # All cells are strings or nulls: factorize as is and strip the distinct values only
+            codes, uniques = pd.factorize(values)
+            uniques = pd.Series(uniques, dtype=object).str.strip().to_numpy(dtype=object)
+            null_mask = codes < 0
+            if null_mask.any():
+                uniques = np.append(uniques, '')
+                codes[null_mask] = len(uniques) - 1
+        else:
+            values = series.reset_index(drop=True)
+            null_mask = values.isna().to_numpy()
+            text = ValidationEngine.to_text(values)
+            if null_mask.any():
+                text = text.mask(null_mask, '')
+            codes, uniques = pd.factorize(text.to_numpy(dtype=object))
+        codes = codes.astype(np.int32 if len(uniques) < 2 ** 31 else np.int64, copy=False)
+
+        # Distinct values travel pickled: one bytes blob per column, read once per worker
+        uniques = np.asarray(uniques, dtype=object)
+        payload = np.frombuffer(pickle.dumps(uniques, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+        buffers = {
+            'codes': cls._share(codes, created),
+            'nulls': cls._share(null_mask, created),
+            'uniques': cls._share(payload, created),
+        }
+        return buffers
+
+    @staticmethod
+    def _share(array: np.ndarray, created: List[shared_memory.SharedMemory]) -> SharedArray:
+        shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        created.append(shm)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        return shm.name, array.shape, array.dtype.str
+
+
+# Worker side: the shared buffers of the column being validated, and its unpickled distinct values
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+_unpickled: Dict[str, np.ndarray] = {}
+
+
+def _attach_column(buffers: Dict) -> Dict[str, np.ndarray]:
+    """Map a column's buffers, releasing those of the previous column"""
+    if any(buffer[0] not in _attached for buffer in buffers.values()):
+        # Segments of finished columns are unlinked by the parent; drop our maps of them
+        for name in list(_attached):
+            shm, array = _attached.pop(name)
+            del array
+            shm.close()
+        _unpickled.clear()
+        for name, shape, dtype in buffers.values():
+            shm = shared_memory.SharedMemory(name=name)
+            _attached[name] = (shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+    return {key: _attached[buffer[0]][1] for key, buffer in buffers.items()}
+
+
+def _check_shard(buffers: Dict, start: int, stop: int, specs: List[RuleSpec]) -> List[List[Tuple]]:
+    """Validate rows start:stop of one shared column against each of its rules"""
+    arrays = _attach_column(buffers)
+    codes = np.array(arrays['codes'][start:stop])
+    null_mask = np.array(arrays['nulls'][start:stop])
+    name = buffers['uniques'][0]
+    if name not in _unpickled:
+        _unpickled[name] = pickle.loads(arrays['uniques'])
+    del arrays
+    local_codes, used = pd.factorize(codes)
+    uniques = _unpickled[name][used]
+    text = pd.Series(uniques[local_codes], dtype=object)
+    return [
+        ValidationEngine.check_text(text, null_mask, rule_name, accepted_formats, True, source_format,
+                                    row_offset=start, factorized=(local_codes, uniques))[1]
+        for _, rule_name, accepted_formats, source_format in specs
+    ]
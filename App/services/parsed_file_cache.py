@@ -0,0 +1,307 @@
+# services/parsed_file_cache.py
+"""
+Parse-once cache of uploaded files, keyed by the hash of their bytes.
+
+An entry holds a workbook's sheet names and delimiter plus, for every sheet
+that has been parsed, its detected header row and its cells stored column
+by column. Numeric data columns are .npy files that are memory-mapped on
+load; the rows up to the header and all other columns are pickled. Opening
+the same upload or corrected file again therefore costs a hash of its bytes
+and a few file maps instead of an Excel parse. The cache directory is kept
+under a size limit by dropping the least recently used entries.
+"""
+
+import os
+import json
+import time
+import shutil
+import pickle
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class ParsedFileCache:
+    """Parsed sheets of uploaded files on disk, addressed by content hash"""
+
+    FORMAT_VERSION = 1
+    META_FILE = 'meta.json'
+    HEAD_FILE = 'head.pkl'
+    FRAME_FILE = 'frame.pkl'
+    DEFAULT_MAX_BYTES = 1024 * 1024 ** 2
+    HASH_CHUNK_BYTES = 1024 * 1024
+    # Object columns whose data rows are all of one of these kinds are stored as .npy
+    NUMERIC_KINDS = {'integer': np.int64, 'floating': np.float64}
+
+    _storage_dir: Optional[str] = None
+    _max_bytes = DEFAULT_MAX_BYTES
+    # (path, size, mtime) -> digest, so an unchanged file is hashed once per process
+    _digests: 'OrderedDict[Tuple[str, int, int], str]' = OrderedDict()
+    _max_digests = 256
+    _stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, storage_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Set the cache directory and its size limit"""
+        os.makedirs(storage_dir, exist_ok=True)
+        with cls._lock:
+            cls._storage_dir = storage_dir
+            cls._max_bytes = int(max_bytes)
+            cls._digests.clear()
+            cls._stats = dict.fromkeys(cls._stats, 0)
+        logging.info(f"Parsed file cache configured at {storage_dir} (limit {max_bytes / 1024 ** 2:.0f} MB)")
+
+    @classmethod
+    def storage_dir(cls) -> str:
+        if cls._storage_dir is None:
+            cls.configure(os.path.join(tempfile.gettempdir(), 'parsed'))
+        return cls._storage_dir
+
+    @classmethod
+    def digest(cls, file_path: str) -> str:
+        """SHA-256 of the file's bytes"""
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with cls._lock:
+            digest = cls._digests.get(key)
+            if digest is not None:
+                cls._digests.move_to_end(key)
+                return digest
+        sha = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.HASH_CHUNK_BYTES), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        with cls._lock:
+            cls._digests[key] = digest
+            while len(cls._digests) > cls._max_digests:
+                cls._digests.popitem(last=False)
+        return digest
+
+    @classmethod
+    def get_workbook(cls, digest: str) -> Optional[Dict]:
+        """Sheet names and delimiter of a cached file, or None"""
+        path = os.path.join(cls._entry_dir(digest), cls.META_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if meta.get('version') != cls.FORMAT_VERSION:
+            return None
+        cls._touch(path)
+        return meta
+
+    @classmethod
+    def put_workbook(cls, digest: str, sheet_names: List[str], delimiter: Optional[str] = None):
+        """Record a file's sheet names; its sheets are added as they are parsed"""
+        entry_dir = cls._entry_dir(digest)
+        os.makedirs(entry_dir, exist_ok=True)
+        path = os.path.join(entry_dir, cls.META_FILE)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': cls.FORMAT_VERSION, 'sheet_names': sheet_names, 'delimiter': delimiter,
+                       'created_at': time.time()}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def get_header_row(cls, digest: str, sheet_index: int) -> Optional[Tuple[int, List]]:
+        """(header_row, headers) of a cached sheet without loading its data, or None"""
+        head = cls._load_pickle(digest, sheet_index, cls.HEAD_FILE)
+        if head is None:
+            return None
+        header_row = head['header_row']
+        if header_row == -1:
+            return -1, []
+        return header_row, head['top'].iloc[header_row].tolist()
+
+    @classmethod
+    def get_sheet(cls, digest: str, sheet_index: int) -> Optional[Tuple[pd.DataFrame, int]]:
+        """A cached sheet and its header row, or None"""
+        head = cls._load_pickle(digest, sheet_index, cls.HEAD_FILE)
+        frame = cls._load_pickle(digest, sheet_index, cls.FRAME_FILE) if head is not None else None
+        if frame is None:
+            with cls._lock:
+                cls._stats['misses'] += 1
+            return None
+        sheet_dir = cls._sheet_dir(digest, sheet_index)
+        try:
+            body = {}
+            for pos, spec in enumerate(frame['specs']):
+                if spec == 'pickle':
+                    body[pos] = frame['body'][pos]
+                    continue
+                values = np.load(os.path.join(sheet_dir, f"col-{pos}.npy"), mmap_mode='r')
+                # Copied out of the map: callers edit their frames in place
+                body[pos] = values.astype(object) if spec == 'object' else np.array(values)
+        except (FileNotFoundError, ValueError) as e:
+            logging.debug(f"Parsed sheet {digest}/{sheet_index} unreadable, treating as a miss: {str(e)}")
+            with cls._lock:
+                cls._stats['misses'] += 1
+            return None
+
+        top = head['top']
+        df = pd.DataFrame(body, index=pd.RangeIndex(len(top), len(top) + frame['body_rows']))
+        df.columns = top.columns
+        if len(top) and len(df):
+            df = pd.concat([top, df])
+        elif len(top):
+            df = top
+        cls._touch(os.path.join(cls._entry_dir(digest), cls.META_FILE))
+        with cls._lock:
+            cls._stats['hits'] += 1
+        return df, head['header_row']
+
+    @classmethod
+    def put_sheet(cls, digest: str, sheet_index: int, df: pd.DataFrame, header_row: int):
+        """Store a parsed sheet; rows after the header are stored column by column"""
+        entry_dir = cls._entry_dir(digest)
+        sheet_dir = cls._sheet_dir(digest, sheet_index)
+        if os.path.isdir(sheet_dir) or not os.path.isdir(entry_dir):
+            return
+        split = header_row + 1
+        tmp_dir = f"{sheet_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(tmp_dir)
+            specs, pickled = [], {}
+            for pos in range(df.shape[1]):
+                column = df.iloc[split:, pos]
+                spec, values = cls._column_values(column)
+                if spec == 'pickle':
+                    pickled[pos] = values
+                else:
+                    np.save(os.path.join(tmp_dir, f"col-{pos}.npy"), values, allow_pickle=False)
+                specs.append(spec)
+            with open(os.path.join(tmp_dir, cls.HEAD_FILE), 'wb') as f:
+                pickle.dump({'header_row': header_row, 'top': df.iloc[:split]}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            with open(os.path.join(tmp_dir, cls.FRAME_FILE), 'wb') as f:
+                pickle.dump({'body_rows': max(0, len(df) - split), 'specs': specs, 'body': pickled}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_dir, sheet_dir)
+        except Exception as e:
+            # Another worker stored the same sheet first, the entry was evicted meanwhile, or a
+            # column could not be stored; the sheet is simply parsed again next time
+            logging.debug(f"Parsed sheet {digest}/{sheet_index} not stored: {str(e)}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        logging.debug(f"Stored parsed sheet {digest}/{sheet_index}, shape: {df.shape}")
+        cls.evict(keep=digest)
+
+    @classmethod
+    def evict(cls, keep: Optional[str] = None):
+        """Drop least recently used entries until the cache fits its size limit"""
+        directory = cls.storage_dir()
+        entries = []
+        for name in os.listdir(directory):
+            entry_dir = os.path.join(directory, name)
+            try:
+                last_used = os.path.getmtime(os.path.join(entry_dir, cls.META_FILE))
+            except OSError:
+                last_used = 0.0
+            entries.append((last_used, name, cls._dir_size(entry_dir)))
+        total = sum(size for _, _, size in entries)
+        for _, name, size in sorted(entries):
+            if total <= cls._max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+            total -= size
+            with cls._lock:
+                cls._stats['evictions'] += 1
+            logging.info(f"Evicted parsed file {name} from cache")
+
+    @classmethod
+    def cleanup(cls, max_age_hours: int = 24):
+        """Delete entries not used within the given age, then enforce the size limit"""
+        cutoff = time.time() - max_age_hours * 3600
+        directory = cls.storage_dir()
+        for name in os.listdir(directory):
+            entry_dir = os.path.join(directory, name)
+            try:
+                meta_path = os.path.join(entry_dir, cls.META_FILE)
+                last_used = os.path.getmtime(meta_path if os.path.exists(meta_path) else entry_dir)
+                if last_used < cutoff:
+                    shutil.rmtree(entry_dir)
+                    logging.info(f"Cleaned up parsed file: {name}")
+            except Exception as e:
+                logging.error(f"Error cleaning up parsed file {name}: {str(e)}")
+        cls.evict()
+
+    @classmethod
+    def settings(cls) -> Tuple[str, int]:
+        """(storage_dir, max_bytes), to configure the same cache in a worker process"""
+        storage_dir = cls.storage_dir()
+        with cls._lock:
+            return storage_dir, cls._max_bytes
+
+    @classmethod
+    def stats(cls) -> Dict:
+        with cls._lock:
+            stats = dict(cls._stats)
+            stats['max_bytes'] = cls._max_bytes
+        return stats
+
+    @classmethod
+    def _column_values(cls, column: pd.Series) -> Tuple[str, np.ndarray]:
+        """Storage kind and values of a column's data rows: 'numeric', 'object' (numeric values in
+        an object column) or 'pickle'"""
+        if column.dtype != object:
+            if isinstance(column.dtype, np.dtype) and column.dtype.kind in 'iufb':
+                return 'numeric', column.to_numpy()
+            return 'pickle', column.to_numpy()
+        dtype = cls.NUMERIC_KINDS.get(pd.api.types.infer_dtype(column, skipna=False))
+        if dtype is not None:
+            try:
+                return 'object', np.asarray(column.to_numpy(), dtype=dtype)
+            except OverflowError:
+                pass
+        return 'pickle', column.to_numpy()
+
+    @classmethod
+    def _load_pickle(cls, digest: str, sheet_index: int, filename: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(cls._sheet_dir(digest, sheet_index), filename), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Corrupt parsed sheet {digest}/{sheet_index}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _touch(path: str):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        size = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return size
+
+    @classmethod
+    def _entry_dir(cls, digest: str) -> str:
+        # Digests are generated here; reject anything that could escape the storage directory
+        if not digest or os.path.basename(digest) != digest:
+            raise ValueError(f"Invalid file digest: {digest}")
+        return os.path.join(cls.storage_dir(), digest)
+
+    @classmethod
+    def _sheet_dir(cls, digest: str, sheet_index: int) -> str:
+        return os.path.join(cls._entry_dir(digest), f"sheet-{int(sheet_index)}")
@@ -0,0 +1,107 @@
+# services/rule_registry.py
+"""
+In-process registry of validation rule metadata.
+
+validation_rule_types is loaded once into memory, so validating N columns
+costs no per-rule lookups. Every code path that creates, updates or deletes
+rules calls RuleRegistry.invalidate(); a short TTL bounds staleness across
+worker processes that did not see the write.
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+from config.database import get_db_connection
+
+
+class RuleRegistry:
+    """Rule name -> {parameters, is_custom, source_format, data_type}"""
+
+    TTL_SECONDS = 300
+
+    _rules: Optional[Dict[str, Dict]] = None
+    _loaded_at = 0.0
+    _hits = 0
+    _misses = 0
+    _loads = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, rule_name: str) -> Optional[Dict]:
+        """Return the stored metadata for a rule, or None if no such rule exists"""
+        rules = cls._current()
+        rule_data = rules.get(rule_name)
+        with cls._lock:
+            if rule_data is None:
+                cls._misses += 1
+            else:
+                cls._hits += 1
+        return rule_data
+
+    @classmethod
+    def invalidate(cls):
+        """Drop the cached rules; the next lookup reloads them"""
+        with cls._lock:
+            cls._rules = None
+        logging.debug("Rule registry invalidated")
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, Dict]:
+        """Plain, picklable copy of the registry for worker processes"""
+        return {name: dict(rule_data) for name, rule_data in cls._current().items()}
+
+    @classmethod
+    def install(cls, rules: Dict[str, Dict]):
+        """Use a snapshot instead of the database (e.g. in a worker process without DB access)"""
+        with cls._lock:
+            cls._rules = rules
+            # A snapshot never expires; the parent hands out a fresh one per job
+            cls._loaded_at = float('inf')
+
+    @classmethod
+    def stats(cls) -> Dict:
+        with cls._lock:
+            lookups = cls._hits + cls._misses
+            loaded = cls._rules is not None
+            age = None
+            if loaded and cls._loaded_at != float('inf'):
+                age = round(time.time() - cls._loaded_at, 1)
+            return {
+                'rules': len(cls._rules) if loaded else 0,
+                'hits': cls._hits,
+                'misses': cls._misses,
+                'loads': cls._loads,
+                'hit_rate': round(cls._hits / lookups, 4) if lookups else 0.0,
+                'age_seconds': age
+            }
+
+    @classmethod
+    def _current(cls) -> Dict[str, Dict]:
+        rules = cls._rules
+        if rules is not None and time.time() - cls._loaded_at < cls.TTL_SECONDS:
+            return rules
+        return cls._load()
+
+    @classmethod
+    def _load(cls) -> Dict[str, Dict]:
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT rule_name, parameters, is_custom, source_format, data_type
+                FROM validation_rule_types
+            """)
+            rules = {row.pop('rule_name'): row for row in cursor.fetchall()}
+            cursor.close()
+        except Exception as e:
+            logging.error(f"Failed to load validation rules: {str(e)}")
+            raise
+
+        with cls._lock:
+            cls._rules = rules
+            cls._loaded_at = time.time()
+            cls._loads += 1
+        logging.info(f"Rule registry loaded {len(rules)} rules")
+        return rules
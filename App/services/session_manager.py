@@ -3,16 +3,23 @@
 Session management service for handling user sessions and temporary data
 """
 
+import time
 import logging
+from io import StringIO
 from typing import Dict, Any, List, Optional
+import pandas as pd
 from flask import session
+from flask_session.sessions import FileSystemSessionInterface
 from datetime import datetime, timedelta
+from services.blob_store import BlobStore
+from services.dataframe_store import DataFrameStore
+from services.validation_results import ValidationResultStore
 
 class SessionManager:
     """Enhanced session management service"""
 
     @staticmethod
-    def initialize_upload_session(file_path: str, template_id: int, df_json: str, 
+    def initialize_upload_session(file_path: str, template_id: int, df: pd.DataFrame, 
                                  headers: List[str], sheet_name: str, header_row: int,
                                  has_existing_rules: bool = False, validations: Dict = None,
                                  selected_headers: List[str] = None):
@@ -20,12 +27,12 @@ class SessionManager:
         try:
             # Clear previous upload session data
             SessionManager.clear_upload_session()
+            SessionManager.store_dataframe(df)
             
             # Set new session data
             session_data = {
                 'file_path': file_path,
                 'template_id': template_id,
-                'df': df_json,
                 'headers': headers,
                 'sheet_name': sheet_name,
                 'header_row': header_row,
@@ -52,9 +59,15 @@ class SessionManager:
             'df', 'header_row', 'headers', 'sheet_name', 'current_step',
             'selected_headers', 'validations', 'error_cell_locations',
             'data_rows', 'corrected_file_path', 'file_path', 'template_id',
-            'has_existing_rules', 'upload_timestamp', 'corrected_df'
+            'has_existing_rules', 'upload_timestamp', 'corrected_df', 'validation_timestamp', 'file_digest'
         ]
         
+        for key in ['df', 'corrected_df']:
+            SessionManager.discard_dataframe(key)
+        SessionManager.discard_blob('validation_results')
+        result_id = session.pop('validation_result_id', None)
+        if result_id:
+            ValidationResultStore.delete(result_id)
         for key in upload_keys:
             session.pop(key, None)
         
@@ -64,12 +77,16 @@ class SessionManager:
     def get_upload_session_data() -> Dict[str, Any]:
         """Get all upload-related session data"""
         upload_keys = [
-            'file_path', 'template_id', 'df', 'headers', 'sheet_name', 'header_row',
+            'file_path', 'template_id', 'df_id', 'headers', 'sheet_name', 'header_row',
             'current_step', 'selected_headers', 'validations', 'has_existing_rules',
-            'error_cell_locations', 'data_rows', 'corrected_file_path', 'corrected_df'
+            'corrected_file_path', 'corrected_df_id'
         ]
         
-        return {key: session.get(key) for key in upload_keys}
+        data = {key: session.get(key) for key in upload_keys}
+        results = SessionManager.get_validation_results() or {}
+        data['error_cell_locations'] = results.get('error_cell_locations')
+        data['data_rows'] = results.get('data_rows')
+        return data
 
     @staticmethod
     def update_validation_step(step: int, validations: Dict = None, selected_headers: List[str] = None):
@@ -84,27 +101,96 @@ class SessionManager:
 
     @staticmethod
     def set_validation_results(error_cell_locations: Dict, data_rows: List[Dict]):
-        """Set validation results in session"""
-        session['error_cell_locations'] = error_cell_locations
-        session['data_rows'] = data_rows
-        session['validation_timestamp'] = datetime.now().isoformat()
+        """Store validation results server-side; the session keeps only their blob id"""
+        SessionManager.store_blob('validation_results', {
+            'error_cell_locations': error_cell_locations,
+            'data_rows': data_rows,
+            'validation_timestamp': datetime.now().isoformat()
+        })
         
         logging.debug(f"Validation results set: {len(error_cell_locations)} columns with errors")
 
     @staticmethod
-    def set_corrected_data(corrected_df_json: str, corrected_file_path: str):
+    def get_validation_results() -> Optional[Dict]:
+        """Validation results of the session, falling back to legacy inline values"""
+        results = SessionManager.load_blob('validation_results')
+        if results is None and 'error_cell_locations' in session:
+            results = {key: session.get(key) for key in ('error_cell_locations', 'data_rows', 'validation_timestamp')}
+        return results
+
+    @staticmethod
+    def set_corrected_data(corrected_df: pd.DataFrame, corrected_file_path: str):
         """Set corrected data in session"""
-        session['corrected_df'] = corrected_df_json
+        SessionManager.store_dataframe(corrected_df, 'corrected_df')
         session['corrected_file_path'] = corrected_file_path
         session['correction_timestamp'] = datetime.now().isoformat()
         
         logging.debug(f"Corrected data set in session: {corrected_file_path}")
 
+    @staticmethod
+    def store_dataframe(df: pd.DataFrame, key: str = 'df') -> str:
+        """Store a DataFrame server-side and keep only its handle in the session"""
+        previous_id = session.get(f'{key}_id')
+        frame_id = DataFrameStore.put(df)
+        session[f'{key}_id'] = frame_id
+        session.pop(key, None)
+        if previous_id and previous_id != frame_id:
+            DataFrameStore.delete(previous_id)
+        return frame_id
+
+    @staticmethod
+    def load_dataframe(key: str = 'df') -> Optional[pd.DataFrame]:
+        """Load the session's DataFrame, falling back to legacy JSON payloads"""
+        frame_id = session.get(f'{key}_id')
+        if frame_id:
+            return DataFrameStore.get(frame_id)
+        legacy_json = session.get(key)
+        if legacy_json:
+            return pd.read_json(StringIO(legacy_json))
+        return None
+
+    @staticmethod
+    def has_dataframe(key: str = 'df') -> bool:
+        """Check whether the session references a DataFrame"""
+        return bool(session.get(f'{key}_id') or session.get(key))
+
+    @staticmethod
+    def discard_dataframe(key: str = 'df'):
+        """Drop the session's DataFrame handle and its stored frame"""
+        frame_id = session.pop(f'{key}_id', None)
+        if frame_id:
+            DataFrameStore.delete(frame_id)
+        session.pop(key, None)
+
+    @staticmethod
+    def store_blob(key: str, data: Any, ttl: Optional[int] = None) -> str:
+        """Store a large value in the blob store and keep only its id in the session.
+
+        The blob id of a key is reused, so storing again leaves the session unmodified
+        and content that did not change is not rewritten.
+        """
+        blob_id = BlobStore.put(data, session.get(f'{key}_blob_id'), ttl)
+        if session.get(f'{key}_blob_id') != blob_id:
+            session[f'{key}_blob_id'] = blob_id
+        return blob_id
+
+    @staticmethod
+    def load_blob(key: str) -> Optional[Any]:
+        """Value stored with store_blob, or None if there is none or it expired"""
+        blob_id = session.get(f'{key}_blob_id')
+        return BlobStore.get(blob_id) if blob_id else None
+
+    @staticmethod
+    def discard_blob(key: str):
+        blob_id = session.pop(f'{key}_blob_id', None)
+        if blob_id:
+            BlobStore.delete(blob_id)
+
     @staticmethod
     def is_upload_session_valid() -> bool:
         """Check if upload session has required data"""
-        required_keys = ['template_id', 'df', 'headers']
-        return all(key in session for key in required_keys)
+        required_keys = ['template_id', 'headers']
+        return all(key in session for key in required_keys) and SessionManager.has_dataframe()
 
     @staticmethod
     def get_session_summary() -> Dict[str, Any]:
@@ -115,9 +201,9 @@ class SessionManager:
             'upload_session_active': SessionManager.is_upload_session_valid(),
             'current_step': session.get('current_step'),
             'template_id': session.get('template_id'),
-            'has_data': 'df' in session,
+            'has_data': SessionManager.has_dataframe(),
             'has_validations': bool(session.get('validations')),
-            'has_corrections': 'corrected_df' in session,
+            'has_corrections': SessionManager.has_dataframe('corrected_df'),
             'session_keys_count': len(session.keys())
         }
 
@@ -157,36 +243,41 @@ class TemporaryDataManager:
 
     @staticmethod
     def store_processing_data(key: str, data: Any, ttl_minutes: int = 60):
-        """Store temporary processing data with TTL"""
-        session[f"temp_{key}"] = {
-            'data': data,
-            'expires_at': (datetime.now() + timedelta(minutes=ttl_minutes)).isoformat()
-        }
+        """Store temporary processing data with TTL; the session keeps only the blob id"""
+        temp_key = f"temp_{key}"
+        entry = session.get(temp_key)
+        blob_id = entry.get('blob_id') if isinstance(entry, dict) else None
+        blob_id = BlobStore.put(data, blob_id, ttl_minutes * 60)
+        if entry != {'blob_id': blob_id}:
+            session[temp_key] = {'blob_id': blob_id}
 
     @staticmethod
     def retrieve_processing_data(key: str) -> Optional[Any]:
         """Retrieve temporary processing data if not expired"""
         temp_key = f"temp_{key}"
-        if temp_key in session:
-            temp_data = session[temp_key]
-            expires_at = datetime.fromisoformat(temp_data['expires_at'])
-            if datetime.now() < expires_at:
-                return temp_data['data']
-            else:
-                # Remove expired data
-                session.pop(temp_key, None)
-        return None
+        entry = session.get(temp_key)
+        if not isinstance(entry, dict):
+            return None
+        if 'blob_id' in entry:
+            data = BlobStore.get(entry['blob_id'])
+        elif datetime.now() < datetime.fromisoformat(entry['expires_at']):
+            # Stored inline by an earlier version
+            data = entry['data']
+        else:
+            data = None
+        if data is None:
+            # Remove expired data
+            session.pop(temp_key, None)
+        return data
 
     @staticmethod
     def clear_processing_data(key: str = None):
         """Clear specific temporary data or all temporary data"""
-        if key:
-            session.pop(f"temp_{key}", None)
-        else:
-            # Clear all temporary data
-            keys_to_remove = [k for k in session.keys() if k.startswith('temp_')]
-            for k in keys_to_remove:
-                session.pop(k, None)
+        keys_to_remove = [f"temp_{key}"] if key else [k for k in session.keys() if k.startswith('temp_')]
+        for k in keys_to_remove:
+            entry = session.pop(k, None)
+            if isinstance(entry, dict) and 'blob_id' in entry:
+                BlobStore.delete(entry['blob_id'])
 
     @staticmethod
     def cleanup_expired_temp_data():
@@ -196,10 +287,13 @@ class TemporaryDataManager:
             keys_to_remove = []
             
             for key, value in session.items():
-                if key.startswith('temp_') and isinstance(value, dict):
-                    expires_at = datetime.fromisoformat(value.get('expires_at', ''))
-                    if current_time >= expires_at:
+                if not key.startswith('temp_') or not isinstance(value, dict):
+                    continue
+                if 'blob_id' in value:
+                    if not BlobStore.exists(value['blob_id']):
                         keys_to_remove.append(key)
+                elif current_time >= datetime.fromisoformat(value.get('expires_at', '')):
+                    keys_to_remove.append(key)
             
             for key in keys_to_remove:
                 session.pop(key, None)
@@ -208,3 +302,47 @@ class TemporaryDataManager:
                 logging.debug(f"Cleaned up {len(keys_to_remove)} expired temporary data items")
         except Exception as e:
             logging.error(f"Error cleaning up expired temporary data: {str(e)}")
+
+
+class WriteOnChangeSessionInterface(FileSystemSessionInterface):
+    """Filesystem sessions that are written only when a request changed them.
+
+    Flask-Session rewrites the session file on every response. Sessions here hold
+    only small values, and most requests (polling a job, paging results) do not
+    change them, so an unmodified session is neither rewritten nor re-sent as a
+    cookie unless SESSION_REFRESH_EACH_REQUEST asks for it. Once an unmodified
+    session has used up RENEW_AFTER of its lifetime it is saved again, which
+    renews its file timeout and cookie: sessions still expire after
+    PERMANENT_SESSION_LIFETIME of inactivity, not that long after their last change.
+    """
+
+    # Share of PERMANENT_SESSION_LIFETIME after which an unchanged session is saved again
+    RENEW_AFTER = 0.5
+    # Time of the last save, kept in the session itself
+    SAVED_AT_KEY = '_saved_at'
+
+    def save_session(self, app, session, response):
+        if (session and not session.modified and not self.should_set_cookie(app, session)
+                and not self.needs_renewal(app, session)):
+            return
+        if session:
+            session[self.SAVED_AT_KEY] = time.time()
+        super().save_session(app, session, response)
+
+    def needs_renewal(self, app, session) -> bool:
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        return time.time() - session.get(self.SAVED_AT_KEY, 0) >= lifetime * self.RENEW_AFTER
+
+    @classmethod
+    def init_app(cls, app):
+        """Install the interface with Flask-Session's filesystem settings"""
+        app.config.setdefault('SESSION_FILE_THRESHOLD', 500)
+        app.config.setdefault('SESSION_FILE_MODE', 0o600)
+        app.config.setdefault('SESSION_KEY_PREFIX', 'session:')
+        app.config.setdefault('SESSION_USE_SIGNER', False)
+        app.config.setdefault('SESSION_PERMANENT', True)
+        app.session_interface = cls(
+            app.config['SESSION_FILE_DIR'], app.config['SESSION_FILE_THRESHOLD'],
+            app.config['SESSION_FILE_MODE'], app.config['SESSION_KEY_PREFIX'],
+            app.config['SESSION_USE_SIGNER'], app.config['SESSION_PERMANENT']
+        )
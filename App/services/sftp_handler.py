@@ -1,39 +1,45 @@
 import paramiko
 import os
+import time
+import stat
+import fnmatch
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import  datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+from services.sftp_pool import SFTPConnectionPool
 
 class SFTPHandler:
+    """SFTP operations over pooled sessions (see SFTPConnectionPool)"""
+
+    INBOUND_PATH = "/Inbound"
+    OUTBOUND_PATH = "/Outbound"
+    PROCESSING_PATH = "/processing"
+
+    # Read requests kept in flight per download, and the local write size
+    PREFETCH_REQUESTS = 64
+    COPY_BUFFER_SIZE = 1024 * 1024
+
+    @staticmethod
+    def session(sftp_config: Dict):
+        """Pooled session for a config dict with hostname, username, password and optional port"""
+        return SFTPConnectionPool.session(
+            sftp_config['hostname'], sftp_config['username'], sftp_config['password'],
+            int(sftp_config.get('port', 22))
+        )
+
     @staticmethod
     def test_connection(hostname: str, username: str, password: str,
                        port: int = 22, path: str = "") -> Tuple[bool, str]:
         """Test SFTP connection with comprehensive error reporting"""
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
         try:
-            # Establish SSH connection
-            client.connect(
-                hostname=hostname,
-                port=port,
-                username=username,
-                password=password,
-                timeout=10,
-                allow_agent=False,
-                look_for_keys=False
-            )
-            
-            # Test SFTP operations
-            sftp = client.open_sftp()
-            try:
-                # Test directory access
-                sftp.listdir(path or '.')
-                return True, f"SFTP connection successful to path {path or '.'}"
-            except IOError as io_err:
-                return False, f"Invalid path: {str(io_err)}"
-            finally:
-                sftp.close()
+            with SFTPConnectionPool.session(hostname, username, password, port) as conn:
+                try:
+                    # Test directory access
+                    conn.sftp.listdir(path or '.')
+                    return True, f"SFTP connection successful to path {path or '.'}"
+                except IOError as io_err:
+                    return False, f"Invalid path: {str(io_err)}"
         
         except paramiko.AuthenticationException:
             return False, "Authentication failed: Invalid credentials"
@@ -41,117 +47,270 @@ class SFTPHandler:
             return False, f"SSH connection failed: {str(ssh_err)}"
         except Exception as conn_err:
             return False, f"Failed to connect to SFTP server: {str(conn_err)}"
-        finally:
-            client.close()
     
     @staticmethod
     def fetch_file(hostname: str, username: str, password: str, remote_file_path: str,
                    local_upload_folder: str, port: int = 22) -> Tuple[bool, str, str]:
         """Securely fetch file from SFTP server"""
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
         try:
-            # Connect and authenticate
-            client.connect(
-                hostname=hostname,
-                port=port,
-                username=username,
-                password=password,
-                timeout=10,
-                allow_agent=False,
-                look_for_keys=False
-            )
-            
-            sftp = client.open_sftp()
-            try:
-                # Ensure local directory exists
-                os.makedirs(local_upload_folder, exist_ok=True)
-                
-                # Extract filename and create local path
-                filename = os.path.basename(remote_file_path)
-                if not filename:
-                    return False, "Invalid remote file path", None
-                
-                local_file_path = os.path.join(local_upload_folder, filename)
-                
-                # Download file
-                sftp.get(remote_file_path, local_file_path)
-                
-                logging.info(f"Successfully downloaded {remote_file_path} to {local_file_path}")
-                return True, "File downloaded successfully", local_file_path
-                
-            except IOError as io_err:
-                return False, f"File not found or inaccessible: {str(io_err)}", None
-            finally:
-                sftp.close()
+            with SFTPConnectionPool.session(hostname, username, password, port) as conn:
+                try:
+                    # Ensure local directory exists
+                    os.makedirs(local_upload_folder, exist_ok=True)
+                    
+                    # Extract filename and create local path
+                    filename = os.path.basename(remote_file_path)
+                    if not filename:
+                        return False, "Invalid remote file path", None
+                    
+                    local_file_path = os.path.join(local_upload_folder, filename)
+                    
+                    # Download file
+                    conn.sftp.get(remote_file_path, local_file_path)
+                    
+                    logging.info(f"Successfully downloaded {remote_file_path} to {local_file_path}")
+                    return True, "File downloaded successfully", local_file_path
+                    
+                except IOError as io_err:
+                    return False, f"File not found or inaccessible: {str(io_err)}", None
         
         except paramiko.AuthenticationException:
             return False, "Authentication failed: Invalid credentials", None
         except Exception as e:
             return False, f"SFTP operation failed: {str(e)}", None
-        finally:
-            client.close()
     
     @staticmethod
     def move_and_upload_file(hostname: str, username: str, password: str,
                             local_file_path: str, original_remote_path: str,
                             port: int = 22) -> Tuple[bool, str]:
         """Move original file to processing and upload corrected file to outbound"""
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
         try:
-            client.connect(hostname=hostname, username=username, password=password, timeout=10)
-            sftp = client.open_sftp()
-            
-            try:
-                # Define standardized folder structure
-                inbound_path = "/Inbound"
-                outbound_path = "/Outbound"
-                processing_path = "/processing"
-                
-                # Verify required folders exist
-                for folder in [inbound_path, outbound_path, processing_path]:
-                    try:
-                        sftp.stat(folder)
-                    except IOError as e:
-                        return False, f"{folder} folder not found: {str(e)}"
-                
-                # Upload corrected file to Outbound directory
-                outbound_file_path = f"{outbound_path}/{os.path.basename(local_file_path)}"
-                sftp.put(local_file_path, outbound_file_path)
-                
-                # Move original file from Inbound to processing
-                template_name = os.path.basename(original_remote_path)
-                inbound_files = sftp.listdir(inbound_path)
-                inbound_files_lower = {f.lower(): f for f in inbound_files}
-                template_name_lower = template_name.lower()
-                
-                # Search for original file with possible extensions
-                possible_extensions = ['', '.xlsx', '.csv', '.txt', '.dat']
-                found_original = False
-                
-                for ext in possible_extensions:
-                    test_file_lower = f"{template_name_lower}{ext.lower()}"
-                    if test_file_lower in inbound_files_lower:
-                        original_file = f"{inbound_path}/{inbound_files_lower[test_file_lower]}"
-                        process_file_path = f"{processing_path}/{os.path.basename(original_file)}"
+            with SFTPConnectionPool.session(hostname, username, password, port) as conn:
+                sftp = conn.sftp
+                try:
+                    # Verify required folders exist, once per pooled session
+                    verified = conn.cache.setdefault('verified_folders', set())
+                    for folder in [SFTPHandler.INBOUND_PATH, SFTPHandler.OUTBOUND_PATH, SFTPHandler.PROCESSING_PATH]:
+                        if folder in verified:
+                            continue
+                        try:
+                            sftp.stat(folder)
+                            verified.add(folder)
+                        except IOError as e:
+                            return False, f"{folder} folder not found: {str(e)}"
+                    
+                    # Upload corrected file to Outbound directory
+                    outbound_file_path = f"{SFTPHandler.OUTBOUND_PATH}/{os.path.basename(local_file_path)}"
+                    sftp.put(local_file_path, outbound_file_path)
+                    
+                    # Move original file from Inbound to processing
+                    template_name = os.path.basename(original_remote_path)
+                    original_file = SFTPHandler._find_inbound_original(sftp, template_name)
+                    if original_file:
+                        process_file_path = f"{SFTPHandler.PROCESSING_PATH}/{os.path.basename(original_file)}"
                         sftp.rename(original_file, process_file_path)
-                        found_original = True
                         logging.info(f"Moved original file from {original_file} to {process_file_path}")
-                        break
-                
-                if not found_original:
-                    logging.warning(f"Original file not found for moving: {template_name}")
-                
-                return True, "File approved and moved successfully"
-                
-            except IOError as e:
-                return False, f"File operation failed: {str(e)}"
-            finally:
-                sftp.close()
+                    else:
+                        logging.warning(f"Original file not found for moving: {template_name}")
+                    
+                    return True, "File approved and moved successfully"
+                    
+                except IOError as e:
+                    return False, f"File operation failed: {str(e)}"
         except Exception as e:
             return False, f"SFTP operation failed: {str(e)}"
-        finally:
-            client.close()
\ No newline at end of file
+
+    @staticmethod
+    def _find_inbound_original(sftp: paramiko.SFTPClient, template_name: str) -> Optional[str]:
+        """Remote path of the original file in Inbound, matching names case-insensitively"""
+        possible_extensions = ['', '.xlsx', '.csv', '.txt', '.dat']
+        # Exact names first: a stat per candidate is cheaper than listing a full Inbound folder
+        for ext in possible_extensions:
+            candidate = f"{SFTPHandler.INBOUND_PATH}/{template_name}{ext}"
+            try:
+                if stat.S_ISREG(sftp.stat(candidate).st_mode):
+                    return candidate
+            except IOError:
+                continue
+        
+        inbound_files_lower = {f.lower(): f for f in sftp.listdir(SFTPHandler.INBOUND_PATH)}
+        template_name_lower = template_name.lower()
+        for ext in possible_extensions:
+            test_file_lower = f"{template_name_lower}{ext.lower()}"
+            if test_file_lower in inbound_files_lower:
+                return f"{SFTPHandler.INBOUND_PATH}/{inbound_files_lower[test_file_lower]}"
+        return None
+
+    @staticmethod
+    def upload_file(sftp_config: Dict, local_path: str, remote_path: str) -> Tuple[bool, str]:
+        """Upload a local file to the given remote path"""
+        try:
+            with SFTPHandler.session(sftp_config) as conn:
+                conn.sftp.put(local_path, remote_path)
+            logging.info(f"Uploaded {local_path} to {remote_path}")
+            return True, "File uploaded successfully"
+        except paramiko.AuthenticationException:
+            return False, "Authentication failed: Invalid credentials"
+        except Exception as e:
+            return False, str(e)
+
+    @staticmethod
+    def download_file(sftp_config: Dict, remote_path: str, local_path: str) -> Tuple[bool, str]:
+        """Download a remote file to the given local path"""
+        try:
+            local_dir = os.path.dirname(local_path)
+            if local_dir:
+                os.makedirs(local_dir, exist_ok=True)
+            with SFTPHandler.session(sftp_config) as conn:
+                conn.sftp.get(remote_path, local_path)
+            logging.info(f"Downloaded {remote_path} to {local_path}")
+            return True, "File downloaded successfully"
+        except paramiko.AuthenticationException:
+            return False, "Authentication failed: Invalid credentials"
+        except Exception as e:
+            return False, str(e)
+
+    @staticmethod
+    def list_files(sftp_config: Dict, remote_path: str) -> Tuple[Optional[List[Dict]], str]:
+        """Entries of a remote directory with size, modification time and type"""
+        try:
+            with SFTPHandler.session(sftp_config) as conn:
+                entries = conn.sftp.listdir_attr(remote_path or '.')
+            files = [SFTPHandler._describe(entry, entry.filename) for entry in entries]
+            return sorted(files, key=lambda f: f['name']), "Files listed successfully"
+        except paramiko.AuthenticationException:
+            return None, "Authentication failed: Invalid credentials"
+        except Exception as e:
+            return None, str(e)
+
+    @staticmethod
+    def delete_file(sftp_config: Dict, remote_path: str) -> Tuple[bool, str]:
+        """Delete a remote file"""
+        try:
+            with SFTPHandler.session(sftp_config) as conn:
+                conn.sftp.remove(remote_path)
+            logging.info(f"Deleted remote file {remote_path}")
+            return True, "File deleted successfully"
+        except paramiko.AuthenticationException:
+            return False, "Authentication failed: Invalid credentials"
+        except Exception as e:
+            return False, str(e)
+
+    @staticmethod
+    def create_directory(sftp_config: Dict, remote_path: str) -> Tuple[bool, str]:
+        """Create a remote directory, including missing parents"""
+        try:
+            with SFTPHandler.session(sftp_config) as conn:
+                sftp = conn.sftp
+                current = '/' if remote_path.startswith('/') else ''
+                for part in [p for p in remote_path.split('/') if p]:
+                    current = f"{current.rstrip('/')}/{part}" if current else part
+                    try:
+                        sftp.stat(current)
+                    except IOError:
+                        sftp.mkdir(current)
+            return True, "Directory created successfully"
+        except paramiko.AuthenticationException:
+            return False, "Authentication failed: Invalid credentials"
+        except Exception as e:
+            return False, str(e)
+
+    @staticmethod
+    def get_file_info(sftp_config: Dict, remote_path: str) -> Tuple[Optional[Dict], str]:
+        """Size, modification time and type of a remote path"""
+        try:
+            with SFTPHandler.session(sftp_config) as conn:
+                attributes = conn.sftp.stat(remote_path)
+            info = SFTPHandler._describe(attributes, os.path.basename(remote_path.rstrip('/')) or remote_path)
+            info['path'] = remote_path
+            return info, "File info retrieved successfully"
+        except paramiko.AuthenticationException:
+            return None, "Authentication failed: Invalid credentials"
+        except Exception as e:
+            return None, str(e)
+
+    @staticmethod
+    def download_directory(sftp_config: Dict, remote_dir: str, local_dir: str, pattern: str = '*',
+                           max_workers: Optional[int] = None) -> Tuple[Optional[List[Dict]], str]:
+        """Download the files of a remote directory matching pattern, several at a time.
+
+        Each worker draws its own pooled session, so at most the pool's per-host
+        limit of downloads run at once. Returns one entry per file with its
+        size, duration and throughput, or None if the directory cannot be listed.
+        """
+        try:
+            with SFTPHandler.session(sftp_config) as conn:
+                entries = conn.sftp.listdir_attr(remote_dir)
+        except paramiko.AuthenticationException:
+            return None, "Authentication failed: Invalid credentials"
+        except Exception as e:
+            return None, str(e)
+
+        pattern = pattern.lower()
+        entries = sorted(
+            (entry for entry in entries
+             if stat.S_ISREG(entry.st_mode or 0) and fnmatch.fnmatchcase(entry.filename.lower(), pattern)),
+            key=lambda entry: entry.filename
+        )
+        if not entries:
+            return [], "No matching files"
+
+        os.makedirs(local_dir, exist_ok=True)
+        workers = min(max_workers or SFTPConnectionPool.max_per_host(), SFTPConnectionPool.max_per_host(), len(entries))
+
+        def download(entry):
+            remote_path = f"{remote_dir.rstrip('/')}/{entry.filename}"
+            result = {'name': entry.filename, 'remote_path': remote_path, 'size': entry.st_size}
+            try:
+                with SFTPHandler.session(sftp_config) as conn:
+                    result.update(SFTPHandler._download(conn.sftp, remote_path,
+                                                        os.path.join(local_dir, entry.filename), entry.st_size))
+                result['success'] = True
+            except Exception as e:
+                logging.error(f"Error downloading {remote_path}: {str(e)}")
+                result.update({'success': False, 'message': str(e)})
+            return result
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(download, entries))
+        downloaded = sum(1 for result in results if result['success'])
+        return results, f"Downloaded {downloaded} of {len(results)} files"
+
+    @staticmethod
+    def _download(sftp: paramiko.SFTPClient, remote_path: str, local_path: str, expected_size: int) -> Dict:
+        """Pipelined download to local_path; the file only appears once its size is verified"""
+        tmp_path = f"{local_path}.part"
+        start = time.perf_counter()
+        try:
+            with sftp.open(remote_path, 'rb') as remote, open(tmp_path, 'wb') as local:
+                # Queue the read requests for the whole file up front instead of one round trip per block
+                remote.prefetch(expected_size, SFTPHandler.PREFETCH_REQUESTS)
+                copied = 0
+                while True:
+                    block = remote.read(SFTPHandler.COPY_BUFFER_SIZE)
+                    if not block:
+                        break
+                    local.write(block)
+                    copied += len(block)
+            if copied != expected_size:
+                raise IOError(f"Size mismatch: expected {expected_size} bytes, received {copied}")
+            os.replace(tmp_path, local_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        seconds = time.perf_counter() - start
+        return {
+            'local_path': local_path,
+            'seconds': round(seconds, 4),
+            'mb_per_s': round(copied / 1048576 / seconds, 2) if seconds > 0 else None
+        }
+
+    @staticmethod
+    def _describe(attributes: paramiko.SFTPAttributes, name: str) -> Dict:
+        return {
+            'name': name,
+            'size': attributes.st_size,
+            'modified': datetime.fromtimestamp(attributes.st_mtime).isoformat() if attributes.st_mtime else None,
+            'is_directory': stat.S_ISDIR(attributes.st_mode or 0)
+        }
\ No newline at end of file
@@ -0,0 +1,244 @@
+# services/sftp_pool.py
+"""
+Pool of live SFTP sessions.
+
+Sessions are keyed by (hostname, port, username) and reused across requests,
+so a burst of SFTP operations against one server pays for the TCP connect,
+SSH handshake and authentication once. Transports send keepalives, sessions
+idle for longer than the idle timeout are closed, a session that sat idle is
+health-checked before it is handed out again, and at most max_per_host
+sessions are open per key; further callers wait for one to be released.
+"""
+
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+import paramiko
+
+
+class SFTPPoolTimeout(paramiko.SSHException):
+    """No pooled session became free within the acquire timeout"""
+
+
+class PooledSFTPSession:
+    """An open SSH client and SFTP channel checked out of the pool"""
+
+    def __init__(self, key: Tuple[str, int, str], client: paramiko.SSHClient, sftp: paramiko.SFTPClient,
+                 credential: str):
+        self.key = key
+        self.client = client
+        self.sftp = sftp
+        self.credential = credential
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # Per-session memo for callers, e.g. remote folders already known to exist
+        self.cache: Dict = {}
+
+    def is_active(self) -> bool:
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def close(self):
+        for closeable in (self.sftp, self.client):
+            try:
+                closeable.close()
+            except Exception as e:
+                logging.debug(f"Error closing SFTP session to {self.key[0]}: {str(e)}")
+
+
+class SFTPConnectionPool:
+    """Process-wide pool of SFTP sessions per (hostname, port, username)"""
+
+    DEFAULT_MAX_PER_HOST = 4
+    DEFAULT_IDLE_TIMEOUT = 300.0
+    DEFAULT_KEEPALIVE = 30
+    DEFAULT_CONNECT_TIMEOUT = 10.0
+    DEFAULT_ACQUIRE_TIMEOUT = 30.0
+    # A session idle for longer than this is probed with a round trip before reuse
+    HEALTH_CHECK_AFTER = 15.0
+
+    _max_per_host = DEFAULT_MAX_PER_HOST
+    _idle_timeout = DEFAULT_IDLE_TIMEOUT
+    _keepalive = DEFAULT_KEEPALIVE
+    _connect_timeout = DEFAULT_CONNECT_TIMEOUT
+    _acquire_timeout = DEFAULT_ACQUIRE_TIMEOUT
+
+    _idle: Dict[Tuple[str, int, str], List[PooledSFTPSession]] = {}
+    _open: Dict[Tuple[str, int, str], int] = {}
+    _condition = threading.Condition()
+    _stats = {'connects': 0, 'reuses': 0, 'evictions': 0, 'discards': 0, 'waits': 0, 'timeouts': 0}
+
+    @classmethod
+    def configure(cls, max_per_host: int = DEFAULT_MAX_PER_HOST, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                  keepalive: int = DEFAULT_KEEPALIVE, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                  acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT):
+        """Set pool limits and timeouts; open sessions are closed"""
+        cls.close_all()
+        with cls._condition:
+            cls._max_per_host = max(1, int(max_per_host))
+            cls._idle_timeout = float(idle_timeout)
+            cls._keepalive = int(keepalive)
+            cls._connect_timeout = float(connect_timeout)
+            cls._acquire_timeout = float(acquire_timeout)
+            cls._stats = dict.fromkeys(cls._stats, 0)
+
+    @classmethod
+    @contextmanager
+    def session(cls, hostname: str, username: str, password: str, port: int = 22):
+        """Check out a session for the duration of a with block.
+
+        The session goes back to the pool afterwards unless its transport died,
+        in which case it is closed; SFTP errors such as a missing file leave a
+        healthy session reusable.
+        """
+        pooled = cls.acquire(hostname, username, password, port)
+        try:
+            yield pooled
+        finally:
+            cls.release(pooled)
+
+    @classmethod
+    def acquire(cls, hostname: str, username: str, password: str, port: int = 22) -> PooledSFTPSession:
+        """Reuse an idle session for the key or open a new one, waiting if the key is at its limit"""
+        key = (hostname, int(port), username)
+        credential = hashlib.sha256(password.encode('utf-8')).hexdigest()
+        deadline = None
+        cls.evict_idle()
+        while True:
+            with cls._condition:
+                idle = cls._idle.get(key)
+                pooled = idle.pop() if idle else None
+                if pooled is None:
+                    if cls._open.get(key, 0) >= cls._max_per_host:
+                        if deadline is None:
+                            deadline = time.monotonic() + cls._acquire_timeout
+                            cls._stats['waits'] += 1
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            cls._stats['timeouts'] += 1
+                            raise SFTPPoolTimeout(
+                                f"No SFTP session to {hostname} freed within {cls._acquire_timeout}s"
+                            )
+                        cls._condition.wait(remaining)
+                        continue
+                    # Reserve the slot before connecting outside the lock
+                    cls._open[key] = cls._open.get(key, 0) + 1
+
+            if pooled is not None:
+                # A session opened with other credentials is never handed to this caller
+                if pooled.credential == credential and cls._healthy(pooled):
+                    with cls._condition:
+                        cls._stats['reuses'] += 1
+                    return pooled
+                cls._discard(pooled)
+                continue
+
+            try:
+                pooled = cls._connect(key, password, credential)
+            except Exception:
+                with cls._condition:
+                    cls._open[key] -= 1
+                    cls._condition.notify()
+                raise
+            with cls._condition:
+                cls._stats['connects'] += 1
+            return pooled
+
+    @classmethod
+    def release(cls, pooled: PooledSFTPSession):
+        """Return a session to the pool, or close it if its connection is gone"""
+        if not pooled.is_active():
+            cls._discard(pooled)
+            return
+        pooled.last_used = time.monotonic()
+        with cls._condition:
+            cls._idle.setdefault(pooled.key, []).append(pooled)
+            cls._condition.notify()
+
+    @classmethod
+    def evict_idle(cls):
+        """Close sessions that have been idle for longer than the idle timeout"""
+        cutoff = time.monotonic() - cls._idle_timeout
+        expired = []
+        with cls._condition:
+            for key, idle in cls._idle.items():
+                keep = [pooled for pooled in idle if pooled.last_used >= cutoff]
+                expired.extend(pooled for pooled in idle if pooled.last_used < cutoff)
+                idle[:] = keep
+            cls._stats['evictions'] += len(expired)
+        for pooled in expired:
+            cls._discard(pooled, count=False)
+
+    @classmethod
+    def close_all(cls):
+        """Close every idle session"""
+        with cls._condition:
+            sessions = [pooled for idle in cls._idle.values() for pooled in idle]
+            cls._idle.clear()
+        for pooled in sessions:
+            cls._discard(pooled, count=False)
+
+    @classmethod
+    def max_per_host(cls) -> int:
+        return cls._max_per_host
+
+    @classmethod
+    def stats(cls) -> Dict:
+        with cls._condition:
+            stats = dict(cls._stats)
+            stats.update({
+                'max_per_host': cls._max_per_host,
+                'idle_timeout': cls._idle_timeout,
+                'open': {f"{user}@{host}:{port}": count for (host, port, user), count in cls._open.items() if count},
+                'idle': sum(len(idle) for idle in cls._idle.values())
+            })
+        return stats
+
+    @classmethod
+    def _connect(cls, key: Tuple[str, int, str], password: str, credential: str) -> PooledSFTPSession:
+        hostname, port, username = key
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            client.connect(
+                hostname=hostname,
+                port=port,
+                username=username,
+                password=password,
+                timeout=cls._connect_timeout,
+                allow_agent=False,
+                look_for_keys=False
+            )
+            client.get_transport().set_keepalive(cls._keepalive)
+            sftp = client.open_sftp()
+        except Exception:
+            client.close()
+            raise
+        logging.info(f"Opened pooled SFTP session to {username}@{hostname}:{port}")
+        return PooledSFTPSession(key, client, sftp, credential)
+
+    @classmethod
+    def _healthy(cls, pooled: PooledSFTPSession) -> bool:
+        if not pooled.is_active():
+            return False
+        if time.monotonic() - pooled.last_used < cls.HEALTH_CHECK_AFTER:
+            return True
+        try:
+            pooled.sftp.normalize('.')
+            return True
+        except Exception as e:
+            logging.info(f"Pooled SFTP session to {pooled.key[0]} failed its health check: {str(e)}")
+            return False
+
+    @classmethod
+    def _discard(cls, pooled: PooledSFTPSession, count: bool = True):
+        pooled.close()
+        with cls._condition:
+            cls._open[pooled.key] = max(0, cls._open.get(pooled.key, 0) - 1)
+            if count:
+                cls._stats['discards'] += 1
+            cls._condition.notify()
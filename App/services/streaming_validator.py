@@ -0,0 +1,179 @@
+# services/streaming_validator.py
+"""
+Streaming validation for large delimited files.
+
+CSV/TXT/DAT files are read chunk by chunk with the C parser, every template
+rule is applied to each chunk, error locations are written out with global
+row numbers and the corrected output is appended chunk by chunk, so memory
+stays bounded by the chunk size rather than the file size.
+"""
+
+import os
+import csv
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from services.file_handler import FileHandler
+from services.memory_manager import MemoryManager
+from services.validation_engine import ValidationEngine
+from utils.constants import DATE_FORMAT_MAPPING, DEFAULT_DATE_FORMATS, MAX_HEADER_DETECTION_ROWS
+
+
+class StreamingValidator:
+    """Chunked validation and correction of delimited text files"""
+
+    TEXT_EXTENSIONS = ('.txt', '.csv', '.dat')
+    DEFAULT_CHUNK_SIZE = 50000
+    MAX_ERROR_SAMPLES = 1000
+
+    @staticmethod
+    def supports(file_path: str) -> bool:
+        return file_path.lower().endswith(StreamingValidator.TEXT_EXTENSIONS)
+
+    @staticmethod
+    def read_headers(file_path: str, sep: Optional[str] = None) -> Tuple[int, List[str]]:
+        """Detect the header row from the first rows of the file only"""
+        sep = sep or FileHandler.sniff_delimiter(file_path)
+        head = pd.read_csv(file_path, header=None, sep=sep, encoding='utf-8', quotechar='"',
+                           nrows=MAX_HEADER_DETECTION_ROWS, dtype=str)
+        header_row = FileHandler.find_header_row(head)
+        if header_row == -1:
+            raise ValueError("Could not detect header row")
+        return header_row, head.iloc[header_row].tolist()
+
+    @staticmethod
+    def iter_chunks(file_path: str, headers: List[str], header_row: int,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, sep: Optional[str] = None):
+        """Yield (row_offset, chunk) pairs for the data rows below the header row"""
+        sep = sep or FileHandler.sniff_delimiter(file_path)
+        # Cells stay strings, exactly as they are when the header row shares their column
+        chunks = MemoryManager.iter_file_chunks(
+            file_path, chunk_size, header=None, sep=sep, encoding='utf-8', quotechar='"',
+            skiprows=header_row + 1, names=list(range(len(headers))), dtype=str
+        )
+        offset = 0
+        for chunk in chunks:
+            chunk.columns = headers
+            chunk.reset_index(drop=True, inplace=True)
+            yield offset, chunk
+            offset += len(chunk)
+
+    @staticmethod
+    def validate_file(file_path: str, rules: List[Dict], errors_path: str,
+                      output_path: Optional[str] = None, corrections: Optional[Dict] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+        """Validate a delimited file chunk by chunk.
+
+        rules are dicts with column_name, rule_name and source_format, as stored for the
+        template. Every error is written to errors_path with its global (1-based) data row;
+        if output_path is given, the data with corrections applied is written there.
+        """
+        try:
+            sep = FileHandler.sniff_delimiter(file_path)
+            header_row, headers = StreamingValidator.read_headers(file_path, sep)
+            pending = StreamingValidator._index_corrections(corrections or {}, headers)
+            # One date verdict cache per rule, shared by all chunks
+            verdict_caches = [{} for _ in rules]
+
+            error_counts: Dict[str, int] = {}
+            error_samples: List[Dict] = []
+            total_rows = 0
+            correction_count = 0
+
+            with open(errors_path, 'w', newline='', encoding='utf-8') as errors_file:
+                error_writer = csv.writer(errors_file)
+                error_writer.writerow(['row', 'column', 'value', 'rule_failed', 'reason'])
+
+                for offset, chunk in StreamingValidator.iter_chunks(file_path, headers, header_row, chunk_size, sep):
+                    for rule, verdict_cache in zip(rules, verdict_caches):
+                        column_name = rule['column_name']
+                        count, locations = StreamingValidator._check_rule(chunk, rule, verdict_cache)
+                        if not count:
+                            continue
+                        error_counts[column_name] = error_counts.get(column_name, 0) + count
+                        for row, value, rule_failed, reason in locations:
+                            error_writer.writerow([offset + row, column_name, value, rule_failed, reason])
+                            if len(error_samples) < StreamingValidator.MAX_ERROR_SAMPLES:
+                                error_samples.append({
+                                    'row': offset + row, 'column': column_name, 'value': value,
+                                    'rule_failed': rule_failed, 'reason': reason
+                                })
+
+                    if output_path:
+                        correction_count += StreamingValidator._apply_corrections(chunk, offset, pending)
+                        chunk.to_csv(output_path, mode='w' if offset == 0 else 'a',
+                                     header=offset == 0, index=False)
+                    total_rows += len(chunk)
+
+            if output_path and total_rows == 0:
+                pd.DataFrame(columns=headers).to_csv(output_path, index=False)
+
+            logging.info(f"Streaming validation of {file_path}: {total_rows} rows, "
+                         f"{sum(error_counts.values())} errors, {correction_count} corrections")
+            return {
+                'total_rows': total_rows,
+                'header_row': header_row,
+                'headers': headers,
+                'error_counts': error_counts,
+                'error_samples': error_samples,
+                'errors_path': errors_path,
+                'output_path': output_path,
+                'correction_count': correction_count
+            }
+        except Exception as e:
+            logging.error(f"Error in streaming validation of {file_path}: {str(e)}")
+            raise
+
+    @staticmethod
+    def _check_rule(chunk: pd.DataFrame, rule: Dict, verdict_cache: Dict[str, bool]) -> Tuple[int, List[Tuple]]:
+        column_name, rule_name = rule['column_name'], rule['rule_name']
+        source_format = rule.get('source_format')
+        accepted_formats = DEFAULT_DATE_FORMATS
+        if rule_name.startswith('Date(') and source_format:
+            accepted_formats = [DATE_FORMAT_MAPPING.get(source_format, '%d-%m-%Y')]
+
+        if ValidationEngine.is_builtin_rule(rule_name):
+            return ValidationEngine.check_column(chunk[column_name], rule_name, accepted_formats, True,
+                                                 source_format, verdict_cache)
+
+        # Composite custom rules need their stored definition
+        from models.validation import DataValidator
+        return DataValidator.check_special_characters_in_column(chunk, column_name, rule_name, accepted_formats, True)
+
+    @staticmethod
+    def _index_corrections(corrections: Dict, headers: List[str]) -> Dict[str, pd.Series]:
+        """Turn {column: {row: value}} into per-column Series sorted by data row"""
+        pending = {}
+        for column, row_corrections in corrections.items():
+            if column not in headers:
+                logging.warning(f"Column {column} not found in headers")
+                continue
+            values = {}
+            for row_str, corrected_value in row_corrections.items():
+                try:
+                    values[int(row_str)] = corrected_value
+                except ValueError:
+                    logging.warning(f"Invalid correction row: {row_str}, {column}")
+            if values:
+                pending[column] = pd.Series(values, dtype=object).sort_index()
+        return pending
+
+    @staticmethod
+    def _apply_corrections(chunk: pd.DataFrame, offset: int, pending: Dict[str, pd.Series]) -> int:
+        applied = 0
+        for column, values in pending.items():
+            in_chunk = values.loc[offset:offset + len(chunk) - 1]
+            if in_chunk.empty:
+                continue
+            chunk.loc[in_chunk.index - offset, column] = in_chunk.to_numpy()
+            applied += len(in_chunk)
+        return applied
+
+    @staticmethod
+    def output_paths(file_path: str, upload_folder: str, phase: str = 'corrected') -> Tuple[str, str]:
+        """Corrected-output and error-report paths next to the other generated files"""
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        return (os.path.join(upload_folder, f"{base_name}_{phase}.csv"),
+                os.path.join(upload_folder, f"{base_name}_{phase}_errors.csv"))
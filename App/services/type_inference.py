@@ -0,0 +1,225 @@
+# services/type_inference.py
+"""
+Sampled, single-pass column type inference.
+
+Each column is reduced to its distinct values (optionally on a sample), the
+values are laid out as a codepoint matrix and classified with numpy masks in
+one pass; date candidates are checked field by field with the same rules as
+pd.to_datetime and only Email candidates go through a regex. The result
+carries the match ratio of every type, weighted by how often each value
+occurs, and the detected type is the first type in TYPE_ORDER whose ratio
+reaches min_ratio. As before, a column is only a Date
+column if its values match one date format, not a mix of them.
+
+Without sampling and with min_ratio 1.0 the detected type is the same as the
+original regex/to_datetime fallthrough. With sampling, a column whose stray
+values are missed by the sample gets the majority type, and the rule assigned
+for it reports those values as errors.
+"""
+
+import re
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from services.validation_engine import ValidationEngine
+
+
+class TypeInference:
+    """Per-column type detection with per-type match ratios"""
+
+    # Checked in this order; the first type reaching min_ratio wins, otherwise Text
+    TYPE_ORDER = ('Email', 'Date', 'Boolean', 'Int', 'Float', 'Alphanumeric')
+    DATE_FORMATS = ('%d-%m-%Y', '%Y-%m-%d')
+    BOOLEAN_VALUES = ('true', 'false', '0', '1')
+
+    # Columns with more rows than this are inferred from a random sample of rows
+    DEFAULT_SAMPLE_SIZE = 2000
+    # 1.0 means every examined value must match, as in the original detection
+    DEFAULT_MIN_RATIO = 1.0
+    # Longer values, and values with non-ASCII characters (\d also matches e.g.
+    # Arabic-Indic digits), are checked with regexes instead of the codepoint matrix
+    MAX_VECTOR_WIDTH = 64
+
+    _EMAIL_RE = re.compile(ValidationEngine.EMAIL_PATTERN)
+    _INT_RE = re.compile(r'^-?\d+$')
+    _FLOAT_RE = re.compile(r'^-?\d+(\.\d+)?$')
+    _ALPHANUMERIC_RE = re.compile(ValidationEngine.ALPHANUMERIC_PATTERN)
+
+    @staticmethod
+    def detect(series: pd.Series, sample_size: Optional[int] = DEFAULT_SAMPLE_SIZE,
+               min_ratio: float = DEFAULT_MIN_RATIO) -> str:
+        """Detected type name of a column (Email, Date, Boolean, Int, Float, Alphanumeric or Text)"""
+        return TypeInference.profile(series, sample_size, min_ratio)['type']
+
+    @staticmethod
+    def profile(series: pd.Series, sample_size: Optional[int] = DEFAULT_SAMPLE_SIZE,
+                min_ratio: float = DEFAULT_MIN_RATIO, random_state: int = 0) -> Dict:
+        """Classify a column and return its type, per-type ratios and how many values were examined"""
+        rows = len(series)
+        if sample_size and rows > sample_size:
+            positions = np.random.default_rng(random_state).choice(rows, sample_size, replace=False)
+            series = series.iloc[np.sort(positions)]
+        non_null = series.dropna()
+        result = {'type': 'Text', 'ratios': dict.fromkeys(TypeInference.TYPE_ORDER, 0.0),
+                  'date_format': None, 'rows': rows, 'examined': len(non_null), 'distinct': 0}
+        if non_null.empty:
+            return result
+
+        counts = non_null.astype(str).value_counts(sort=False)
+        values = counts.index.to_numpy(dtype=object)
+        weights = counts.to_numpy()
+        result['distinct'] = len(values)
+
+        masks = TypeInference._classify(values)
+        examined = weights.sum()
+        ratios = {name: round(float(weights[mask].sum() / examined), 6) for name, mask in masks.items()}
+        date_format = max(TypeInference.DATE_FORMATS, key=lambda date_format: ratios[date_format])
+        result['date_format'] = date_format if ratios[date_format] > 0 else None
+        for type_name in TypeInference.TYPE_ORDER:
+            result['ratios'][type_name] = ratios[date_format if type_name == 'Date' else type_name]
+        result['type'] = next(
+            (type_name for type_name in TypeInference.TYPE_ORDER if result['ratios'][type_name] >= min_ratio),
+            'Text'
+        )
+        return result
+
+    @staticmethod
+    def profile_columns(df: pd.DataFrame, headers: List[str], sample_size: Optional[int] = DEFAULT_SAMPLE_SIZE,
+                        min_ratio: float = DEFAULT_MIN_RATIO) -> Dict[str, Dict]:
+        """profile() for each of the given columns"""
+        profiles = {col: TypeInference.profile(df[col], sample_size, min_ratio) for col in headers}
+        logging.debug(f"Inferred types: { {col: p['type'] for col, p in profiles.items()} }")
+        return profiles
+
+    @staticmethod
+    def _classify(values: np.ndarray) -> Dict[str, np.ndarray]:
+        """Boolean mask per type (and per date format instead of Date) over an array of distinct strings"""
+        lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+        wide = lengths > TypeInference.MAX_VECTOR_WIDTH
+        if not wide.any():
+            return TypeInference._classify_narrow(values, lengths)
+
+        masks = {name: np.zeros(len(values), dtype=bool) for name in TypeInference._mask_names()}
+        narrow = ~wide
+        for type_name, mask in TypeInference._classify_narrow(values[narrow], lengths[narrow]).items():
+            masks[type_name][narrow] = mask
+        for i in np.flatnonzero(wide):
+            value = values[i]
+            masks['Email'][i] = bool(TypeInference._EMAIL_RE.match(value))
+            masks['Int'][i] = bool(TypeInference._INT_RE.match(value))
+            masks['Float'][i] = bool(TypeInference._FLOAT_RE.match(value))
+            masks['Alphanumeric'][i] = bool(TypeInference._ALPHANUMERIC_RE.match(value))
+        return masks
+
+    @staticmethod
+    def _classify_narrow(values: np.ndarray, lengths: np.ndarray) -> Dict[str, np.ndarray]:
+        n = len(values)
+        width = int(lengths.max()) if n else 0
+        if width == 0:
+            masks = {name: np.zeros(n, dtype=bool) for name in TypeInference._mask_names()}
+            masks.update({date_format: np.ones(n, dtype=bool) for date_format in TypeInference.DATE_FORMATS})
+            return masks
+
+        codes = np.array(values, dtype=f'U{width}').view(np.uint32).reshape(n, width)
+        position = np.arange(width)
+        padding = position >= lengths[:, None]
+
+        digit = (codes >= 48) & (codes <= 57)
+        folded = codes | 32
+        letter = (codes < 128) & (folded >= 97) & (folded <= 122)
+        minus = codes == 45
+        dot = codes == 46
+        leading_minus = minus & (position == 0)
+
+        digits = digit.sum(axis=1)
+        dots = dot.sum(axis=1)
+        non_empty = lengths > 0
+
+        alphanumeric = non_empty & (padding | digit | letter).all(axis=1)
+        integer = (digits > 0) & (padding | digit | leading_minus).all(axis=1)
+
+        # -?\d+(\.\d+)?  -> at most one dot, with a digit on both sides of it
+        float_chars = (padding | digit | dot | leading_minus).all(axis=1)
+        dot_at = dot.argmax(axis=1)
+        rows = np.arange(n)
+        before_dot = digit[rows, np.maximum(dot_at - 1, 0)] & (dot_at > 0)
+        after_dot = digit[rows, np.minimum(dot_at + 1, width - 1)] & (dot_at + 1 < lengths)
+        decimal = float_chars & (digits > 0) & ((dots == 0) | ((dots == 1) & before_dot & after_dot))
+
+        boolean = np.zeros(n, dtype=bool)
+        short = lengths <= 5
+        if short.any():
+            boolean[short] = np.isin(np.char.lower(values[short].astype(str)), TypeInference.BOOLEAN_VALUES)
+
+        email = np.zeros(n, dtype=bool)
+        for i in np.flatnonzero((codes == 64).any(axis=1)):
+            email[i] = bool(TypeInference._EMAIL_RE.match(values[i]))
+
+        non_ascii = (codes >= 128).any(axis=1)
+        for i in np.flatnonzero(non_ascii):
+            value = values[i]
+            integer[i] = bool(TypeInference._INT_RE.match(value))
+            decimal[i] = bool(TypeInference._FLOAT_RE.match(value))
+
+        masks = {
+            'Email': email,
+            'Boolean': boolean,
+            'Int': integer,
+            'Float': decimal,
+            'Alphanumeric': alphanumeric
+        }
+        # Both formats are ASCII digits with exactly two dashes
+        candidates = np.flatnonzero((padding | digit | minus).all(axis=1) & (minus.sum(axis=1) == 2))
+        for date_format, valid in TypeInference._parse_dates(codes[candidates], lengths[candidates]).items():
+            masks[date_format] = np.zeros(n, dtype=bool)
+            masks[date_format][candidates] = valid
+            # pandas parses blank strings as NaT, which the date check has always accepted
+            masks[date_format] |= lengths == 0
+        return masks
+
+    # pd.to_datetime only accepts dates inside the nanosecond Timestamp range
+    _MIN_DATE, _MAX_DATE = 16770922, 22620411
+    _DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+    @staticmethod
+    def _parse_dates(codes: np.ndarray, lengths: np.ndarray) -> Dict[str, np.ndarray]:
+        """Whether each dd-mm-yyyy / yyyy-mm-dd candidate is accepted by pd.to_datetime with that format"""
+        m, width = codes.shape
+        if m == 0:
+            return {date_format: np.zeros(0, dtype=bool) for date_format in TypeInference.DATE_FORMATS}
+        minus = codes == 45
+        first = minus.argmax(axis=1)
+        second = width - 1 - minus[:, ::-1].argmax(axis=1)
+        fields = [(np.zeros(m, dtype=np.int64), first), (first + 1, second - first - 1), (second + 1, lengths - second - 1)]
+
+        rows = np.arange(m)
+        numbers = []
+        for start, size in fields:
+            # Fields longer than four digits are never valid; their value is irrelevant
+            value = np.zeros(m, dtype=np.int64)
+            for k in range(4):
+                column = np.minimum(start + k, width - 1)
+                value = np.where(k < size, value * 10 + codes[rows, column].astype(np.int64) - 48, value)
+            numbers.append((value, size))
+
+        def valid(day, month, year):
+            (day, day_size), (month, month_size), (year, year_size) = day, month, year
+            leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+            month_ok = (month >= 1) & (month <= 12)
+            days = TypeInference._DAYS_IN_MONTH[np.where(month_ok, month, 0)] + (leap & (month == 2))
+            key = year * 10000 + month * 100 + day
+            return ((day_size >= 1) & (day_size <= 2) & (month_size >= 1) & (month_size <= 2) & (year_size == 4)
+                    & month_ok & (day >= 1) & (day <= days)
+                    & (key >= TypeInference._MIN_DATE) & (key <= TypeInference._MAX_DATE))
+
+        return {
+            '%d-%m-%Y': valid(numbers[0], numbers[1], numbers[2]),
+            '%Y-%m-%d': valid(numbers[2], numbers[1], numbers[0])
+        }
+
+    @staticmethod
+    def _mask_names() -> List[str]:
+        return [name for name in TypeInference.TYPE_ORDER if name != 'Date'] + list(TypeInference.DATE_FORMATS)
@@ -0,0 +1,219 @@
+# services/validation_engine.py
+"""
+Vectorized validation engine.
+
+Evaluates the built-in validation rules (Required, Int, Float, Text, Email,
+Boolean, Alphanumeric, Date(...)) as whole-column mask operations and returns
+the same (row, value, rule_failed, reason) tuples as the per-cell loops for
+the failing rows only.
+"""
+
+import re
+import logging
+from typing import Dict, List, Tuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from services.date_parser import DateParser
+from utils.constants import LOW_CARDINALITY_RATIO
+
+
+class ValidationEngine:
+    """Whole-column evaluation of built-in validation rules"""
+
+    BUILTIN_RULES = ('Required', 'Int', 'Float', 'Text', 'Email', 'Boolean', 'Alphanumeric')
+
+    ALPHANUMERIC_PATTERN = r'^[a-zA-Z0-9]+$'
+    EMAIL_PATTERN = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
+    BOOLEAN_PATTERN = r'^(true|false|0|1)$'
+
+    # Values matching these patterns are guaranteed to pass the exact per-cell
+    # check; everything else is re-checked exactly, once per distinct value.
+    FLOAT_FAST_PATTERN = r'^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$'
+    TEXT_FAST_PATTERN = r'^[A-Za-z "()]*$'
+
+    # Columns shorter than this are checked cell by cell; factorizing them saves nothing
+    MEMOIZE_MIN_ROWS = 1000
+    # Rows sampled to estimate a column's cardinality before factorizing all of it
+    CARDINALITY_SAMPLE_ROWS = 10000
+
+    @staticmethod
+    def is_builtin_rule(rule_name: str) -> bool:
+        """Check whether a rule can be evaluated without database metadata"""
+        return rule_name in ValidationEngine.BUILTIN_RULES or rule_name.startswith('Date(')
+
+    @staticmethod
+    def to_text(series: pd.Series) -> pd.Series:
+        """Convert a column to stripped strings exactly like str(value).strip() per cell"""
+        if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_timedelta64_dtype(series):
+            # astype(str) drops the time part of midnight timestamps, str() does not
+            text = series.map(str)
+        else:
+            text = series.astype(str)
+        return text.str.strip()
+
+    @staticmethod
+    def check_column(series: pd.Series, rule_name: str, accepted_date_formats: List[str],
+                     check_null_cells: bool = True, source_format: Optional[str] = None,
+                     verdict_cache: Optional[Dict[str, bool]] = None) -> Tuple[int, List[Tuple]]:
+        """Validate a whole column against one rule and return (error_count, error_locations).
+
+        Low-cardinality columns (distinct/rows below LOW_CARDINALITY_RATIO) are factorized
+        once and the rule is evaluated over their distinct values only, with the verdicts
+        broadcast back through the codes. verdict_cache may be passed by callers that
+        validate the same rule repeatedly (e.g. chunks of one file) so distinct date
+        values are only parsed once.
+        """
+        values = series.reset_index(drop=True)
+        if len(values) == 0:
+            return 0, []
+
+        null_mask = values.isna().to_numpy()
+        text = ValidationEngine.to_text(values)
+        if null_mask.any():
+            text = text.mask(null_mask, '')
+        return ValidationEngine.check_text(text, null_mask, rule_name, accepted_date_formats, check_null_cells,
+                                           source_format, verdict_cache)
+
+    @staticmethod
+    def check_text(text: pd.Series, null_mask: np.ndarray, rule_name: str, accepted_date_formats: List[str],
+                   check_null_cells: bool = True, source_format: Optional[str] = None,
+                   verdict_cache: Optional[Dict[str, bool]] = None, row_offset: int = 0,
+                   factorized: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[int, List[Tuple]]:
+        """check_column over a column already converted by to_text, nulls blanked and flagged in
+        null_mask; reported rows are numbered from row_offset + 1.
+
+        factorized may pass the (codes, distinct values) of text when the caller has them.
+        """
+        n = len(text)
+        if n == 0:
+            return 0, []
+
+        if factorized is None:
+            codes = ValidationEngine._low_cardinality_codes(text)
+        else:
+            codes = factorized if len(factorized[1]) / n < LOW_CARDINALITY_RATIO else None
+        if codes is not None:
+            codes, uniques = codes
+            failed, reasons, out_values = ValidationEngine._evaluate(
+                pd.Series(uniques, dtype=object), rule_name, accepted_date_formats, source_format, verdict_cache
+            )
+            failed, reasons, out_values = failed[codes], reasons[codes], out_values[codes]
+        else:
+            failed, reasons, out_values = ValidationEngine._evaluate(
+                text, rule_name, accepted_date_formats, source_format, verdict_cache
+            )
+
+        # Null cells are reported as such whatever the rule; without the check they
+        # were evaluated as empty strings above
+        if check_null_cells and null_mask.any():
+            failed[null_mask] = True
+            reasons[null_mask] = "Value is null"
+            out_values[null_mask] = "NULL"
+
+        failed_rows = np.flatnonzero(failed)
+        error_cell_locations = [
+            (row_offset + int(i) + 1, out_values[i], rule_name, reasons[i]) for i in failed_rows
+        ]
+        logging.debug(f"Vectorized validation of rule {rule_name}: {len(error_cell_locations)} of {n} rows failed"
+                      f"{'' if codes is None else f' ({len(uniques)} distinct values checked)'}")
+        return len(error_cell_locations), error_cell_locations
+
+    @staticmethod
+    def _low_cardinality_codes(text: pd.Series) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(codes, distinct values) of a column worth validating value by value, else None"""
+        n = len(text)
+        if n < ValidationEngine.MEMOIZE_MIN_ROWS:
+            return None
+        sample = text.iloc[:ValidationEngine.CARDINALITY_SAMPLE_ROWS]
+        if sample.nunique() / len(sample) >= LOW_CARDINALITY_RATIO:
+            return None
+        codes, uniques = pd.factorize(text.to_numpy(dtype=object))
+        if len(uniques) / n >= LOW_CARDINALITY_RATIO:
+            return None
+        return codes, np.asarray(uniques, dtype=object)
+
+    @staticmethod
+    def _evaluate(text: pd.Series, rule_name: str, accepted_date_formats: List[str],
+                  source_format: Optional[str] = None,
+                  verdict_cache: Optional[Dict[str, bool]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(failed, reasons, reported values) of stripped, non-null cell texts under one rule"""
+        n = len(text)
+        out_values = text.to_numpy(dtype=object).copy()
+        reasons = np.empty(n, dtype=object)
+        failed = np.zeros(n, dtype=bool)
+
+        def flag(mask: np.ndarray, reason: str, value: Optional[str] = None):
+            mask = mask & ~failed
+            failed[mask] = True
+            reasons[mask] = reason
+            if value is not None:
+                out_values[mask] = value
+
+        empty = (text == '').to_numpy()
+
+        if rule_name == "Required":
+            flag(empty, "Value is empty", "EMPTY")
+
+        elif rule_name.startswith("Date("):
+            flag(empty, "Value is empty", "EMPTY")
+            pending = ~failed
+            valid = DateParser.valid_mask(text[pending], accepted_date_formats, verdict_cache)
+            invalid = np.zeros(n, dtype=bool)
+            invalid[pending] = ~valid
+            flag(invalid, f"Invalid date format (expected {source_format})")
+
+        elif rule_name == "Alphanumeric":
+            flag(empty, "Value is empty or contains only whitespace")
+            valid = text.str.match(ValidationEngine.ALPHANUMERIC_PATTERN).to_numpy(dtype=bool)
+            flag(~valid, "Contains non-alphanumeric characters")
+
+        elif rule_name == "Int":
+            valid = text.str.replace('-', '', n=1, regex=False).str.isdigit().to_numpy(dtype=bool)
+            flag(~valid, "Must be an integer")
+
+        elif rule_name == "Float":
+            valid = ValidationEngine._fast_then_exact(
+                text, ValidationEngine.FLOAT_FAST_PATTERN, ValidationEngine._is_float
+            )
+            flag(~valid, "Must be a number (integer or decimal)")
+
+        elif rule_name == "Text":
+            valid = ValidationEngine._fast_then_exact(
+                text, ValidationEngine.TEXT_FAST_PATTERN, ValidationEngine._is_plain_text
+            )
+            flag(~valid, "Contains invalid characters")
+
+        elif rule_name == "Email":
+            valid = text.str.match(ValidationEngine.EMAIL_PATTERN).to_numpy(dtype=bool)
+            flag(~valid, "Invalid email format")
+
+        elif rule_name == "Boolean":
+            valid = text.str.match(ValidationEngine.BOOLEAN_PATTERN, flags=re.IGNORECASE).to_numpy(dtype=bool)
+            flag(~valid, "Must be a boolean (true/false or 0/1)")
+
+        return failed, reasons, out_values
+
+    @staticmethod
+    def _fast_then_exact(text: pd.Series, fast_pattern: str, exact_check) -> np.ndarray:
+        """Accept values by regex, then run the exact check on the distinct leftovers only"""
+        valid = text.str.match(fast_pattern).to_numpy(dtype=bool)
+        if not valid.all():
+            leftovers = text[~valid]
+            verdicts = {value: exact_check(value) for value in leftovers.unique()}
+            valid[~valid] = leftovers.map(verdicts).to_numpy(dtype=bool)
+        return valid
+
+    @staticmethod
+    def _is_float(value: str) -> bool:
+        try:
+            float(value)
+            return True
+        except ValueError:
+            return False
+
+    @staticmethod
+    def _is_plain_text(value: str) -> bool:
+        """Letters, spaces, double quotes and parentheses only"""
+        return all(char in ('"', '(', ')', ' ') or char.isalpha() for char in value)
@@ -0,0 +1,78 @@
+# services/validation_index.py
+"""
+Indexed result of one validation run.
+
+Failures are kept per rule and per row, together with the columns each rule
+reads, so a correction to a few cells only needs the rules reading those
+columns to be re-run on those rows; the error view of the run (column -> error
+locations) is then rebuilt for the affected columns alone.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# (value, rule_failed, reason) of one failure
+Failure = Tuple[str, str, str]
+
+
+class ValidationIndex:
+    """Per-rule, per-row failures of a validation run over a frame"""
+
+    def __init__(self, rules: List[Dict], rule_locations: List[List[Tuple]],
+                 dependencies: Optional[List[Set[str]]] = None):
+        self.rules = [dict(rule) for rule in rules]
+        self.dependencies = dependencies or [{rule['column_name']} for rule in rules]
+        self._failures: List[Dict[int, List[Failure]]] = []
+        for locations in rule_locations:
+            failures: Dict[int, List[Failure]] = {}
+            for loc in locations:
+                failures.setdefault(int(loc[0]), []).append(tuple(loc[1:4]))
+            self._failures.append(failures)
+
+    def rules_reading(self, columns: Iterable[str]) -> List[int]:
+        """Indexes of the rules whose outcome depends on any of the columns"""
+        columns = set(columns)
+        return [index for index, reads in enumerate(self.dependencies) if reads & columns]
+
+    def replace_rows(self, rule_index: int, rows: Iterable[int], locations: List[Tuple]):
+        """Swap the failures of a rule on the given 1-based rows for freshly computed ones"""
+        failures = self._failures[rule_index]
+        for row in rows:
+            failures.pop(int(row), None)
+        for loc in locations:
+            failures.setdefault(int(loc[0]), []).append(tuple(loc[1:4]))
+
+    def replace_all(self, rule_index: int, locations: List[Tuple]):
+        """Swap all failures of a rule for freshly computed ones"""
+        self._failures[rule_index] = {}
+        self.replace_rows(rule_index, (), locations)
+
+    def column_failures(self, column: str) -> Dict[int, List[Dict]]:
+        """Row -> failures of every rule on a column"""
+        by_row: Dict[int, List[Dict]] = {}
+        for rule, failures in zip(self.rules, self._failures):
+            if rule['column_name'] != column:
+                continue
+            for row, row_failures in failures.items():
+                by_row.setdefault(row, []).extend(
+                    {'value': value, 'rule_failed': rule_failed, 'reason': reason}
+                    for value, rule_failed, reason in row_failures
+                )
+        return dict(sorted(by_row.items()))
+
+    def error_cell_locations(self, columns: Optional[Iterable[str]] = None) -> Dict[str, List[Dict]]:
+        """Error locations per column, as validate_rules reports them.
+
+        A column's errors are those of its last rule with any failures.
+        """
+        columns = None if columns is None else set(columns)
+        error_cell_locations = {}
+        for rule, failures in zip(self.rules, self._failures):
+            column = rule['column_name']
+            if not failures or (columns is not None and column not in columns):
+                continue
+            error_cell_locations[column] = [
+                {'row': row, 'value': value, 'rule_failed': rule_failed, 'reason': reason}
+                for row in sorted(failures)
+                for value, rule_failed, reason in failures[row]
+            ]
+        return error_cell_locations
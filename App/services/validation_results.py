@@ -0,0 +1,359 @@
+# services/validation_results.py
+"""
+Stored validation results.
+
+A validation run is kept server-side as the validated frame (in the
+DataFrameStore) plus its error locations, under a result id. Clients then read
+it a page at a time, optionally only rows with errors and only some columns,
+or as an NDJSON stream; only the rows being sent are ever converted to JSON.
+Results stored with their ValidationIndex can be updated in place after cell
+corrections.
+
+Each result is split so a page costs what it shows, not what the run found:
+
+    <id>.result.pkl     summary meta (counts, columns, owner)
+    <id>.errors.npz     sorted row numbers of each column's error locations,
+                        and the byte offsets of their blocks in
+    <id>.locations.pkl  error locations ordered by row, pickled in blocks
+    <id>.index.pkl      the ValidationIndex, read only to revalidate
+
+A page finds the locations on its rows with np.searchsorted over the row
+arrays and unpickles only the blocks holding them.
+"""
+
+import os
+import json
+import time
+import uuid
+import pickle
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.dataframe_store import DataFrameStore
+from services.validation_index import ValidationIndex
+
+
+class ValidationResultStore:
+    """Validation results addressed by id, read back in pages or as NDJSON"""
+
+    FILE_EXTENSION = '.result.pkl'
+    ERRORS_EXTENSION = '.errors.npz'
+    LOCATIONS_EXTENSION = '.locations.pkl'
+    INDEX_EXTENSION = '.index.pkl'
+    # Error locations pickled together; a page unpickles whole blocks
+    LOCATION_BLOCK = 1000
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+    # Rows converted per block while streaming NDJSON
+    STREAM_CHUNK_ROWS = 1000
+
+    _storage_dir: Optional[str] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, storage_dir: str):
+        """Set the directory holding result metas, error locations and indexes"""
+        os.makedirs(storage_dir, exist_ok=True)
+        with cls._lock:
+            cls._storage_dir = storage_dir
+        logging.info(f"Validation result store configured at {storage_dir}")
+
+    @classmethod
+    def storage_dir(cls) -> str:
+        if cls._storage_dir is None:
+            cls.configure(os.path.join(tempfile.gettempdir(), 'results'))
+        return cls._storage_dir
+
+    @classmethod
+    def settings(cls) -> Tuple[str, str]:
+        """(storage_dir, frame_dir), to store results in the same place from a worker process"""
+        return cls.storage_dir(), DataFrameStore.storage_dir()
+
+    @classmethod
+    def use_settings(cls, settings: Tuple[str, str]):
+        """Point this process at the directories returned by settings() in another one"""
+        storage_dir, frame_dir = settings
+        if cls._storage_dir != storage_dir:
+            cls.configure(storage_dir)
+        if DataFrameStore.storage_dir() != frame_dir:
+            DataFrameStore.configure(frame_dir)
+
+    @classmethod
+    def put(cls, df: pd.DataFrame, error_cell_locations: Dict[str, List[Dict]], owner: Optional[int] = None,
+            template_id: Optional[int] = None, index: Optional[ValidationIndex] = None) -> str:
+        """Store a validated frame and its error locations and return the result id"""
+        result_id = uuid.uuid4().hex
+        DataFrameStore.put(df, frame_id=result_id)
+        meta = {
+            'result_id': result_id,
+            'owner': owner,
+            'template_id': template_id,
+            'columns': [str(col) for col in df.columns],
+            'total_rows': len(df),
+            'created_at': time.time()
+        }
+        cls._write_errors(meta, error_cell_locations, index)
+        logging.debug(f"Stored validation result {result_id}: {len(df)} rows, {meta['rows_with_errors']} with errors")
+        return result_id
+
+    @classmethod
+    def update(cls, meta: Dict, df: pd.DataFrame, index: ValidationIndex):
+        """Replace a result's frame and errors after it was revalidated"""
+        DataFrameStore.put(df, frame_id=meta['result_id'])
+        cls._write_errors(meta, index.error_cell_locations(), index)
+
+    @classmethod
+    def get_meta(cls, result_id: str) -> Optional[Dict]:
+        """Summary meta of a result, or None if it is unknown"""
+        try:
+            with open(cls._path(result_id), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def get_index(cls, meta: Dict) -> Optional[ValidationIndex]:
+        """ValidationIndex of a result, or None if it was stored without one"""
+        try:
+            with open(cls._path(meta['result_id'], cls.INDEX_EXTENSION), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def error_cell_locations(cls, meta: Dict, columns: Optional[List[str]] = None) -> Dict[str, List[Dict]]:
+        """Every error location of the given columns (all by default), ordered by row"""
+        columns = cls._columns(meta, columns)
+        with cls._error_reader(meta) as (errors, locations):
+            return {
+                col: cls._read_locations(meta, errors, locations, col, 0, meta['error_counts'][col])
+                for col in columns if col in meta['error_counts']
+            }
+
+    @classmethod
+    def summary(cls, meta: Dict) -> Dict:
+        """JSON-safe overview of a result"""
+        return {
+            'result_id': meta['result_id'],
+            'template_id': meta['template_id'],
+            'columns': meta['columns'],
+            'total_rows': meta['total_rows'],
+            'rows_with_errors': meta['rows_with_errors'],
+            'error_counts': dict(meta['error_counts'])
+        }
+
+    @classmethod
+    def page(cls, meta: Dict, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE, errors_only: bool = False,
+             columns: Optional[List[str]] = None) -> Dict:
+        """One page of rows with the error locations falling on it.
+
+        Row numbers are 1-based data rows, as in error_cell_locations. With
+        errors_only the pages walk the rows that have at least one error.
+        """
+        page = max(1, int(page))
+        page_size = min(max(1, int(page_size)), cls.MAX_PAGE_SIZE)
+        columns = cls._columns(meta, columns)
+        total = meta['rows_with_errors'] if errors_only else meta['total_rows']
+        start = (page - 1) * page_size
+        with cls._error_reader(meta) as (errors, locations):
+            if errors_only:
+                row_numbers = errors['error_rows'][start:start + page_size]
+            else:
+                row_numbers = np.arange(start + 1, min(start + page_size, total) + 1, dtype=np.int64)
+
+            # Page rows are consecutive (error) rows, so each column's locations on the
+            # page are one run of its row-sorted locations
+            error_cell_locations = {}
+            for col in columns:
+                if not len(row_numbers) or col not in meta['error_counts']:
+                    continue
+                rows = errors[f'rows_{cls._position(meta, col)}']
+                lo = int(np.searchsorted(rows, row_numbers[0], side='left'))
+                hi = int(np.searchsorted(rows, row_numbers[-1], side='right'))
+                if hi > lo:
+                    error_cell_locations[col] = cls._read_locations(meta, errors, locations, col, lo, hi)
+
+        data_rows = []
+        if len(row_numbers):
+            df = DataFrameStore.get(meta['result_id'])
+            if df is None:
+                raise LookupError(f"Validation result {meta['result_id']} has expired")
+            data_rows = cls._records(df, row_numbers, columns)
+
+        return {
+            'page': page,
+            'page_size': page_size,
+            'total_rows': total,
+            'total_pages': -(-total // page_size),
+            'row_numbers': row_numbers.tolist(),
+            'data_rows': data_rows,
+            'error_cell_locations': error_cell_locations
+        }
+
+    @classmethod
+    def iter_ndjson(cls, meta: Dict, errors_only: bool = False, columns: Optional[List[str]] = None,
+                    chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[str]:
+        """Summary line followed by one line per row: {"row", "data", "errors"}"""
+        columns = cls._columns(meta, columns)
+        df = DataFrameStore.get(meta['result_id'])
+        if df is None:
+            raise LookupError(f"Validation result {meta['result_id']} has expired")
+
+        errors_by_row: Dict[int, Dict[str, List[Dict]]] = {}
+        for col, col_locations in cls.error_cell_locations(meta, columns).items():
+            for loc in col_locations:
+                errors_by_row.setdefault(loc['row'], {}).setdefault(col, []).append(
+                    {'rule_failed': loc['rule_failed'], 'reason': loc['reason']}
+                )
+
+        if errors_only:
+            with cls._error_reader(meta) as (errors, _):
+                row_numbers = errors['error_rows']
+        else:
+            row_numbers = np.arange(1, meta['total_rows'] + 1, dtype=np.int64)
+
+        def lines():
+            yield json.dumps({'summary': cls.summary(meta)}) + '\n'
+            for start in range(0, len(row_numbers), chunk_rows):
+                block = row_numbers[start:start + chunk_rows]
+                yield ''.join(
+                    json.dumps({'row': row, 'data': record, 'errors': errors_by_row.get(row, {})}, default=str) + '\n'
+                    for row, record in zip(block.tolist(), cls._records(df, block, columns))
+                )
+
+        # The frame is loaded before the first line, so a missing result fails before streaming starts
+        return lines()
+
+    @classmethod
+    def delete(cls, result_id: str):
+        """Remove a result and its frame"""
+        DataFrameStore.delete(result_id)
+        for extension in (cls.FILE_EXTENSION, cls.ERRORS_EXTENSION, cls.LOCATIONS_EXTENSION, cls.INDEX_EXTENSION):
+            try:
+                os.remove(cls._path(result_id, extension))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logging.error(f"Error deleting validation result {result_id}: {str(e)}")
+
+    @classmethod
+    def cleanup(cls, max_age_hours: int = 24):
+        """Delete results older than the given age"""
+        cutoff = time.time() - max_age_hours * 3600
+        directory = cls.storage_dir()
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            try:
+                if not os.path.isfile(path) or os.path.getmtime(path) >= cutoff:
+                    continue
+                if filename.endswith(cls.FILE_EXTENSION):
+                    cls.delete(filename[:-len(cls.FILE_EXTENSION)])
+                else:
+                    os.remove(path)  # part of a result whose meta is gone, or a leftover temp file
+                logging.info(f"Cleaned up validation result: {filename}")
+            except Exception as e:
+                logging.error(f"Error cleaning up validation result {filename}: {str(e)}")
+
+    @classmethod
+    def _write_errors(cls, meta: Dict, error_cell_locations: Dict[str, List[Dict]],
+                      index: Optional[ValidationIndex]):
+        """Write a result's error files and index, then its meta with the new counts"""
+        result_id = meta['result_id']
+        error_counts = {str(col): len(locs) for col, locs in error_cell_locations.items() if locs}
+        arrays = {}
+        with cls._atomic(cls._path(result_id, cls.LOCATIONS_EXTENSION)) as f:
+            for position, col_locations in enumerate(locs for locs in error_cell_locations.values() if locs):
+                rows = np.fromiter((loc['row'] for loc in col_locations), dtype=np.int64, count=len(col_locations))
+                order = np.argsort(rows, kind='stable')
+                offsets = []
+                for start in range(0, len(order), cls.LOCATION_BLOCK):
+                    offsets.append(f.tell())
+                    pickle.dump([col_locations[i] for i in order[start:start + cls.LOCATION_BLOCK]], f,
+                                protocol=pickle.HIGHEST_PROTOCOL)
+                arrays[f'rows_{position}'] = rows[order]
+                arrays[f'blocks_{position}'] = np.asarray(offsets, dtype=np.int64)
+        row_arrays = [arrays[f'rows_{position}'] for position in range(len(error_counts))]
+        arrays['error_rows'] = np.unique(np.concatenate(row_arrays)) if row_arrays else np.zeros(0, dtype=np.int64)
+        with cls._atomic(cls._path(result_id, cls.ERRORS_EXTENSION)) as f:
+            np.savez(f, **arrays)
+
+        index_path = cls._path(result_id, cls.INDEX_EXTENSION)
+        if index is not None:
+            with cls._atomic(index_path) as f:
+                pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        elif os.path.exists(index_path):
+            os.remove(index_path)
+
+        meta['error_counts'] = error_counts
+        meta['rows_with_errors'] = len(arrays['error_rows'])
+        with cls._atomic(cls._path(result_id)) as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    @contextmanager
+    def _error_reader(cls, meta: Dict):
+        """(row arrays, open locations file) of a result"""
+        result_id = meta['result_id']
+        try:
+            errors = np.load(cls._path(result_id, cls.ERRORS_EXTENSION))
+        except FileNotFoundError:
+            raise LookupError(f"Validation result {result_id} has expired")
+        with errors, open(cls._path(result_id, cls.LOCATIONS_EXTENSION), 'rb') as locations:
+            yield errors, locations
+
+    @classmethod
+    def _read_locations(cls, meta: Dict, errors, locations, col: str, lo: int, hi: int) -> List[Dict]:
+        """Row-ordered error locations lo:hi of a column, unpickling only the blocks holding them"""
+        offsets = errors[f'blocks_{cls._position(meta, col)}']
+        first, last = lo // cls.LOCATION_BLOCK, (hi - 1) // cls.LOCATION_BLOCK
+        found = []
+        for block in range(first, last + 1):
+            locations.seek(int(offsets[block]))
+            found.extend(pickle.load(locations))
+        skip = lo - first * cls.LOCATION_BLOCK
+        return found[skip:skip + hi - lo]
+
+    @staticmethod
+    def _position(meta: Dict, col: str) -> int:
+        """Position of a column's arrays in the errors file"""
+        return list(meta['error_counts']).index(col)
+
+    @staticmethod
+    @contextmanager
+    def _atomic(path: str):
+        """Binary file written under a temporary name and moved into place when complete"""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            yield f
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _records(df: pd.DataFrame, row_numbers: np.ndarray, columns: List[str]) -> List[Dict]:
+        """Rows as dicts with missing and empty cells shown as 'NULL', like the full response"""
+        block = df.iloc[row_numbers - 1]
+        block.columns = [str(col) for col in block.columns]
+        block = block[columns].astype(object)
+        block = block.where(block.notna() & (block != ''), 'NULL')
+        return block.to_dict('records')
+
+    @staticmethod
+    def _columns(meta: Dict, columns: Optional[List[str]]) -> List[str]:
+        if not columns:
+            return meta['columns']
+        unknown = [col for col in columns if col not in meta['columns']]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        return list(columns)
+
+    @classmethod
+    def _path(cls, result_id: str, extension: str = FILE_EXTENSION) -> str:
+        # Ids are generated here; reject anything that could escape the storage directory
+        if not result_id or os.path.basename(result_id) != result_id:
+            raise ValueError(f"Invalid result id: {result_id}")
+        return os.path.join(cls.storage_dir(), f"{result_id}{extension}")
@@ -0,0 +1,177 @@
+"""
+In-process SFTP server for tests.
+
+LocalSFTPServer listens on 127.0.0.1, accepts one username/password and serves
+a local directory as the remote root. Every accepted connection is counted so
+tests can assert how many SSH handshakes a piece of code made.
+"""
+
+import os
+import socket
+import threading
+
+import paramiko
+from paramiko.sftp import SFTP_OK, SFTP_NO_SUCH_FILE, SFTP_PERMISSION_DENIED, SFTP_FAILURE
+
+_HOST_KEY = None
+
+
+def _host_key():
+    global _HOST_KEY
+    if _HOST_KEY is None:
+        _HOST_KEY = paramiko.RSAKey.generate(2048)
+    return _HOST_KEY
+
+
+class _Server(paramiko.ServerInterface):
+    def __init__(self, username, password):
+        self.username = username
+        self.password = password
+
+    def check_auth_password(self, username, password):
+        if (username, password) == (self.username, self.password):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == 'session' else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+
+class _Handle(paramiko.SFTPHandle):
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+
+def _errno(error):
+    if isinstance(error, FileNotFoundError):
+        return SFTP_NO_SUCH_FILE
+    if isinstance(error, PermissionError):
+        return SFTP_PERMISSION_DENIED
+    return SFTP_FAILURE
+
+
+class _FileSystem(paramiko.SFTPServerInterface):
+    root = None
+
+    def _local(self, path):
+        return os.path.join(self.root, self.canonicalize(path).lstrip('/'))
+
+    def canonicalize(self, path):
+        return os.path.normpath('/' + path.replace('\\', '/')) if path not in ('', '.') else '/'
+
+    def list_folder(self, path):
+        try:
+            local = self._local(path)
+            entries = []
+            for name in os.listdir(local):
+                attributes = paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(local, name)))
+                attributes.filename = name
+                entries.append(attributes)
+            return entries
+        except OSError as e:
+            return _errno(e)
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._local(path)))
+        except OSError as e:
+            return _errno(e)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        local = self._local(path)
+        try:
+            fd = os.open(local, flags | getattr(os, 'O_BINARY', 0), 0o644)
+        except OSError as e:
+            return _errno(e)
+        if flags & os.O_WRONLY:
+            mode = 'ab' if flags & os.O_APPEND else 'wb'
+        elif flags & os.O_RDWR:
+            mode = 'a+b' if flags & os.O_APPEND else 'r+b'
+        else:
+            mode = 'rb'
+        handle = _Handle(flags)
+        handle.filename = local
+        handle.readfile = handle.writefile = os.fdopen(fd, mode)
+        return handle
+
+    def remove(self, path):
+        try:
+            os.remove(self._local(path))
+            return SFTP_OK
+        except OSError as e:
+            return _errno(e)
+
+    def rename(self, oldpath, newpath):
+        try:
+            os.rename(self._local(oldpath), self._local(newpath))
+            return SFTP_OK
+        except OSError as e:
+            return _errno(e)
+
+    def mkdir(self, path, attr):
+        try:
+            os.mkdir(self._local(path))
+            return SFTP_OK
+        except OSError as e:
+            return _errno(e)
+
+    def rmdir(self, path):
+        try:
+            os.rmdir(self._local(path))
+            return SFTP_OK
+        except OSError as e:
+            return _errno(e)
+
+
+class LocalSFTPServer:
+    """SFTP server on a free localhost port, serving root_dir"""
+
+    def __init__(self, root_dir, username='tester', password='secret'):
+        self.root_dir = root_dir
+        self.username = username
+        self.password = password
+        self.connections = 0
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(('127.0.0.1', 0))
+        self._socket.listen(16)
+        self.port = self._socket.getsockname()[1]
+        self._transports = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def config(self):
+        return {'hostname': '127.0.0.1', 'port': self.port, 'username': self.username, 'password': self.password}
+
+    def close(self):
+        self._closed = True
+        self._socket.close()
+        for transport in self._transports:
+            transport.close()
+
+    def _serve(self):
+        file_system = type('FileSystem', (_FileSystem,), {'root': self.root_dir})
+        while not self._closed:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            self.connections += 1
+            transport = paramiko.Transport(conn)
+            transport.add_server_key(_host_key())
+            transport.set_subsystem_handler('sftp', paramiko.SFTPServer, file_system)
+            transport.start_server(server=_Server(self.username, self.password))
+            self._transports.append(transport)
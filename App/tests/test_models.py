@@ -1,6 +1,7 @@
 import unittest
 import os
 import tempfile
+from unittest import mock
 from models.user import User
 from models.template import Template
 from config.database import init_db
@@ -52,4 +53,46 @@ class TestTemplateModel(unittest.TestCase):
         # Retrieve and verify template
         template = Template.get_template_by_id(template_id, self.user_id)
         self.assertEqual(template['template_name'], 'test.xlsx')
-        self.assertEqual(json.loads(template['headers']), headers)
\ No newline at end of file
+        self.assertEqual(json.loads(template['headers']), headers)
+
+class TestTemplateColumnRules(unittest.TestCase):
+    def setUp(self):
+        self.conn = mock.MagicMock()
+        self.cursor = self.conn.cursor.return_value
+        self.cursor.fetchall.side_effect = [
+            [('Name', 1), ('Age', 2)],
+            [('Text', 10), ('Int', 11), ('Required', 12)]
+        ]
+        self.cursor.rowcount = 4
+
+    def test_save_column_rules_batches_queries(self):
+        """Column and rule ids are resolved once and all rows are inserted with one executemany"""
+        validations = {'Name': ['Required', 'Text'], 'Age': ['Required', 'Int', 'Unknown'], 'Missing': ['Text']}
+        inserted = Template.save_column_rules(self.conn, 7, validations, replace=True, builtin_only=True)
+
+        self.assertEqual(inserted, 4)
+        statements = [call.args[0] for call in self.cursor.execute.call_args_list]
+        self.assertEqual(len(statements), 3)
+        self.assertIn('DELETE FROM column_validation_rules', statements[0])
+        self.assertIn('column_name IN (%s, %s, %s)', statements[1])
+        self.assertIn('rule_name IN (%s, %s, %s, %s)', statements[2])
+        self.assertIn('is_custom = FALSE', statements[2])
+
+        self.cursor.executemany.assert_called_once()
+        rows = self.cursor.executemany.call_args.args[1]
+        self.assertEqual(rows, [(1, 12, '{}'), (1, 10, '{}'), (2, 12, '{}'), (2, 11, '{}')])
+        self.conn.commit.assert_not_called()
+
+    def test_save_column_rules_without_rules(self):
+        """Nothing is queried or inserted when no column has rules"""
+        self.assertEqual(Template.save_column_rules(self.conn, 7, {'Name': []}), 0)
+        self.cursor.execute.assert_not_called()
+        self.cursor.executemany.assert_not_called()
+
+    def test_mark_selected_columns_single_update(self):
+        """Selection is reset and set with one UPDATE"""
+        Template.mark_selected_columns(self.conn, 7, ['Name', 'Age'])
+        self.cursor.execute.assert_called_once()
+        statement, params = self.cursor.execute.call_args.args
+        self.assertIn('SET is_selected = column_name IN (%s, %s)', statement)
+        self.assertEqual(params, ('Name', 'Age', 7))
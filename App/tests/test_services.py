@@ -1,9 +1,35 @@
 import unittest
 import pandas as pd
+import numpy as np
 import tempfile
 import os
+import time
+import json
+import pickle
+from unittest import mock
 from services.validator import DataValidator
 from services.file_handler import FileHandler
+from services.validation_engine import ValidationEngine
+from services.dataframe_store import DataFrameStore
+from services.blob_store import BlobStore
+from services.cache_manager import CacheManager
+from services.session_manager import SessionManager, WriteOnChangeSessionInterface
+from services.data_transformer import DataTransformer
+from services.date_parser import DateParser
+from services.parsed_file_cache import ParsedFileCache
+from services.formula_evaluator import FormulaEvaluator
+from services.streaming_validator import StreamingValidator
+from services.rule_registry import RuleRegistry
+from services.type_inference import TypeInference
+from services.job_queue import JobQueue
+from services.parallel_validator import ParallelValidator
+from services.validation_results import ValidationResultStore
+from services.sftp_pool import SFTPConnectionPool, SFTPPoolTimeout
+from services.sftp_handler import SFTPHandler
+from tests.sftp_server import LocalSFTPServer
+from models.template import ValidationHistory
+from models.validation import DataValidator as ModelDataValidator
+from config.database import DatabaseManager
 
 class TestDataValidator(unittest.TestCase):
     def test_column_type_detection(self):
@@ -37,6 +63,992 @@ class TestDataValidator(unittest.TestCase):
         self.assertIn('Required', rules['Email'])
         self.assertIn('Email', rules['Email'])
 
+class TestValidationEngine(unittest.TestCase):
+    def test_null_and_required(self):
+        """Test null and empty detection for the Required rule"""
+        series = pd.Series(['John', None, '  ', 'Jane'])
+        count, errors = ValidationEngine.check_column(series, 'Required', [])
+        self.assertEqual(count, 2)
+        self.assertEqual(errors, [(2, 'NULL', 'Required', 'Value is null'),
+                                  (3, 'EMPTY', 'Required', 'Value is empty')])
+    
+    def test_type_rules(self):
+        """Test vectorized type rules return only the failing rows"""
+        cases = {
+            'Int': (['12', '-7', '1.5', '12-3'], [(3, '1.5', 'Int', 'Must be an integer')]),
+            'Float': (['1.5', '1e3', 'inf', 'abc'], [(4, 'abc', 'Float', 'Must be a number (integer or decimal)')]),
+            'Text': (['John Smith', 'Zoë (Jr)', 'R2D2'], [(3, 'R2D2', 'Text', 'Contains invalid characters')]),
+            'Email': (['a.b@example.com', 'no-at-sign'], [(2, 'no-at-sign', 'Email', 'Invalid email format')]),
+            'Boolean': (['TRUE', '0', 'yes'], [(3, 'yes', 'Boolean', 'Must be a boolean (true/false or 0/1)')]),
+            'Alphanumeric': (['AB12', 'a-1'], [(2, 'a-1', 'Alphanumeric', 'Contains non-alphanumeric characters')]),
+        }
+        for rule, (values, expected) in cases.items():
+            count, errors = ValidationEngine.check_column(pd.Series(values), rule, [])
+            self.assertEqual(errors, expected, rule)
+            self.assertEqual(count, len(expected))
+    
+    def test_date_rule(self):
+        """Test date rule against the accepted formats"""
+        series = pd.Series(['01-02-2020', '31-02-2020', ''])
+        count, errors = ValidationEngine.check_column(
+            series, 'Date(DD-MM-YYYY)', ['%d-%m-%Y'], source_format='DD-MM-YYYY'
+        )
+        self.assertEqual(errors, [
+            (2, '31-02-2020', 'Date(DD-MM-YYYY)', 'Invalid date format (expected DD-MM-YYYY)'),
+            (3, 'EMPTY', 'Date(DD-MM-YYYY)', 'Value is empty'),
+        ])
+    
+    def test_skip_null_cells(self):
+        """Test nulls are treated as empty strings when null checks are disabled"""
+        series = pd.Series([None, '5'])
+        count, errors = ValidationEngine.check_column(series, 'Int', [], check_null_cells=False)
+        self.assertEqual(errors, [(1, '', 'Int', 'Must be an integer')])
+
+    def test_low_cardinality_columns_match_per_row_evaluation(self):
+        """Test rules evaluated once per distinct value report the same rows as the row-wise path"""
+        rng = np.random.default_rng(4)
+        series = pd.Series(rng.choice(['GBP', 'usd', 'E1R', ' ', None, '12', '01-02-2020'], 5000), dtype=object)
+        self.assertIsNotNone(ValidationEngine._low_cardinality_codes(ValidationEngine.to_text(series)))
+        for rule in ('Required', 'Int', 'Alphanumeric', 'Text', 'Date(DD-MM-YYYY)'):
+            for check_null_cells in (True, False):
+                memoized = ValidationEngine.check_column(series, rule, ['%d-%m-%Y'], check_null_cells, 'DD-MM-YYYY')
+                with mock.patch.object(ValidationEngine, 'MEMOIZE_MIN_ROWS', len(series) + 1):
+                    row_wise = ValidationEngine.check_column(series, rule, ['%d-%m-%Y'], check_null_cells, 'DD-MM-YYYY')
+                self.assertEqual(memoized, row_wise, (rule, check_null_cells))
+
+class TestFormulaEvaluator(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'price': ['2', '3', 'x', '4'],
+            'qty': [5, 0, 1, None],
+            'total': ['10', '1', '2', '8']
+        })
+
+    def test_arithmetic_formula(self):
+        """Test arithmetic formulas report data errors and mismatches per row"""
+        valid, errors = FormulaEvaluator.evaluate_column_rule(self.df, 'total', "'total' = 'price' * 'qty'")
+        self.assertFalse(valid)
+        self.assertEqual(errors, [
+            (3, 'x', 'total_DataType', 'Invalid numeric value in column price: x'),
+            (4, 'NULL', 'total_Formula', 'Value is null or empty in column qty'),
+            (2, '1', 'total_Formula', "Data Error: total (1) does not match formula 'price' * 'qty' (0.0)")
+        ])
+
+    def test_division_by_zero_is_reported_per_row(self):
+        """Test rows that fail to evaluate get the Python error message"""
+        df = pd.DataFrame({'a': [1.0, 1.0], 'b': [2.0, 0.0], 'r': [0.5, 1.0]})
+        valid, errors = FormulaEvaluator.evaluate_column_rule(df, 'r', "'r' = 'a' / 'b'")
+        self.assertFalse(valid)
+        self.assertEqual(errors, [(2, '', 'FormulaEvaluation', 'Error evaluating formula for row 2: float division by zero')])
+
+    def test_comparison_and_whitelist(self):
+        """Test comparison rules and rejection of non-arithmetic expressions"""
+        valid, errors = FormulaEvaluator.evaluate_column_rule(self.df, 'qty', "'qty' >= 1")
+        self.assertEqual([err[0] for err in errors], [2, 4])
+
+        valid, errors = FormulaEvaluator.evaluate_column_rule(self.df, 'total', "'total' = abs('price')")
+        self.assertFalse(valid)
+        self.assertEqual(errors[0][2], 'InvalidFormula')
+
+    def test_compiled_formulas_are_cached(self):
+        """Test the same formula text is only compiled once"""
+        first = FormulaEvaluator.compile_expression("'price' + 'qty'")
+        self.assertIs(FormulaEvaluator.compile_expression("'price' + 'qty'"), first)
+        self.assertEqual(first.columns, ['price', 'qty'])
+
+class TestDataFrameStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        DataFrameStore.configure(self.tmpdir.name, max_frames=1)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip_keeps_mixed_cells(self):
+        """Test stored frames come back unchanged, from memory and from disk"""
+        df = pd.DataFrame({0: ['Name', 'John', None], 1: ['Age', 25, 3.5]})
+        first_id = DataFrameStore.put(df)
+        pd.testing.assert_frame_equal(DataFrameStore.get(first_id), df)
+
+        # Evicted from the LRU by the second frame, so this read hits the file
+        DataFrameStore.put(pd.DataFrame({'x': [1]}))
+        pd.testing.assert_frame_equal(DataFrameStore.get(first_id), df)
+
+    def test_get_returns_copy_and_delete(self):
+        """Test callers cannot mutate the cached frame and deleted frames are gone"""
+        frame_id = DataFrameStore.put(pd.DataFrame({'a': [1, 2]}))
+        DataFrameStore.get(frame_id).loc[0, 'a'] = 99
+        self.assertEqual(DataFrameStore.get(frame_id).loc[0, 'a'], 1)
+
+        DataFrameStore.delete(frame_id)
+        self.assertIsNone(DataFrameStore.get(frame_id))
+        with self.assertRaises(ValueError):
+            DataFrameStore.get('../outside')
+
+class TestBlobStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        BlobStore.configure(self.tmpdir.name, default_ttl=60)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_unchanged_content_is_not_rewritten(self):
+        """Test a blob stored again with the same content only has its expiry moved"""
+        rows = [{'Name': 'Ann', 'Age': 25}] * 1000
+        blob_id = BlobStore.put(rows)
+        self.assertLess(os.path.getsize(BlobStore.blob_path(blob_id)), 1000)
+        self.assertEqual(BlobStore.put(rows, blob_id), blob_id)
+        self.assertEqual(BlobStore.stats(), {'writes': 1, 'unchanged': 1, 'expired': 0})
+        self.assertEqual(BlobStore.get(blob_id), rows)
+
+        BlobStore.put(rows[:1], blob_id)
+        self.assertEqual(BlobStore.get(blob_id), rows[:1])
+        with self.assertRaises(ValueError):
+            BlobStore.get('../outside')
+
+    def test_expired_blobs_are_dropped(self):
+        """Test expired blobs read as missing and are removed by cleanup"""
+        expired_id = BlobStore.put({'a': 1}, ttl=-1)
+        kept_id = BlobStore.put({'b': 2})
+        self.assertFalse(BlobStore.exists(expired_id))
+        BlobStore.cleanup()
+        self.assertFalse(os.path.exists(BlobStore.blob_path(expired_id)))
+        self.assertIsNone(BlobStore.get(expired_id))
+        self.assertEqual(BlobStore.get(kept_id), {'b': 2})
+
+    def test_session_keeps_only_blob_ids(self):
+        """Test session payloads go to blobs and unmodified sessions are not saved again"""
+        from flask import Flask, jsonify, session
+        app = Flask(__name__)
+        app.config.update(SESSION_FILE_DIR=os.path.join(self.tmpdir.name, 'sessions'),
+                          SESSION_REFRESH_EACH_REQUEST=False)
+        WriteOnChangeSessionInterface.init_app(app)
+
+        @app.route('/validate')
+        def validate():
+            SessionManager.set_validation_results({'Age': [{'row': 2}]}, [{'Age': 'x'}] * 500)
+            return jsonify(sorted(session.keys()))
+
+        @app.route('/results')
+        def results():
+            return jsonify(SessionManager.get_validation_results()['error_cell_locations'])
+
+        client = app.test_client()
+        keys = client.get('/validate').get_json()
+        self.assertIn('validation_results_blob_id', keys)
+        self.assertNotIn('data_rows', keys)
+        session_dir = app.config['SESSION_FILE_DIR']
+        snapshot = lambda: {name: os.stat(os.path.join(session_dir, name)).st_mtime_ns for name in os.listdir(session_dir)}
+        written = snapshot()
+
+        time.sleep(0.01)
+        response = client.get('/results')
+        self.assertEqual(response.get_json(), {'Age': [{'row': 2}]})
+        self.assertNotIn('Set-Cookie', response.headers)
+        client.get('/validate')
+        self.assertEqual(snapshot(), written)
+
+    def test_active_session_is_renewed(self):
+        """Test an unchanged session is saved again once half its lifetime has passed"""
+        from flask import Flask, jsonify, session
+        app = Flask(__name__)
+        app.config.update(SESSION_FILE_DIR=os.path.join(self.tmpdir.name, 'sessions'),
+                          SESSION_REFRESH_EACH_REQUEST=False, PERMANENT_SESSION_LIFETIME=3600)
+        WriteOnChangeSessionInterface.init_app(app)
+
+        @app.route('/login')
+        def login():
+            session['user_id'] = 7
+            return jsonify(True)
+
+        @app.route('/poll')
+        def poll():
+            return jsonify(session.get('user_id'))
+
+        client = app.test_client()
+        now = time.time()
+        request_at = lambda offset: mock.patch('services.session_manager.time.time', return_value=now + offset)
+        with request_at(0):
+            self.assertIn('Set-Cookie', client.get('/login').headers)
+        with request_at(1700):
+            self.assertNotIn('Set-Cookie', client.get('/poll').headers)
+        with request_at(1900):
+            response = client.get('/poll')
+        self.assertIn('Set-Cookie', response.headers)
+        self.assertEqual(response.get_json(), 7)
+        with request_at(2000):
+            self.assertNotIn('Set-Cookie', client.get('/poll').headers)
+
+class TestCacheManager(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        CacheManager.configure()
+        self.tmpdir.cleanup()
+
+    def frame(self, rows):
+        return pd.DataFrame({'Name': [f'name {i}' for i in range(rows)], 'Age': np.arange(rows)})
+
+    def test_lru_eviction_counts_frame_bytes(self):
+        """Test the byte budget evicts the least recently used frame and readers get copies"""
+        frame_bytes = int(self.frame(1000).memory_usage(index=True, deep=True).sum())
+        CacheManager.configure(max_bytes=frame_bytes * 2 + 10, default_ttl=60)
+        for key in ('a', 'b'):
+            CacheManager.cache_dataframe(self.frame(1000), key)
+        CacheManager.get_cached_dataframe('a').loc[0, 'Age'] = -1
+        CacheManager.cache_dataframe(self.frame(1000), 'c')
+
+        self.assertIsNone(CacheManager.get_cached_dataframe('b'))
+        pd.testing.assert_frame_equal(CacheManager.get_cached_dataframe('a'), self.frame(1000))
+        stats = CacheManager.stats()
+        self.assertEqual((stats['entries'], stats['bytes'], stats['evictions']), (2, frame_bytes * 2, 1))
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+    def test_ttl_spill_and_template_invalidation(self):
+        """Test expired entries miss, evicted ones come back from disk, and a template's results can be dropped"""
+        results = {'Age': [{'row': i} for i in range(10)]}
+        # Room for one pickled result in memory
+        CacheManager.configure(max_bytes=len(pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)) + 10,
+                               default_ttl=60, spill_dir=self.tmpdir.name, spill_max_bytes=10 ** 6)
+        CacheManager.put('short', 'x', ttl=-1)
+        self.assertIsNone(CacheManager.get('short'))
+
+        CacheManager.cache_validation_results(7, 'abc', results, fingerprint='rules-1')
+        CacheManager.cache_validation_results(8, 'abc', results, fingerprint='rules-1')
+        self.assertEqual(CacheManager.stats()['spilled_entries'], 1)
+        self.assertEqual(CacheManager.get_cached_validation_results(7, 'abc', 'rules-1'), results)
+        self.assertEqual(CacheManager.stats()['spill_hits'], 1)
+        self.assertIsNone(CacheManager.get_cached_validation_results(7, 'abc', 'rules-2'))
+
+        CacheManager.invalidate_template(7)
+        CacheManager.invalidate_template(8)
+        self.assertIsNone(CacheManager.get_cached_validation_results(8, 'abc', 'rules-1'))
+        self.assertEqual(os.listdir(os.path.join(self.tmpdir.name, str(os.getpid()))), [])
+
+class TestDashboardStats(unittest.TestCase):
+    def setUp(self):
+        from decimal import Decimal
+        from flask import Flask, jsonify
+        from routes.analytics import analytics_bp
+        CacheManager.configure(default_ttl=60)
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test'
+        self.app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
+        self.app.add_url_rule('/write', 'write', lambda: jsonify({'success': True}), methods=['POST'])
+        self.cursor = mock.MagicMock()
+        self.cursor.fetchone.return_value = {
+            'total_templates': 5, 'templates_with_rules': 3, 'total_validations': 40,
+            'total_errors_corrected': Decimal('120'), 'recent_validations': Decimal('7')
+        }
+        connection = mock.MagicMock()
+        connection.cursor.return_value = self.cursor
+        patcher = mock.patch('routes.analytics.get_db_connection', return_value=connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        CacheManager.configure()
+
+    def test_single_query_cached_until_a_write(self):
+        """Test the dashboard is one query, then served from the cache until the user writes"""
+        client = self.app.test_client()
+        with client.session_transaction() as sess:
+            sess.update(loggedin=True, user_id=9)
+
+        stats = client.get('/api/analytics/dashboard-stats').get_json()['stats']
+        self.assertEqual(stats, {'total_templates': 5, 'templates_with_rules': 3, 'total_validations': 40,
+                                 'total_errors_corrected': 120, 'recent_validations': 7,
+                                 'templates_without_rules': 2})
+        self.assertEqual(self.cursor.execute.call_count, 1)
+
+        client.get('/api/analytics/dashboard-stats')
+        self.assertEqual(self.cursor.execute.call_count, 1)
+        client.post('/write')
+        client.get('/api/analytics/dashboard-stats')
+        self.assertEqual(self.cursor.execute.call_count, 2)
+
+class TestParsedFileCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        ParsedFileCache.configure(os.path.join(self.tmpdir.name, 'parsed'))
+        self.path = os.path.join(self.tmpdir.name, 'upload.xlsx')
+        with pd.ExcelWriter(self.path) as writer:
+            pd.DataFrame([['Id', 'Amount', 'Name', 'Mixed'], [1, 2.5, 'Ann', 7], [2, None, None, 'x']]).to_excel(
+                writer, sheet_name='Data', index=False, header=False)
+            pd.DataFrame({'x': [1, 2]}).to_excel(writer, sheet_name='Other', index=False)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_same_bytes_are_parsed_once(self):
+        """Test a second read of the same content comes from the cache without opening the file"""
+        parsed = FileHandler.read_file(self.path)['Data']
+        pd.testing.assert_frame_equal(parsed, FileHandler.read_file(self.path, use_cache=False)['Data'])
+        copy_path = os.path.join(self.tmpdir.name, 'renamed.xlsx')
+        with open(self.path, 'rb') as src, open(copy_path, 'wb') as dst:
+            dst.write(src.read())
+
+        with mock.patch('services.file_handler.LazyWorkbook._open') as open_file:
+            sheets = FileHandler.read_file(copy_path)
+            self.assertEqual(sheets.sheet_names, ['Data', 'Other'])
+            self.assertEqual(sheets.find_header('Data'), (0, ['Id', 'Amount', 'Name', 'Mixed']))
+            pd.testing.assert_frame_equal(sheets['Data'], parsed)
+            open_file.assert_not_called()
+
+            # A sheet that was never parsed still needs the file
+            sheets['Other']
+            open_file.assert_called_once()
+        self.assertEqual(ParsedFileCache.stats()['hits'], 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test the cache drops the oldest files once it outgrows its limit"""
+        FileHandler.read_file(self.path)['Data']
+        first = ParsedFileCache.digest(self.path)
+        os.utime(os.path.join(ParsedFileCache.storage_dir(), first, ParsedFileCache.META_FILE), (0, 0))
+        ParsedFileCache.configure(ParsedFileCache.storage_dir(), max_bytes=1)
+
+        other_path = os.path.join(self.tmpdir.name, 'other.csv')
+        with open(other_path, 'w') as f:
+            f.write('a;b\n1;2\n')
+        self.assertEqual(FileHandler.read_file(other_path)['Sheet1'].shape, (2, 2))
+
+        self.assertEqual(os.listdir(ParsedFileCache.storage_dir()), [ParsedFileCache.digest(other_path)])
+        self.assertEqual(ParsedFileCache.stats()['evictions'], 1)
+
+class TestStreamingValidator(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'data.csv')
+        with open(self.path, 'w') as f:
+            f.write('Name;Age\nJohn;25\nJane;x\nBob;\nAnn;40\nEve;7\n')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_errors_use_global_rows(self):
+        """Test chunked validation reports the same rows as a single pass"""
+        errors_path = os.path.join(self.tmpdir.name, 'errors.csv')
+        rules = [{'column_name': 'Age', 'rule_name': 'Int', 'source_format': None}]
+        result = StreamingValidator.validate_file(self.path, rules, errors_path, chunk_size=2)
+
+        self.assertEqual(result['total_rows'], 5)
+        self.assertEqual(result['error_counts'], {'Age': 2})
+        self.assertEqual([(e['row'], e['value']) for e in result['error_samples']], [(2, 'x'), (3, 'NULL')])
+        self.assertEqual(pd.read_csv(errors_path)['row'].tolist(), [2, 3])
+
+    def test_corrected_output_is_written_incrementally(self):
+        """Test corrections land in the right chunk of the corrected output"""
+        output_path = os.path.join(self.tmpdir.name, 'out.csv')
+        result = StreamingValidator.validate_file(
+            self.path, [], os.path.join(self.tmpdir.name, 'errors.csv'), output_path=output_path,
+            corrections={'Age': {'1': '30', '2': '31'}}, chunk_size=2
+        )
+        self.assertEqual(result['correction_count'], 2)
+        out = pd.read_csv(output_path, dtype=str)
+        self.assertEqual(out.columns.tolist(), ['Name', 'Age'])
+        self.assertEqual(out['Age'].tolist(), ['25', '30', '31', '40', '7'])
+
+class TestRuleRegistry(unittest.TestCase):
+    def setUp(self):
+        rows = [
+            {'rule_name': 'Int', 'parameters': '{}', 'is_custom': False, 'source_format': None, 'data_type': 'Int'},
+            {'rule_name': 'Required', 'parameters': '{}', 'is_custom': False, 'source_format': None, 'data_type': None}
+        ]
+        self.conn = mock.MagicMock()
+        self.conn.cursor.return_value.fetchall.side_effect = lambda: [dict(row) for row in rows]
+        patcher = mock.patch('services.rule_registry.get_db_connection', return_value=self.conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        RuleRegistry.invalidate()
+        self.addCleanup(RuleRegistry.invalidate)
+
+    def test_validation_pass_loads_rules_once(self):
+        """Test validating several columns costs a single rule query"""
+        before = RuleRegistry.stats()
+        df = pd.DataFrame({'a': ['1', 'x'], 'b': ['2', None], 'c': ['3', '4']})
+        for column in df.columns:
+            DataValidator.check_column_validation(df, column, 'Int', ['%d-%m-%Y'])
+        self.assertEqual(RuleRegistry.get('Unknown'), None)
+
+        stats = RuleRegistry.stats()
+        self.assertEqual(self.conn.cursor.return_value.execute.call_count, 1)
+        self.assertEqual(stats['hits'] - before['hits'], 3)
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+
+    def test_invalidate_and_snapshot(self):
+        """Test invalidation forces a reload and snapshots are detached copies"""
+        snapshot = RuleRegistry.snapshot()
+        self.assertEqual(snapshot['Int']['data_type'], 'Int')
+        snapshot['Int']['data_type'] = 'changed'
+        self.assertEqual(RuleRegistry.get('Int')['data_type'], 'Int')
+
+        RuleRegistry.invalidate()
+        RuleRegistry.get('Int')
+        self.assertEqual(self.conn.cursor.return_value.execute.call_count, 2)
+
+class TestTypeInference(unittest.TestCase):
+    def test_detected_types(self):
+        """Each built-in type is detected and ties resolve in the original order"""
+        cases = {
+            'Email': ['a.b@example.com', 'x+y@mail.org'],
+            'Date': ['01-02-2020', '1-12-1999', '29-02-2000'],
+            'Boolean': ['true', 'FALSE', '0', '1'],
+            'Int': ['-5', '12', '٣'],
+            'Float': ['1.5', '-3', '2.25'],
+            'Alphanumeric': ['AB12', 'x9'],
+            'Text': ['Main St 1', 'x9'],
+        }
+        for expected, values in cases.items():
+            self.assertEqual(TypeInference.detect(pd.Series(values)), expected, values)
+
+    def test_dates_must_share_one_format(self):
+        """A mix of dd-mm-yyyy and yyyy-mm-dd values, or out-of-range dates, is not a Date column"""
+        self.assertEqual(TypeInference.detect(pd.Series(['01-02-2020', '2020-02-01'])), 'Text')
+        self.assertEqual(TypeInference.detect(pd.Series(['01-02-2020', '29-02-1900'])), 'Text')
+        self.assertEqual(TypeInference.detect(pd.Series(['2020-1-1', '1999-12-31'])), 'Date')
+        self.assertEqual(TypeInference.detect(pd.Series(['01-01-1600'])), 'Text')
+
+    def test_ratios_and_threshold(self):
+        """Ratios are weighted by value frequency and min_ratio relaxes the all-match rule"""
+        series = pd.Series(['1'] * 6 + ['2', '3', 'n/a', None])
+        profile = TypeInference.profile(series)
+        self.assertEqual(profile['type'], 'Text')
+        self.assertAlmostEqual(profile['ratios']['Int'], 8 / 9, places=5)
+        self.assertAlmostEqual(profile['ratios']['Boolean'], 6 / 9, places=5)
+        self.assertEqual((profile['rows'], profile['examined'], profile['distinct']), (10, 9, 4))
+        self.assertEqual(TypeInference.profile(series, min_ratio=0.85)['type'], 'Int')
+
+    def test_sampling(self):
+        """Large columns are inferred from a fixed-size sample"""
+        series = pd.Series(np.arange(50000).astype(str))
+        profile = TypeInference.profile(series, sample_size=1000)
+        self.assertEqual((profile['type'], profile['rows'], profile['examined']), ('Int', 50000, 1000))
+        self.assertEqual(TypeInference.profile(series, sample_size=None)['examined'], 50000)
+
+class TestDatabasePool(unittest.TestCase):
+    def setUp(self):
+        DatabaseManager.configure(pool_size=1, pool_timeout=0.05)
+        self.pool = mock.MagicMock()
+        DatabaseManager._connection_pool = self.pool
+
+    def tearDown(self):
+        DatabaseManager._connection_pool = None
+        DatabaseManager.configure()
+
+    def test_exhausted_pool_waits_then_times_out(self):
+        """A request waits a bounded time for a free connection and the wait is recorded"""
+        conn = DatabaseManager.get_connection()
+        self.assertEqual(DatabaseManager.pool_stats()['in_use'], 1)
+
+        with self.assertRaises(Exception):
+            DatabaseManager.get_connection()
+        stats = DatabaseManager.pool_stats()
+        self.assertEqual((stats['waits'], stats['timeouts'], stats['available']), (1, 1, 0))
+        self.assertGreater(stats['wait_time_total'], 0)
+
+        DatabaseManager.release_connection(conn)
+        conn.close.assert_called_once()
+        DatabaseManager.get_connection()
+        stats = DatabaseManager.pool_stats()
+        self.assertEqual((stats['acquired'], stats['in_use'], stats['peak_in_use']), (2, 1, 1))
+
+    def test_failed_checkout_frees_slot(self):
+        """A connector error does not leak a pool slot"""
+        self.pool.get_connection.side_effect = [RuntimeError('connection lost'), mock.MagicMock()]
+        with self.assertRaises(RuntimeError):
+            DatabaseManager.get_connection()
+        DatabaseManager.get_connection()
+        self.assertEqual(DatabaseManager.pool_stats()['waits'], 0)
+
+def parallel_worker_limit(progress):
+    """Job task reporting the ParallelValidator pool size of the worker it runs in"""
+    return ParallelValidator.stats()['max_workers']
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        JobQueue.configure(self.tmpdir.name, max_workers=1)
+        DataFrameStore.configure(os.path.join(self.tmpdir.name, 'frames'))
+        ValidationResultStore.configure(os.path.join(self.tmpdir.name, 'results'))
+
+    def tearDown(self):
+        JobQueue.shutdown()
+        self.tmpdir.cleanup()
+
+    def wait_for(self, job_id, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = JobQueue.status(job_id)
+            if job['status'] in JobQueue.FINISHED:
+                return job
+            time.sleep(0.1)
+        self.fail(f"Job {job_id} did not finish")
+
+    def test_validation_job_runs_in_worker(self):
+        """Test a queued validation reports progress and keeps its result in the result store"""
+        df = pd.DataFrame({'Age': ['25', 'x', None], 'Name': ['Ann', 'Bob', 'Cy']})
+        rules = [{'column_name': 'Age', 'rule_name': 'Int', 'source_format': None}]
+        job_id = JobQueue.submit(ModelDataValidator.run_validation_job, df, rules, {},
+                                 ValidationResultStore.settings(), 7, 1, owner=7, meta={'template_id': 1})
+        self.assertEqual(JobQueue.status(job_id)['owner'], 7)
+
+        job = self.wait_for(job_id)
+        self.assertEqual(job['status'], 'completed', job['error'])
+        self.assertEqual(job['progress'], {'done': 3, 'total': 3, 'percent': 100.0})
+
+        meta = ValidationResultStore.get_meta(JobQueue.result(job_id)['result_id'])
+        self.assertEqual((meta['owner'], meta['template_id']), (7, 1))
+        self.assertEqual([(loc['row'], loc['rule_failed'])
+                          for loc in ValidationResultStore.error_cell_locations(meta)['Age']],
+                         [(2, 'Int'), (3, 'Int')])
+        self.assertIsNotNone(ValidationResultStore.get_index(meta))
+
+        JobQueue.delete(job_id)
+        self.assertIsNone(JobQueue.status(job_id))
+
+    def test_ingested_file_job_stores_its_result(self):
+        """Test a file queued by the SFTP bulk ingest is validated into a stored result"""
+        from routes.sftp import _queue_ingested_file
+        path = os.path.join(self.tmpdir.name, 'people.csv')
+        pd.DataFrame({'Age': ['25', 'x', '40'], 'Name': ['Ann', 'Bob', 'Cy']}).to_csv(path, index=False)
+        rules = [{'column_name': 'Age', 'rule_name': 'Int', 'source_format': None}]
+        with mock.patch('routes.sftp.Template.find_matching_template', return_value=5), \
+                mock.patch('routes.sftp.Template.get_validation_rules', return_value=rules), \
+                mock.patch('routes.sftp.RuleRegistry.snapshot', return_value={}):
+            queued = _queue_ingested_file(mock.MagicMock(), path, 7)
+        self.assertEqual((queued['validation'], queued['template_id']), ('queued', 5))
+
+        job = self.wait_for(queued['job_id'])
+        self.assertEqual(job['status'], 'completed', job['error'])
+        meta = ValidationResultStore.get_meta(JobQueue.result(queued['job_id'])['result_id'])
+        self.assertEqual((meta['owner'], meta['template_id'], meta['total_rows']), (7, 5, 3))
+
+    def test_job_result_endpoint_pages_by_default(self):
+        """Test a job result is sent as a summary and first page, with every row only on request"""
+        from flask import Flask
+        from routes.validation import validation_bp
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.register_blueprint(validation_bp, url_prefix='/api/validation')
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess.update(loggedin=True, user_id=7)
+
+        df = pd.DataFrame({'Age': [str(age) for age in range(150)] + ['x'], 'Name': ['Ann'] * 151})
+        rules = [{'column_name': 'Age', 'rule_name': 'Int', 'source_format': None}]
+        job_id = JobQueue.submit(ModelDataValidator.run_validation_job, df, rules, {},
+                                 ValidationResultStore.settings(), 7, 1, owner=7)
+        self.assertEqual(self.wait_for(job_id)['status'], 'completed')
+
+        paged = client.get(f'/api/validation/jobs/{job_id}/result').get_json()
+        self.assertEqual(paged['summary']['total_rows'], 151)
+        self.assertEqual(paged['summary']['error_counts'], {'Age': 1})
+        self.assertEqual(len(paged['data_rows']), ValidationResultStore.DEFAULT_PAGE_SIZE)
+        self.assertEqual(paged['total_pages'], 2)
+
+        full = client.get(f'/api/validation/jobs/{job_id}/result?format=full').get_json()
+        self.assertEqual(len(full['data_rows']), 151)
+        self.assertEqual([loc['row'] for loc in full['error_cell_locations']['Age']], [151])
+
+        result_id = paged['summary']['result_id']
+        self.assertTrue(client.delete(f'/api/validation/jobs/{job_id}').get_json()['success'])
+        self.assertIsNone(ValidationResultStore.get_meta(result_id))
+
+    def test_workbook_job_validates_each_sheet(self):
+        """Test one job validates every sheet of a workbook against that sheet's own rules"""
+        path = os.path.join(self.tmpdir.name, 'monthly.xlsx')
+        with pd.ExcelWriter(path) as writer:
+            pd.DataFrame({'Age': ['25', 'x'], 'Name': ['Ann', 'Bob']}).to_excel(writer, sheet_name='Jan', index=False)
+            pd.DataFrame({'Code': ['A1', 'B-2', 'C3']}).to_excel(writer, sheet_name='Feb', index=False)
+        plans = {
+            'Jan': {'template_id': 1, 'header_row': 0, 'headers': ['Age', 'Name'],
+                    'rules': [{'column_name': 'Age', 'rule_name': 'Int', 'source_format': None}]},
+            'Feb': {'template_id': 2, 'header_row': 0, 'headers': ['Code'],
+                    'rules': [{'column_name': 'Code', 'rule_name': 'Alphanumeric', 'source_format': None}]},
+        }
+        cache_settings = (os.path.join(self.tmpdir.name, 'parsed'), 64 * 1024 ** 2)
+        job_id = JobQueue.submit(ModelDataValidator.run_workbook_validation_job, path, plans, {}, cache_settings,
+                                 ValidationResultStore.settings(), 7, owner=7)
+
+        job = self.wait_for(job_id)
+        self.assertEqual(job['status'], 'completed', job['error'])
+        self.assertEqual(job['progress'], {'done': 2, 'total': 2, 'percent': 100.0})
+        sheets = JobQueue.result(job_id)['sheets']
+        self.assertEqual(list(sheets), ['Jan', 'Feb'])
+        jan, feb = (ValidationResultStore.get_meta(sheets[name]['result_id']) for name in ('Jan', 'Feb'))
+        self.assertEqual((sheets['Jan']['template_id'], jan['template_id'], jan['total_rows']), (1, 1, 2))
+        self.assertEqual([(loc['row'], loc['value']) for loc in ValidationResultStore.error_cell_locations(jan)['Age']],
+                         [(2, 'x')])
+        self.assertEqual([(loc['row'], loc['value']) for loc in ValidationResultStore.error_cell_locations(feb)['Code']],
+                         [(2, 'B-2')])
+
+    def test_initializer_configures_workers(self):
+        """Test job workers apply the parallel validation limit instead of defaulting to every CPU"""
+        JobQueue.configure(self.tmpdir.name, max_workers=1, initializer=ParallelValidator.configure, initargs=(3,))
+        job_id = JobQueue.submit(parallel_worker_limit)
+        job = self.wait_for(job_id)
+        self.assertEqual(job['status'], 'completed', job['error'])
+        self.assertEqual(JobQueue.result(job_id), 3)
+
+    def test_unknown_and_invalid_ids(self):
+        """Test unknown jobs have no status and ids cannot point outside the job directory"""
+        self.assertIsNone(JobQueue.status('0' * 32))
+        with self.assertRaises(ValueError):
+            JobQueue.status('../outside')
+
+class TestParallelValidator(unittest.TestCase):
+    def setUp(self):
+        ParallelValidator.configure(2)
+
+    def tearDown(self):
+        ParallelValidator.shutdown()
+        ParallelValidator.configure()
+
+    def test_shards_match_in_process_validation(self):
+        """Test row shards validated in workers report the whole-column locations"""
+        df = pd.DataFrame({
+            'Age': ['25', ' 31 ', 'x', None, '7.5', '40'] * 50,
+            'Score': [1.5, None, 2.0, 3.25, np.nan, 4.0] * 50,
+        })
+        specs = [('Age', 'Int', [], None), ('Age', 'Required', [], None), ('Score', 'Float', [], None)]
+        expected = ParallelValidator._check_serial(df, specs)
+        progress = []
+        with mock.patch.object(ParallelValidator, 'MIN_SHARD_ROWS', 70):
+            result = ParallelValidator.check_rules(df, specs, workers=2,
+                                                   progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(result, expected)
+        self.assertEqual([loc[0] for loc in result[1]][-1], 298)
+        self.assertEqual(progress[-1], (300, 300))
+
+    def test_plan_workers_grows_with_work(self):
+        """Test small inputs stay in-process and large ones use every allowed worker"""
+        with mock.patch('services.parallel_validator.os.cpu_count', return_value=8):
+            self.assertEqual(ParallelValidator.plan_workers(1000, 10), 1)
+            self.assertEqual(ParallelValidator.plan_workers(10 ** 7, 10), 2)
+
+    def test_cpu_share_splits_cpus_between_job_workers(self):
+        """Test each job worker gets its share of the CPUs, capped by the configured limit"""
+        with mock.patch('services.parallel_validator.os.cpu_count', return_value=8):
+            self.assertEqual(ParallelValidator.cpu_share(0, 2), 4)
+            self.assertEqual(ParallelValidator.cpu_share(3, 2), 3)
+            self.assertEqual(ParallelValidator.cpu_share(1, 2), 1)
+            self.assertEqual(ParallelValidator.cpu_share(0, 16), 1)
+
+class TestValidationResultStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        DataFrameStore.configure(os.path.join(self.tmpdir.name, 'frames'))
+        ValidationResultStore.configure(os.path.join(self.tmpdir.name, 'results'))
+        df = pd.DataFrame({'Age': ['25', 'x', None, '40', ''], 'Name': ['Ann', 'Bob', 'Cy', 'Di', 'Ed']})
+        errors = {'Age': [{'row': 2, 'value': 'x', 'rule_failed': 'Int', 'reason': 'Not an integer'},
+                          {'row': 3, 'value': 'NULL', 'rule_failed': 'Int', 'reason': 'Value is null'}]}
+        self.meta = ValidationResultStore.get_meta(ValidationResultStore.put(df, errors, owner=1, template_id=9))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_pages_match_full_response(self):
+        """Test pages hold the normalized rows and only the error locations falling on them"""
+        first = ValidationResultStore.page(self.meta, page=1, page_size=2)
+        self.assertEqual((first['total_rows'], first['total_pages'], first['row_numbers']), (5, 3, [1, 2]))
+        self.assertEqual(first['data_rows'], [{'Age': '25', 'Name': 'Ann'}, {'Age': 'x', 'Name': 'Bob'}])
+        self.assertEqual([loc['row'] for loc in first['error_cell_locations']['Age']], [2])
+
+        last = ValidationResultStore.page(self.meta, page=3, page_size=2)
+        self.assertEqual(last['data_rows'], [{'Age': 'NULL', 'Name': 'Ed'}])
+        self.assertEqual(last['error_cell_locations'], {})
+        self.assertEqual(ValidationResultStore.page(self.meta, page=4, page_size=2)['data_rows'], [])
+
+    def test_errors_only_and_projection(self):
+        """Test filtering to rows with errors and to selected columns"""
+        page = ValidationResultStore.page(self.meta, page_size=10, errors_only=True, columns=['Name'])
+        self.assertEqual(page['row_numbers'], [2, 3])
+        self.assertEqual(page['data_rows'], [{'Name': 'Bob'}, {'Name': 'Cy'}])
+        self.assertEqual(page['error_cell_locations'], {})
+        with self.assertRaises(ValueError):
+            ValidationResultStore.page(self.meta, columns=['Missing'])
+
+    def test_ndjson_stream(self):
+        """Test the NDJSON stream starts with the summary and has one line per row"""
+        lines = ''.join(ValidationResultStore.iter_ndjson(self.meta, errors_only=True, chunk_rows=1)).splitlines()
+        self.assertEqual(json.loads(lines[0])['summary']['rows_with_errors'], 2)
+        self.assertEqual(json.loads(lines[2]), {'row': 3, 'data': {'Age': 'NULL', 'Name': 'Cy'},
+                                                'errors': {'Age': [{'rule_failed': 'Int', 'reason': 'Value is null'}]}})
+        self.assertEqual(len(lines), 3)
+
+        ValidationResultStore.delete(self.meta['result_id'])
+        self.assertIsNone(ValidationResultStore.get_meta(self.meta['result_id']))
+        self.assertIsNone(DataFrameStore.get(self.meta['result_id']))
+        self.assertEqual(os.listdir(ValidationResultStore.storage_dir()), [])
+
+    def test_pages_read_only_their_error_blocks(self):
+        """Test pages find their locations in row-sorted blocks and match a scan of every location"""
+        rng = np.random.default_rng(5)
+        df = pd.DataFrame({'A': np.arange(500).astype(str), 'B': np.arange(500).astype(str)})
+        errors = {}
+        for col, rule in (('A', 'Int'), ('A', 'Required'), ('B', 'Email')):
+            rows = np.sort(rng.choice(np.arange(1, 501), 120, replace=False))
+            errors.setdefault(col, []).extend(
+                {'row': int(row), 'value': str(row), 'rule_failed': rule, 'reason': rule} for row in rows)
+        with mock.patch.object(ValidationResultStore, 'LOCATION_BLOCK', 16):
+            meta = ValidationResultStore.get_meta(ValidationResultStore.put(df, errors, owner=1))
+            self.assertNotIn('error_cell_locations', meta)
+            self.assertEqual(ValidationResultStore.summary(meta)['error_counts'], {'A': 240, 'B': 120})
+
+            for errors_only in (False, True):
+                total_pages = ValidationResultStore.page(meta, page_size=37, errors_only=errors_only)['total_pages']
+                for number in range(1, total_pages + 1):
+                    page = ValidationResultStore.page(meta, number, 37, errors_only)
+                    on_page = set(page['row_numbers'])
+                    expected = {}
+                    for col, locations in errors.items():
+                        found = sorted((loc for loc in locations if loc['row'] in on_page), key=lambda loc: loc['row'])
+                        if found:
+                            expected[col] = found
+                    self.assertEqual(page['error_cell_locations'], expected)
+
+            with mock.patch('services.validation_results.pickle.load', wraps=pickle.load) as load:
+                ValidationResultStore.page(meta, 1, 10)
+            self.assertLessEqual(load.call_count, 4)
+
+    def test_revalidate_reruns_only_affected_rules(self):
+        """Test a corrections delta re-runs the rules of corrected columns on corrected rows only"""
+        def rule(is_custom, parameters=None):
+            return {'is_custom': is_custom, 'parameters': parameters, 'source_format': None, 'data_type': None}
+        RuleRegistry.install({'Int': rule(False), 'Email': rule(False),
+                              'QtyCheck': rule(True, '{"logic": "AND", "base_rules": ["Int"]}')})
+        self.addCleanup(RuleRegistry.invalidate)
+        df = pd.DataFrame({'Age': ['25', 'x', None, '40', ''],
+                           'Email': ['a@b.co', 'bad', 'c@d.io', 'e@f.gh', 'x@y.zz'],
+                           'Qty': ['1', '2', 'z', '4', '5']})
+        rules = [{'column_name': 'Age', 'rule_name': 'Int', 'source_format': None},
+                 {'column_name': 'Email', 'rule_name': 'Email', 'source_format': None},
+                 {'column_name': 'Qty', 'rule_name': 'QtyCheck', 'source_format': None}]
+        index = ModelDataValidator.build_validation_index(df, rules)
+        self.assertEqual(index.error_cell_locations(), ModelDataValidator.validate_rules(df, rules))
+        result_id = ValidationResultStore.put(df, index.error_cell_locations(), owner=1, template_id=9, index=index)
+
+        df.loc[[1, 4], 'Age'] = ['31', 'oops']
+        df.loc[2, 'Qty'] = '3'
+        with mock.patch.object(ModelDataValidator, 'check_special_characters_in_column',
+                               wraps=ModelDataValidator.check_special_characters_in_column) as check:
+            columns = ModelDataValidator.revalidate(df, index, {'Age': np.array([1, 4]), 'Qty': np.array([2])})
+        self.assertEqual(columns, ['Age', 'Qty'])
+        checked = [(call.args[1], len(call.args[0])) for call in check.call_args_list]
+        self.assertIn(('Age', 2), checked)
+        self.assertNotIn('Email', [column for column, _ in checked])
+
+        self.assertEqual(index.error_cell_locations(), ModelDataValidator.validate_rules(df, rules))
+        self.assertEqual([loc['row'] for loc in index.error_cell_locations(['Age'])['Age']], [3, 5])
+        self.assertEqual(list(index.column_failures('Age')), [3, 5])
+
+        meta = ValidationResultStore.get_meta(result_id)
+        ValidationResultStore.update(meta, df, index)
+        meta = ValidationResultStore.get_meta(result_id)
+        self.assertEqual(meta['rows_with_errors'], 4)
+        self.assertEqual(ValidationResultStore.page(meta, errors_only=True)['row_numbers'], [1, 2, 3, 5])
+        self.assertEqual(DataFrameStore.get(result_id).loc[4, 'Age'], 'oops')
+
+class TestDataTransformer(unittest.TestCase):
+    def test_bulk_corrections_skip_invalid_and_keep_before_values(self):
+        """Test out-of-range rows and unknown columns are dropped and replaced values are returned"""
+        df = pd.DataFrame({'Name': ['a', 'b', 'c'], 'Qty': [1, 2, 3]})
+        corrections = {'Qty': {'2': '30', '0': '10', '7': '70', 'x': '0'},
+                       'Name': {'1': 'B'}, 'Missing': {'0': 'z'}}
+        applied = DataTransformer.apply_bulk_corrections(
+            df, *DataTransformer.corrections_to_arrays(corrections, list(df.columns)))
+
+        self.assertEqual(applied['columns'].tolist(), ['Qty', 'Qty', 'Name'])
+        self.assertEqual(applied['rows'].tolist(), [2, 0, 1])
+        self.assertEqual(applied['before'].tolist(), [3, 1, 'b'])
+        self.assertEqual(applied['values'].tolist(), ['30', '10', 'B'])
+        self.assertEqual(df['Qty'].tolist(), ['10', 2, '30'])
+        self.assertEqual(df['Qty'].dtype, object)
+        self.assertEqual(df['Name'].tolist(), ['a', 'B', 'c'])
+
+    def test_bulk_corrections_match_per_cell_loop(self):
+        """Test bulk application gives the frame the per-cell df.at loop gave"""
+        rng = np.random.default_rng(2)
+        df = pd.DataFrame(rng.integers(0, 100, (200, 4)).astype(str), columns=list('abcd'))
+        columns = rng.choice(list('abcd'), 50)
+        rows = rng.integers(0, 220, 50)
+        values = [f'v{i}' for i in range(50)]
+
+        expected = df.copy()
+        for column, row, value in zip(columns, rows, values):
+            if row < len(expected):
+                expected.at[row, column] = value
+        applied = DataTransformer.apply_bulk_corrections(df, columns, rows, values)
+        pd.testing.assert_frame_equal(df, expected)
+        self.assertEqual(len(applied['rows']), int((rows < 200).sum()))
+
+        with self.assertRaises(ValueError):
+            DataTransformer.apply_bulk_corrections(df, ['a'], [0, 1], ['x'])
+
+class TestCorrectionSaving(unittest.TestCase):
+    def test_insert_corrections_in_batches(self):
+        """Test correction records are inserted with one executemany per batch, in order"""
+        cursor = mock.MagicMock()
+        records = [(1, row, 'Age', 'x', str(row), 'generic_rule') for row in range(2500)]
+        ValidationHistory.insert_corrections(cursor, records, batch_rows=1000)
+        batches = [call.args[1] for call in cursor.executemany.call_args_list]
+        self.assertEqual([len(batch) for batch in batches], [1000, 1000, 500])
+        self.assertEqual([record for batch in batches for record in batch], records)
+
+        cursor.reset_mock()
+        ValidationHistory.insert_corrections(cursor, [])
+        cursor.executemany.assert_not_called()
+
+    def test_save_corrections_writes_audit_records_in_one_pass(self):
+        """Test saving corrections issues no per-correction queries and records the replaced values"""
+        from flask import Flask
+        from routes.validation import validation_bp
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
+        app.register_blueprint(validation_bp, url_prefix='/api/validation')
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess.update(loggedin=True, user_id=7, header_row=0)
+
+        cursor = mock.MagicMock()
+        cursor.fetchone.return_value = {'template_name': 'people.xlsx', 'sheet_name': 'Sheet1',
+                                        'headers': json.dumps(['Age', 'Name'])}
+        cursor.lastrowid = 42
+        connection = mock.MagicMock()
+        connection.cursor.return_value = cursor
+        uploaded = pd.DataFrame([['Age', 'Name'], ['25', 'Ann'], ['x', 'Bob'], [None, 'Cy']])
+        with mock.patch('routes.validation.get_db_connection', return_value=connection), \
+                mock.patch('routes.validation.SessionManager.load_dataframe', return_value=uploaded), \
+                mock.patch('routes.validation.SessionManager.store_dataframe') as store_dataframe, \
+                mock.patch('routes.validation.FileHandler.save_corrected_file', return_value='/tmp/people_corrected.xlsx'):
+            response = client.post('/api/validation/validate-existing/3', json={
+                'corrections': {'Age': {'1': '31', '2': '40'}, 'Name': {'0': 'Anne'}}
+            })
+
+        self.assertEqual(response.get_json()['correction_count'], 3)
+        # The template lookup and the history row; corrections go through executemany only
+        self.assertEqual(cursor.execute.call_count, 2)
+        cursor.executemany.assert_called_once()
+        self.assertEqual(cursor.executemany.call_args.args[1], [
+            (42, 2, 'Age', 'x', '31', 'generic_rule'),
+            (42, 3, 'Age', 'None', '40', 'generic_rule'),
+            (42, 1, 'Name', 'Ann', 'Anne', 'generic_rule'),
+        ])
+        corrected = store_dataframe.call_args.args[0]
+        self.assertEqual(corrected.values.tolist(), [['25', 'Anne'], ['31', 'Bob'], ['40', 'Cy']])
+        connection.commit.assert_called_once()
+
+class TestDateParser(unittest.TestCase):
+    def test_valid_mask_matches_strptime(self):
+        """Test verdicts match strptime, including years pandas cannot represent"""
+        text = pd.Series(['31-12-2024', '01-01-3000', '7-5-0897', '29-02-2023', 'today', 'now',
+                          '2024-01-05', '', '31-12-2024'])
+        expected = [True, True, True, False, False, False, False, False, True]
+        self.assertEqual(DateParser.valid_mask(text, ['%d-%m-%Y']).tolist(), expected)
+
+        cache = {}
+        DateParser.valid_mask(text[:3], ['%d-%m-%Y'], cache)
+        self.assertEqual(DateParser.valid_mask(text, ['%d-%m-%Y'], cache).tolist(), expected)
+        self.assertEqual(cache['01-01-3000'], True)
+
+    def test_transform_column_keeps_unparsed_values(self):
+        """Test whole-column transform agrees with transform_date cell by cell"""
+        series = pd.Series(['31-12-2024', ' 01-02-2024', 'bad', None, '', '01-01-3000', '31-12-2024'])
+        transformed, invalid = DataTransformer.transform_date_column(series, 'DD-MM-YYYY', 'MM/DD/YYYY')
+        self.assertEqual(transformed.tolist(),
+                         [DataTransformer.transform_date(v, 'DD-MM-YYYY', 'MM/DD/YYYY') for v in series])
+        self.assertEqual(transformed.tolist()[:3], ['12/31/2024', '02/01/2024', 'bad'])
+        self.assertEqual(invalid.tolist(), [False, False, True, False, False, False, False])
+
+class TestSFTPPool(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.remote = os.path.join(self.tmpdir.name, 'remote')
+        for folder in ('Inbound', 'Outbound', 'processing'):
+            os.makedirs(os.path.join(self.remote, folder))
+        self.server = LocalSFTPServer(self.remote).__enter__()
+        self.config = self.server.config
+        SFTPConnectionPool.configure(max_per_host=2, acquire_timeout=0.2)
+
+    def tearDown(self):
+        SFTPConnectionPool.close_all()
+        self.server.close()
+        self.tmpdir.cleanup()
+
+    def test_operations_share_one_session(self):
+        """Test consecutive handler calls reuse one pooled session instead of reconnecting"""
+        with open(os.path.join(self.remote, 'Inbound', 'Sales.csv'), 'w') as f:
+            f.write('a,b\n1,2\n')
+        local = os.path.join(self.tmpdir.name, 'local')
+        config = self.config
+
+        self.assertTrue(SFTPHandler.test_connection(**config)[0])
+        files, _ = SFTPHandler.list_files(config, '/Inbound')
+        self.assertEqual([(f['name'], f['size']) for f in files], [('Sales.csv', 8)])
+        ok, _, local_file = SFTPHandler.fetch_file(config['hostname'], config['username'], config['password'],
+                                                   '/Inbound/Sales.csv', local, port=config['port'])
+        self.assertTrue(ok)
+        ok, message = SFTPHandler.move_and_upload_file(config['hostname'], config['username'], config['password'],
+                                                       local_file, 'sales', port=config['port'])
+        self.assertTrue(ok, message)
+        self.assertTrue(os.path.exists(os.path.join(self.remote, 'Outbound', 'Sales.csv')))
+        self.assertTrue(os.path.exists(os.path.join(self.remote, 'processing', 'Sales.csv')))
+        self.assertFalse(SFTPHandler.get_file_info(config, '/Inbound/Sales.csv')[0])
+
+        self.assertEqual(self.server.connections, 1)
+        stats = SFTPConnectionPool.stats()
+        self.assertEqual((stats['connects'], stats['idle']), (1, 1))
+
+    def test_download_directory_in_parallel(self):
+        """Test matching files are fetched over at most max_per_host sessions with verified sizes"""
+        for i in range(6):
+            with open(os.path.join(self.remote, 'Inbound', f'part_{i}.CSV'), 'wb') as f:
+                f.write(os.urandom(200000 + i))
+        with open(os.path.join(self.remote, 'Inbound', 'notes.txt'), 'w') as f:
+            f.write('skip me')
+        local = os.path.join(self.tmpdir.name, 'ingest')
+
+        files, message = SFTPHandler.download_directory(self.config, '/Inbound', local, pattern='*.csv')
+        self.assertEqual(message, 'Downloaded 6 of 6 files')
+        self.assertEqual([f['name'] for f in files], [f'part_{i}.CSV' for i in range(6)])
+        for entry in files:
+            self.assertTrue(entry['success'])
+            with open(entry['local_path'], 'rb') as got, \
+                    open(os.path.join(self.remote, 'Inbound', entry['name']), 'rb') as expected:
+                self.assertEqual(got.read(), expected.read())
+        self.assertEqual(sorted(os.listdir(local)), [f'part_{i}.CSV' for i in range(6)])
+        self.assertLessEqual(self.server.connections, 2)
+
+        self.assertEqual(SFTPHandler.download_directory(self.config, '/Inbound', local, pattern='*.xlsx'),
+                         ([], 'No matching files'))
+        self.assertIsNone(SFTPHandler.download_directory(self.config, '/Missing', local)[0])
+
+    def test_limit_credentials_and_dead_sessions(self):
+        """Test the per-host limit, that other credentials never reuse a session and dead ones are replaced"""
+        config = self.config
+        first = SFTPConnectionPool.acquire(config['hostname'], config['username'], config['password'], config['port'])
+        second = SFTPConnectionPool.acquire(config['hostname'], config['username'], config['password'], config['port'])
+        with self.assertRaises(SFTPPoolTimeout):
+            SFTPConnectionPool.acquire(config['hostname'], config['username'], config['password'], config['port'])
+        SFTPConnectionPool.release(first)
+        SFTPConnectionPool.release(second)
+
+        ok, message = SFTPHandler.test_connection(config['hostname'], config['username'], 'wrong', config['port'])
+        self.assertFalse(ok)
+        self.assertIn('Authentication failed', message)
+        # The idle sessions were opened with the real password: closed, not reused
+        stats = SFTPConnectionPool.stats()
+        self.assertEqual((stats['idle'], stats['discards']), (0, 2))
+
+        with SFTPConnectionPool.session(config['hostname'], config['username'], config['password'],
+                                        config['port']) as conn:
+            conn.client.close()
+        self.assertEqual(SFTPConnectionPool.stats()['discards'], 3)
+        self.assertTrue(SFTPHandler.test_connection(**config)[0])
+
 class TestFileHandler(unittest.TestCase):
     def test_excel_file_reading(self):
         """Test Excel file processing"""
@@ -53,6 +1065,37 @@ class TestFileHandler(unittest.TestCase):
             # Cleanup
             os.unlink(tmp.name)
     
+    def test_streaming_excel_writer(self):
+        """Test the write-only writer strips illegal characters and reads back like to_excel"""
+        df = pd.DataFrame({'Id': [1, 2, None], 'Name': ['A\x01nn', None, 'Tab\tOK'], 'Mixed': ['x', 3, None]})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            streamed = os.path.join(tmpdir, 'streamed.xlsx')
+            FileHandler.write_excel(df, streamed, 'Data', streaming=True)
+            expected = os.path.join(tmpdir, 'expected.xlsx')
+            df.replace('A\x01nn', 'Ann').to_excel(expected, index=False, sheet_name='Data')
+            pd.testing.assert_frame_equal(pd.read_excel(streamed, sheet_name='Data'),
+                                          pd.read_excel(expected, sheet_name='Data'))
+    
+    def test_lazy_workbook_loads_sheets_on_demand(self):
+        """Test sheets are parsed only when accessed and the header comes from the first rows"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'book.xlsx')
+            with pd.ExcelWriter(path) as writer:
+                pd.DataFrame([[2024, None], ['Id', 'Name'], [1, 'Ann'], [2.5, None]]).to_excel(
+                    writer, sheet_name='Data', index=False, header=False)
+                pd.DataFrame({'x': range(50)}).to_excel(writer, sheet_name='Other', index=False)
+
+            for engine in ('pandas', 'calamine'):
+                with FileHandler.read_file(path, engine=engine, use_cache=False) as sheets:
+                    self.assertEqual(list(sheets.keys()), ['Data', 'Other'])
+                    self.assertIn('Other', sheets)
+                    self.assertEqual(sheets.find_header('Data'), (1, ['Id', 'Name']))
+                    self.assertEqual(len(sheets.head('Other', 5)), 5)
+                    self.assertEqual(sheets._frames, {})
+
+                    pd.testing.assert_frame_equal(sheets['Data'], pd.read_excel(path, sheet_name='Data', header=None))
+                    self.assertEqual(list(sheets._frames), ['Data'])
+    
     def test_delimiter_detection(self):
         """Test CSV delimiter detection"""
         # Create test CSV with semicolon delimiter
@@ -64,4 +1107,4 @@ class TestFileHandler(unittest.TestCase):
             self.assertEqual(delimiter, ';')
             
             # Cleanup
-            os.unlink(tmp.name)
\ No newline at end of file
+            os.unlink(tmp.name)
\ No newline at end of file
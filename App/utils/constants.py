@@ -7,6 +7,9 @@ Application constants and configuration values
 SUPPORTED_FILE_EXTENSIONS = ['.xlsx', '.xls', '.csv', '.txt', '.dat']
 MAX_FILE_SIZE_MB = 100
 MAX_HEADER_DETECTION_ROWS = 10
+# Object columns with fewer distinct values per row than this repeat enough to be
+# stored as categories and validated once per distinct value
+LOW_CARDINALITY_RATIO = 0.5
 
 # Session configuration
 SESSION_TIMEOUT_HOURS = 24
@@ -15,6 +18,8 @@ DEFAULT_SESSION_TYPE = 'filesystem'
 # Database configuration
 DEFAULT_DB_POOL_SIZE = 10
 DB_CONNECTION_TIMEOUT = 30
+# Rows per INSERT batch when recording corrections
+CORRECTION_INSERT_BATCH_ROWS = 1000
 
 # Validation constants
 DEFAULT_DATE_FORMATS = [
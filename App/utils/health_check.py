@@ -0,0 +1,42 @@
+import logging
+from datetime import datetime
+from typing import Dict
+from config.database import DatabaseManager
+
+class HealthCheck:
+    VERSION = '2.0.0'
+
+    @staticmethod
+    def database_pool() -> Dict:
+        """Connection pool usage: in-use connections, waits for a free one and time spent waiting"""
+        return DatabaseManager.pool_stats()
+
+    @staticmethod
+    def report() -> Dict:
+        """Payload of the /health endpoint"""
+        from services.rule_registry import RuleRegistry
+        from services.job_queue import JobQueue
+        from services.sftp_pool import SFTPConnectionPool
+        from services.parsed_file_cache import ParsedFileCache
+        from services.parallel_validator import ParallelValidator
+        from services.blob_store import BlobStore
+        from services.cache_manager import CacheManager
+
+        pool = HealthCheck.database_pool()
+        status = 'healthy'
+        if pool['available'] == 0:
+            status = 'degraded'
+            logging.warning(f"Database pool saturated: {pool['in_use']}/{pool['pool_size']} connections in use")
+        return {
+            'status': status,
+            'timestamp': datetime.now().isoformat(),
+            'version': HealthCheck.VERSION,
+            'rule_cache': RuleRegistry.stats(),
+            'database_pool': pool,
+            'jobs': JobQueue.stats(),
+            'sftp_pool': SFTPConnectionPool.stats(),
+            'parsed_file_cache': ParsedFileCache.stats(),
+            'parallel_validation': ParallelValidator.stats(),
+            'session_blobs': BlobStore.stats(),
+            'cache': CacheManager.stats()
+        }